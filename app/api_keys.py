@@ -0,0 +1,194 @@
+"""Module that spreads the Geocoding API calls over a pool of API keys.
+
+GOOGLE_API_KEYS lists key[:weight[:calls per minute]] entries and defaults to
+the single GOOGLE_API_KEY. Each call takes the next key, by smooth weighted
+round-robin, among the keys under their rate limit and not cooling down
+after a 429 or a 403. Keys are only ever logged by their position, e.g. key2."""
+
+import threading
+import time
+from collections import deque
+
+from app.config import Config
+from app.metrics import increment_counter
+from app.quota import QuotaExceededError
+
+logger = Config.logger
+
+RATE_WINDOW_SECONDS = 60
+
+_lock = threading.Lock()
+_pool = []
+
+
+class ApiKeysExhaustedError(QuotaExceededError):
+    """Raised when no API key becomes available within
+    GOOGLE_API_KEY_MAX_WAIT_SECONDS"""
+
+
+class ApiKey:  # pylint: disable=too-few-public-methods,too-many-instance-attributes
+    """An API key with its weight, per-minute rate limit and health"""
+
+    def __init__(self, label, value, weight=1, rate_limit=0):
+        self.label = label
+        self.value = value
+        self.weight = weight
+        self.rate_limit = rate_limit
+        self.current_weight = 0
+        self.calls = deque()
+        self.cooldown_until = 0.0
+        self.strikes = 0
+
+    def get_available_at(self, now):
+        """Returns the monotonic time from which the key may be used"""
+        while self.calls and self.calls[0] <= now - RATE_WINDOW_SECONDS:
+            self.calls.popleft()
+        available_at = self.cooldown_until
+        if self.rate_limit and len(self.calls) >= self.rate_limit:
+            available_at = max(
+                available_at, self.calls[-self.rate_limit] + RATE_WINDOW_SECONDS
+            )
+        return available_at
+
+
+def parse_api_keys(entries):
+    """Returns the ApiKeys of key[:weight[:calls per minute]] entries"""
+    api_keys = []
+    for position, entry in enumerate(entries, 1):
+        label = f"key{position}"
+        value, *options = entry.split(":")
+        try:
+            weight = int(options[0]) if options and options[0] else 1
+            rate_limit = (
+                int(options[1])
+                if len(options) > 1 and options[1]
+                else Config.GOOGLE_API_KEY_RATE_LIMIT
+            )
+        except ValueError:
+            raise ValueError(f"Invalid GOOGLE_API_KEYS entry {label}") from None
+        if not value or len(options) > 2 or weight < 1 or rate_limit < 0:
+            raise ValueError(f"Invalid GOOGLE_API_KEYS entry {label}")
+        api_keys.append(ApiKey(label, value, weight, rate_limit))
+    return api_keys
+
+
+def configure_api_keys(entries=None):
+    """Replaces the pool with the keys of entries, GOOGLE_API_KEYS by default"""
+    entries = Config.GOOGLE_API_KEYS if entries is None else entries
+    api_keys = (
+        parse_api_keys(entries)
+        if entries
+        else [
+            ApiKey(
+                "key1",
+                Config.GOOGLE_API_KEY,
+                rate_limit=Config.GOOGLE_API_KEY_RATE_LIMIT,
+            )
+        ]
+    )
+    with _lock:
+        _pool[:] = api_keys
+
+
+def _get_pool():
+    """Returns the pool, configuring it on first use"""
+    if not _pool:
+        configure_api_keys()
+    return _pool
+
+
+def get_api_key_count():
+    """Returns the number of keys in the pool"""
+    return len(_get_pool())
+
+
+def is_api_key_available():
+    """Returns whether a key may be used right now"""
+    pool = _get_pool()
+    now = time.monotonic()
+    with _lock:
+        return any(api_key.get_available_at(now) <= now for api_key in pool)
+
+
+def acquire_api_key(blocking=True):
+    """Returns the key of the next call, waiting up to
+    GOOGLE_API_KEY_MAX_WAIT_SECONDS for one to become available. Without
+    blocking, returns None when no key is available right away"""
+    pool = _get_pool()
+    deadline = time.monotonic() + Config.GOOGLE_API_KEY_MAX_WAIT_SECONDS
+    while True:
+        now = time.monotonic()
+        with _lock:
+            available = [
+                api_key for api_key in pool if api_key.get_available_at(now) <= now
+            ]
+            if available:
+                api_key = _select_api_key(available)
+                api_key.calls.append(now)
+                break
+            available_at = min(api_key.get_available_at(now) for api_key in pool)
+        if not blocking:
+            return None
+        if available_at > deadline:
+            logger.error(
+                "No Geocoding API key available",
+                value={"wait_seconds": str(round(available_at - now))},
+            )
+            raise ApiKeysExhaustedError("No Geocoding API key available")
+        time.sleep(available_at - now)
+    if len(pool) > 1:
+        increment_counter(f"geocoding_key_calls.{api_key.label}")
+    return api_key
+
+
+def _select_api_key(available):
+    """Returns the next key by smooth weighted round-robin, which interleaves
+    the keys instead of sending bursts to the heaviest one. Must hold _lock"""
+    total_weight = sum(api_key.weight for api_key in available)
+    for api_key in available:
+        api_key.current_weight += api_key.weight
+    selected = max(available, key=lambda api_key: api_key.current_weight)
+    selected.current_weight -= total_weight
+    return selected
+
+
+def report_api_key_success(api_key):
+    """Clears the throttling strikes of a key"""
+    with _lock:
+        api_key.strikes = 0
+
+
+def report_api_key_failure(api_key, status, retry_after=None):
+    """Cools a key down after a 429, for GOOGLE_API_KEY_COOLDOWN_SECONDS
+    doubling with each consecutive 429, or after a 403, for
+    GOOGLE_API_KEY_MAX_COOLDOWN_SECONDS. A single key isn't cooled down as the
+    retry wait already backs off"""
+    if status == 429:
+        increment_counter(f"geocoding_key_throttled.{api_key.label}")
+    elif status == 403:
+        increment_counter(f"geocoding_key_forbidden.{api_key.label}")
+    else:
+        return
+    now = time.monotonic()
+    with _lock:
+        # the concurrent calls failing with a key only count once
+        if len(_pool) < 2 or api_key.cooldown_until > now:
+            return
+        api_key.strikes += 1
+        if status == 429:
+            cooldown = max(
+                Config.GOOGLE_API_KEY_COOLDOWN_SECONDS * 2 ** (api_key.strikes - 1),
+                retry_after or 0,
+            )
+        else:
+            cooldown = Config.GOOGLE_API_KEY_MAX_COOLDOWN_SECONDS
+        cooldown = min(cooldown, Config.GOOGLE_API_KEY_MAX_COOLDOWN_SECONDS)
+        api_key.cooldown_until = now + cooldown
+    logger.warn(
+        "Cooling down Geocoding API key",
+        value={
+            "api_key": api_key.label,
+            "status": str(status),
+            "cooldown_seconds": str(round(cooldown)),
+        },
+    )
@@ -0,0 +1,63 @@
+"""Module that detects whether a geocoding result changes what is stored, so
+unchanged GPs are neither rewritten nor reindexed by the search indexer"""
+
+import hashlib
+import json
+
+from sqlalchemy import select
+
+from app.config import Config
+from app.geohash import get_distance
+from app.metrics import increment_counter
+from app.models import GivingPartnerOutlines, GivingPartners
+
+UNLOCATED = (-1, -1)
+
+
+def get_outlines_hash(outlines):
+    """Returns the content hash of a list of displayPolygon objects"""
+    return hashlib.sha256(
+        json.dumps(outlines, sort_keys=True, separators=(",", ":")).encode()
+    ).hexdigest()
+
+
+def get_stored_state(session, giving_partner_id):
+    """Returns the stored (latitude, longitude, outlines hash) of a GP, or None"""
+    return session.execute(
+        select(
+            GivingPartners.donee_lat,
+            GivingPartners.donee_lon,
+            GivingPartnerOutlines.outlines_hash,
+        )
+        .outerjoin(
+            GivingPartnerOutlines,
+            GivingPartnerOutlines.giving_partner_id == GivingPartners.donee_id,
+        )
+        .where(GivingPartners.donee_id == giving_partner_id)
+    ).one_or_none()
+
+
+def coordinates_changed(stored, new):
+    """Returns whether new (latitude, longitude) differ from the stored ones by
+    more than CHANGE_COORDINATE_TOLERANCE_METERS"""
+    stored, new = tuple(stored), tuple(new)
+    # 0 is the coordinate of the GPs never geocoded
+    if stored[0] == 0 or (stored == UNLOCATED) != (new == UNLOCATED):
+        return True
+    return (
+        new != UNLOCATED
+        and get_distance(*stored, *new) > Config.CHANGE_COORDINATE_TOLERANCE_METERS
+    )
+
+
+def has_changed(session, giving_partner_id, coordinates=None, outlines=None):
+    """Returns whether the coordinates or the (non-empty) outlines of a GP
+    differ from the stored ones, counting changed and unchanged GPs"""
+    stored = get_stored_state(session, giving_partner_id)
+    changed = (
+        stored is None
+        or (coordinates is not None and coordinates_changed(stored[:2], coordinates))
+        or (bool(outlines) and get_outlines_hash(outlines) != stored[2])
+    )
+    increment_counter("writes_changed" if changed else "writes_unchanged")
+    return changed
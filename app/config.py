@@ -8,6 +8,8 @@ import sys
 from dotenv import load_dotenv
 from givelifylogging import StructuredLogger as slogger
 
+from app.log_handlers import SamplingFilter, get_queue_handler
+
 load_dotenv()
 
 
@@ -19,22 +21,276 @@ class Config:
     PLATFORM_DB_USERNAME = os.getenv("PLATFORM_DB_USERNAME")
     PLATFORM_DB_PASSWORD = os.getenv("PLATFORM_DB_PASSWORD")
     PLATFORM_DB_DATABASE = os.getenv("PLATFORM_DB_DATABASE")
+    # optional read replica of the platform and mono schemas
+    PLATFORM_DB_HOST_READ = os.getenv("PLATFORM_DB_HOST_READ")
+    PLATFORM_DB_PORT_READ = os.getenv("PLATFORM_DB_PORT_READ", PLATFORM_DB_PORT)
+
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in (
+        "true",
+        "1",
+        "yes",
+        "y",
+    )
 
     MONO_DB_DATABASE = os.getenv("MONO_DB_DATABASE")
 
     GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+    # pool of key[:weight[:calls per minute]] entries used instead of the key
+    # above, see app.api_keys
+    GOOGLE_API_KEYS = [
+        entry.strip()
+        for entry in os.getenv("GOOGLE_API_KEYS", "").split(",")
+        if entry.strip()
+    ]
+    # default calls per minute of a key, 0 for no limit
+    GOOGLE_API_KEY_RATE_LIMIT = int(os.getenv("GOOGLE_API_KEY_RATE_LIMIT", "0"))
+    # cooldown of a pooled key after a 429, doubling with consecutive 429s up
+    # to the max, which is also the cooldown after a 403
+    GOOGLE_API_KEY_COOLDOWN_SECONDS = float(
+        os.getenv("GOOGLE_API_KEY_COOLDOWN_SECONDS", "30")
+    )
+    GOOGLE_API_KEY_MAX_COOLDOWN_SECONDS = float(
+        os.getenv("GOOGLE_API_KEY_MAX_COOLDOWN_SECONDS", "900")
+    )
+    # how long a call waits for a key before the run stops
+    GOOGLE_API_KEY_MAX_WAIT_SECONDS = float(
+        os.getenv("GOOGLE_API_KEY_MAX_WAIT_SECONDS", "60")
+    )
+    GOOGLE_GEOCODING_BASE_URL = os.getenv(
+        "GOOGLE_GEOCODING_BASE_URL", "https://geocode.googleapis.com"
+    ).rstrip("/")
+    GEOCODING_RETRY_ATTEMPTS = int(os.getenv("GEOCODING_RETRY_ATTEMPTS", "3"))
+    GEOCODING_RETRY_MIN_WAIT = float(os.getenv("GEOCODING_RETRY_MIN_WAIT", "5"))
+    GEOCODING_RETRY_MAX_WAIT = float(os.getenv("GEOCODING_RETRY_MAX_WAIT", "10"))
+    # flat timeout, and the upper bound of the adaptive timeouts
+    GEOCODING_TIMEOUT_SECONDS = float(os.getenv("GEOCODING_TIMEOUT_SECONDS", "30"))
+    # adaptive timeouts are the p99 latency times the multiplier, at least the min
+    GEOCODING_ADAPTIVE_TIMEOUT_ENABLED = os.getenv(
+        "GEOCODING_ADAPTIVE_TIMEOUT_ENABLED", "false"
+    ).lower() in ("true", "1", "yes", "y")
+    GEOCODING_TIMEOUT_MIN_SECONDS = float(
+        os.getenv("GEOCODING_TIMEOUT_MIN_SECONDS", "5")
+    )
+    GEOCODING_TIMEOUT_P99_MULTIPLIER = float(
+        os.getenv("GEOCODING_TIMEOUT_P99_MULTIPLIER", "3")
+    )
+    # percentiles are computed over the last window successful calls
+    GEOCODING_LATENCY_WINDOW = int(os.getenv("GEOCODING_LATENCY_WINDOW", "500"))
+    GEOCODING_LATENCY_MIN_SAMPLES = int(
+        os.getenv("GEOCODING_LATENCY_MIN_SAMPLES", "50")
+    )
+    # a duplicate call is sent once the hedge percentile latency has elapsed,
+    # for at most the max ratio of the calls
+    GEOCODING_HEDGING_ENABLED = os.getenv(
+        "GEOCODING_HEDGING_ENABLED", "false"
+    ).lower() in ("true", "1", "yes", "y")
+    GEOCODING_HEDGE_PERCENTILE = float(os.getenv("GEOCODING_HEDGE_PERCENTILE", "0.95"))
+    GEOCODING_HEDGE_MAX_RATIO = float(os.getenv("GEOCODING_HEDGE_MAX_RATIO", "0.05"))
 
     GP_IDS = os.getenv("GP_IDS") or ""
 
+    # no new GP is started after this many seconds, 0 for no deadline
+    MAX_RUNTIME_SECONDS = float(os.getenv("MAX_RUNTIME_SECONDS", "0"))
+
+    # write a geocoding_run_history row per run, see app.run_history
+    RUN_HISTORY_ENABLED = os.getenv("RUN_HISTORY_ENABLED", "false").lower() in (
+        "true",
+        "1",
+        "yes",
+        "y",
+    )
+    # the regression check compares the latest run of a job with the median of
+    # its previous runs, ignoring runs of fewer GPs than the min
+    RUN_HISTORY_BASELINE_RUNS = int(os.getenv("RUN_HISTORY_BASELINE_RUNS", "7"))
+    RUN_HISTORY_MIN_GPS = int(os.getenv("RUN_HISTORY_MIN_GPS", "100"))
+    RUN_HISTORY_MAX_THROUGHPUT_DROP = float(
+        os.getenv("RUN_HISTORY_MAX_THROUGHPUT_DROP", "0.2")
+    )
+    RUN_HISTORY_MAX_LATENCY_INCREASE = float(
+        os.getenv("RUN_HISTORY_MAX_LATENCY_INCREASE", "0.5")
+    )
+
+    # skip the writes and search-sync events of GPs whose coordinates (within
+    # the tolerance) and outlines are already stored
+    CHANGE_DETECTION_ENABLED = os.getenv(
+        "CHANGE_DETECTION_ENABLED", "false"
+    ).lower() in ("true", "1", "yes", "y")
+    CHANGE_COORDINATE_TOLERANCE_METERS = float(
+        os.getenv("CHANGE_COORDINATE_TOLERANCE_METERS", "1")
+    )
+
+    # what the unified runner stores from each Geocoding API response
+    GEOCODING_TARGETS = [
+        target.strip().lower()
+        for target in os.getenv(
+            "GEOCODING_TARGETS", "coordinates,outlines,search_sync"
+        ).split(",")
+        if target.strip()
+    ]
+
     DAILY_ITERATION_LIMIT = int(os.getenv("DAILY_ITERATION_LIMIT", "1"))
     DONEE_GEOCODER_ENABLE_OUTLINES = os.getenv(
         "DONEE_GEOCODER_ENABLE_OUTLINES", "false"
     ).lower() in ("true", "1", "yes", "y")
 
+    # Geocoding API quota ledger shared by every job through the database.
+    # The soft limit caps the GPs a run picks up, the hard limit caps API calls
+    QUOTA_ENABLED = os.getenv("QUOTA_ENABLED", "false").lower() in (
+        "true",
+        "1",
+        "yes",
+        "y",
+    )
+    QUOTA_SOFT_LIMIT = int(os.getenv("QUOTA_SOFT_LIMIT", "9000"))
+    QUOTA_HARD_LIMIT = int(os.getenv("QUOTA_HARD_LIMIT", "10000"))
+    QUOTA_WINDOW_HOURS = int(os.getenv("QUOTA_WINDOW_HOURS", "24"))
+    # Google daily quotas reset at midnight Pacific time
+    QUOTA_WINDOW_OFFSET_HOURS = int(os.getenv("QUOTA_WINDOW_OFFSET_HOURS", "-8"))
+    # calls each process reserves in the ledger at once
+    QUOTA_RESERVATION_SIZE = int(os.getenv("QUOTA_RESERVATION_SIZE", "10"))
+    QUOTA_PACING_ENABLED = os.getenv("QUOTA_PACING_ENABLED", "true").lower() in (
+        "true",
+        "1",
+        "yes",
+        "y",
+    )
+
+    PROCESS_POOL_ENABLED = os.getenv("PROCESS_POOL_ENABLED", "false").lower() in (
+        "true",
+        "1",
+        "yes",
+        "y",
+    )
+    # 0 sizes the pool by core count
+    PROCESS_POOL_WORKERS = int(os.getenv("PROCESS_POOL_WORKERS", "0"))
+    # GPs geocoded at once while the pool processes their outlines
+    PROCESS_POOL_GEOCODING_THREADS = int(
+        os.getenv("PROCESS_POOL_GEOCODING_THREADS", "4")
+    )
+
+    GEOCODING_QUEUE_ENABLED = os.getenv("GEOCODING_QUEUE_ENABLED", "false").lower() in (
+        "true",
+        "1",
+        "yes",
+        "y",
+    )
+    GEOCODING_QUEUE_RETRY_MINUTES = int(
+        os.getenv("GEOCODING_QUEUE_RETRY_MINUTES", "60")
+    )
+
+    GEOHASH_INDEX_ENABLED = os.getenv("GEOHASH_INDEX_ENABLED", "false").lower() in (
+        "true",
+        "1",
+        "yes",
+        "y",
+    )
+    GEOHASH_REBUILD_BATCH_SIZE = int(os.getenv("GEOHASH_REBUILD_BATCH_SIZE", "5000"))
+    # precision 9 cells are ~5m wide
+    GEOHASH_DUPLICATE_PRECISION = int(os.getenv("GEOHASH_DUPLICATE_PRECISION", "9"))
+
+    ZIP_CENTROID_FALLBACK_ENABLED = os.getenv(
+        "ZIP_CENTROID_FALLBACK_ENABLED", "false"
+    ).lower() in ("true", "1", "yes", "y")
+    ZIP_CENTROID_SOURCE_PATH = os.getenv(
+        "ZIP_CENTROID_SOURCE_PATH", "zip_centroids.csv"
+    )
+    ZIP_CENTROID_INDEX_PATH = os.getenv("ZIP_CENTROID_INDEX_PATH", "zip_centroids.idx")
+    # without the queue, GPs at their ZIP centroid are geocoded again this long
+    # after their last attempt
+    ZIP_CENTROID_RETRY_HOURS = int(os.getenv("ZIP_CENTROID_RETRY_HOURS", "24"))
+
+    GEOCODING_ARCHIVE_MODE = os.getenv("GEOCODING_ARCHIVE_MODE", "off").lower()
+    GEOCODING_ARCHIVE_PATH = os.getenv(
+        "GEOCODING_ARCHIVE_PATH", "geocoding_archive.sqlite3"
+    )
+
+    # json or compact, see app.outline_encoding
+    OUTLINES_STORAGE_FORMAT = os.getenv("OUTLINES_STORAGE_FORMAT", "json").lower()
+    # set once the outlines_compact column is migrated, implied by the compact
+    # format. Without it outline writes leave the column alone
+    OUTLINES_COMPACT_COLUMN_ENABLED = os.getenv(
+        "OUTLINES_COMPACT_COLUMN_ENABLED", "false"
+    ).lower() in ("true", "1", "yes", "y")
+    OUTLINES_CONVERT_BATCH_SIZE = int(os.getenv("OUTLINES_CONVERT_BATCH_SIZE", "1000"))
+    # set once the giving_partner_outline_metrics table is migrated
+    OUTLINE_METRICS_ENABLED = os.getenv("OUTLINE_METRICS_ENABLED", "false").lower() in (
+        "true",
+        "1",
+        "yes",
+        "y",
+    )
+
+    SERVICE_HOST = os.getenv("SERVICE_HOST", "0.0.0.0")
+    SERVICE_PORT = int(os.getenv("SERVICE_PORT", "8080"))
+    SERVICE_CACHE_SIZE = int(os.getenv("SERVICE_CACHE_SIZE", "10000"))
+    SERVICE_CACHE_TTL_SECONDS = int(os.getenv("SERVICE_CACHE_TTL_SECONDS", "86400"))
+    # concurrent upstream calls, and how long a request waits for a free slot
+    SERVICE_UPSTREAM_CONCURRENCY = int(os.getenv("SERVICE_UPSTREAM_CONCURRENCY", "4"))
+    SERVICE_UPSTREAM_WAIT_SECONDS = float(
+        os.getenv("SERVICE_UPSTREAM_WAIT_SECONDS", "10")
+    )
+    # serve from and record to the response archive at GEOCODING_ARCHIVE_PATH
+    SERVICE_PERSISTENT_CACHE_ENABLED = os.getenv(
+        "SERVICE_PERSISTENT_CACHE_ENABLED", "false"
+    ).lower() in ("true", "1", "yes", "y")
+
+    BULK_INPUT_PATH = os.getenv("BULK_INPUT_PATH", "gps.csv")
+    BULK_OUTPUT_PATH = os.getenv("BULK_OUTPUT_PATH", "google_data.jsonl")
+    BULK_WORKERS = int(os.getenv("BULK_WORKERS", "4"))
+    BULK_LOAD_BATCH_SIZE = int(os.getenv("BULK_LOAD_BATCH_SIZE", "1000"))
+
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_ASYNC_ENABLED = os.getenv("LOG_ASYNC_ENABLED", "false").lower() in (
+        "true",
+        "1",
+        "yes",
+        "y",
+    )
+    # per-GP success lines, kept 1 in LOG_SAMPLE_RATE (0 drops them all)
+    LOG_SAMPLED_MESSAGES = [
+        message.strip()
+        for message in os.getenv(
+            "LOG_SAMPLED_MESSAGES",
+            "Processing location and outline for giving partner,"
+            "Processing outline for giving partner,"
+            "Processing giving partner,"
+            "Skipping unchanged giving partner,"
+            "Inserting outlines for giving partner,"
+            "Succesfully inserted google data for Giving Partner,"
+            "Succesfully inserted google outline data for Giving Partner,"
+            "Published SNS message for giving_partner",
+        ).split(",")
+        if message.strip()
+    ]
+    LOG_SAMPLE_RATE = int(os.getenv("LOG_SAMPLE_RATE", "1"))
+    # GPs between progress summaries, 0 only logs the final summary
+    LOG_PROGRESS_INTERVAL = int(os.getenv("LOG_PROGRESS_INTERVAL", "0"))
+
     stdout_handler = logging.StreamHandler(sys.stdout)
+    log_handler = (
+        get_queue_handler(stdout_handler) if LOG_ASYNC_ENABLED else stdout_handler
+    )
+    log_handler.addFilter(SamplingFilter(LOG_SAMPLED_MESSAGES, LOG_SAMPLE_RATE))
     logger = slogger.StructuredLogger.getLogger(
-        "google-locations", LOG_LEVEL, stdout_handler
+        "google-locations", LOG_LEVEL, log_handler
     )
 
+    TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() in (
+        "true",
+        "1",
+        "yes",
+        "y",
+    )
+    # otlp or file
+    TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "otlp")
+    TRACING_FILE_PATH = os.getenv("TRACING_FILE_PATH", "spans.jsonl")
+
     AWS_SNS_TOPIC = os.getenv("AWS_SNS_TOPIC")
+    SEARCH_SYNC_OUTBOX_ENABLED = os.getenv(
+        "SEARCH_SYNC_OUTBOX_ENABLED", "false"
+    ).lower() in ("true", "1", "yes", "y")
+    SEARCH_SYNC_RELAY_BATCH_SIZE = int(os.getenv("SEARCH_SYNC_RELAY_BATCH_SIZE", "100"))
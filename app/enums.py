@@ -8,3 +8,26 @@ class FilterType(Enum):
 
     LOCATION_AND_OUTLINES = auto()
     OUTLINES_ONLY = auto()
+
+
+class ArchiveMode(Enum):
+    """Geocoding API response archive mode"""
+
+    OFF = "off"
+    RECORD = "record"
+    REPLAY = "replay"
+
+
+class CoordinateSource(Enum):
+    """Source of the coordinates of a giving partner"""
+
+    GOOGLE = "google"
+    ZIP_CENTROID = "zip_centroid"
+
+
+class ResponseProfile(Enum):
+    """Geocoding API response fields requested by a caller"""
+
+    LOCATION = "location"
+    OUTLINES = "outlines"
+    FULL = "full"
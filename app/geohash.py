@@ -0,0 +1,145 @@
+"""Module that contains the geohash encoding and the nearby-point queries
+run against the giving_partner_geohashes table.
+
+A geohash interleaves the bits of the longitude and latitude, so points
+sharing a prefix share a cell and a cell query is a prefix range scan"""
+
+import math
+
+import numpy as np
+
+from app.geometry import EARTH_RADIUS
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 12
+# bits of longitude and latitude in a full precision geohash
+COORDINATE_BITS = GEOHASH_PRECISION * 5 // 2
+MAX_QUERY_CELLS = 9
+
+
+def _spread_bits(values):
+    """Inserts a zero bit between the 30 low bits of values (ints or uint64)"""
+    values &= 0x3FFFFFFF
+    values = (values | (values << 16)) & 0x0000FFFF0000FFFF
+    values = (values | (values << 8)) & 0x00FF00FF00FF00FF
+    values = (values | (values << 4)) & 0x0F0F0F0F0F0F0F0F
+    values = (values | (values << 2)) & 0x3333333333333333
+    return (values | (values << 1)) & 0x5555555555555555
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Returns the geohash of a point"""
+    scale = 1 << COORDINATE_BITS
+    lat_bits = min(int((latitude + 90) / 180 * scale), scale - 1)
+    lon_bits = min(int((longitude + 180) / 360 * scale), scale - 1)
+    code = (_spread_bits(lon_bits) << 1) | _spread_bits(lat_bits)
+    return "".join(
+        BASE32[(code >> (5 * (GEOHASH_PRECISION - 1 - i))) & 31]
+        for i in range(precision)
+    )
+
+
+def encode_geohashes(latitudes, longitudes):
+    """Returns the full precision geohashes of arrays of points as an S12 array"""
+    scale = 1 << COORDINATE_BITS
+    lat_bits = np.clip(
+        ((np.asarray(latitudes, dtype=float) + 90) / 180 * scale).astype(np.uint64),
+        0,
+        scale - 1,
+    )
+    lon_bits = np.clip(
+        ((np.asarray(longitudes, dtype=float) + 180) / 360 * scale).astype(np.uint64),
+        0,
+        scale - 1,
+    )
+    codes = (_spread_bits(lon_bits) << np.uint64(1)) | _spread_bits(lat_bits)
+    shifts = np.arange(GEOHASH_PRECISION - 1, -1, -1, dtype=np.uint64) * np.uint64(5)
+    digits = (codes[:, None] >> shifts) & np.uint64(31)
+    characters = np.frombuffer(BASE32.encode(), dtype=np.uint8)[digits]
+    return np.ascontiguousarray(characters).view(f"S{GEOHASH_PRECISION}").ravel()
+
+
+def get_cell_size(precision):
+    """Returns the (height, width) in degrees of the cells of a precision"""
+    return 180 / (1 << (precision * 5 // 2)), 360 / (1 << ((precision * 5 + 1) // 2))
+
+
+def _cell_ranges(min_lat, max_lat, min_lon, max_lon, precision):
+    """Returns the row and column index ranges of the cells covering a box"""
+    height, width = get_cell_size(precision)
+    rows = range(
+        int((max(min_lat, -90) + 90) // height),
+        int((min(max_lat, 90) + 90) // height) + 1,
+    )
+    columns = range(int((min_lon + 180) // width), int((max_lon + 180) // width) + 1)
+    return rows, columns
+
+
+def get_covering_cells(latitude, longitude, radius):
+    """Returns the geohash cells, of the finest precision needing at most
+    MAX_QUERY_CELLS, that cover every point within radius meters"""
+    lat_radius = math.degrees(radius / EARTH_RADIUS)
+    lon_radius = min(lat_radius / max(math.cos(math.radians(latitude)), 1e-9), 180)
+    box = (
+        latitude - lat_radius,
+        latitude + lat_radius,
+        longitude - lon_radius,
+        longitude + lon_radius,
+    )
+
+    cells = [""]
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        rows, columns = _cell_ranges(*box, precision)
+        if len(rows) * len(columns) > MAX_QUERY_CELLS:
+            break
+        height, width = get_cell_size(precision)
+        cells = sorted(
+            {
+                encode_geohash(
+                    -90 + (row + 0.5) * height,
+                    # wrap around the antimeridian
+                    (-180 + (column + 0.5) * width + 180) % 360 - 180,
+                    precision,
+                )
+                for row in rows
+                for column in columns
+            }
+        )
+    return cells
+
+
+def get_distance(lat1, lon1, lat2, lon2):
+    """Returns the great-circle (haversine) distance in meters"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    half_chord = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(half_chord)))
+
+
+def query_radius(fetch_candidates, latitude, longitude, radius):
+    """Returns the (id, distance) of the points within radius meters, nearest
+    first. fetch_candidates(cells) yields the (id, latitude, longitude) of the
+    points in the geohash cells"""
+    results = []
+    for point_id, point_lat, point_lon in fetch_candidates(
+        get_covering_cells(latitude, longitude, radius)
+    ):
+        distance = get_distance(latitude, longitude, point_lat, point_lon)
+        if distance <= radius:
+            results.append((point_id, distance))
+    return sorted(results, key=lambda result: result[1])
+
+
+def query_nearest(
+    fetch_candidates, latitude, longitude, count, max_radius, initial_radius=100
+):
+    """Returns the (id, distance) of the count nearest points within
+    max_radius meters, searching growing radiuses so only nearby cells are read"""
+    radius = min(initial_radius, max_radius)
+    while True:
+        results = query_radius(fetch_candidates, latitude, longitude, radius)
+        if len(results) >= count or radius >= max_radius:
+            return results[:count]
+        radius = min(radius * 4, max_radius)
@@ -0,0 +1,106 @@
+"""Module that contains geometry helpers for the building outlines"""
+
+import math
+
+# Mean earth radius in meters
+EARTH_RADIUS = 6371008.8
+
+
+def iter_polygons(outlines):
+    """Yields the rings of every polygon of a list of displayPolygon objects.
+    Each polygon is a list of rings, the first one being the exterior ring"""
+    for outline in outlines or []:
+        if not isinstance(outline, dict):
+            continue
+        if outline.get("type") == "Polygon":
+            yield outline.get("coordinates") or []
+        elif outline.get("type") == "MultiPolygon":
+            yield from outline.get("coordinates") or []
+
+
+def project_ring(ring, origin_lat, origin_lon):
+    """Projects a [lon, lat] ring to local equirectangular meters around origin"""
+    cos_lat = math.cos(math.radians(origin_lat))
+    return [
+        (
+            math.radians(lon - origin_lon) * EARTH_RADIUS * cos_lat,
+            math.radians(lat - origin_lat) * EARTH_RADIUS,
+        )
+        for lon, lat in ring
+    ]
+
+
+def ring_area_and_centroid(points):
+    """Returns the signed area and the centroid of a projected ring (shoelace)"""
+    area = cx = cy = 0.0
+    for (x1, y1), (x2, y2) in zip(points, points[1:] + points[:1]):
+        cross = x1 * y2 - x2 * y1
+        area += cross
+        cx += (x1 + x2) * cross
+        cy += (y1 + y2) * cross
+    area /= 2
+    if area == 0:
+        return 0.0, None
+    return area, (cx / (6 * area), cy / (6 * area))
+
+
+def is_valid_ring(ring):
+    """Returns whether a ring is closed, has at least 3 distinct vertices and
+    only holds valid coordinates"""
+    return (
+        len(ring) >= 4
+        and ring[0] == ring[-1]
+        and len({tuple(point) for point in ring}) >= 3
+        and all(-180 <= lon <= 180 and -90 <= lat <= 90 for lon, lat in ring)
+    )
+
+
+def compute_outline_metrics(outlines):
+    """Returns the bbox, centroid, area (m2), vertex count, polygon count and
+    validity of a list of displayPolygon objects, or None without vertices"""
+    polygons = list(iter_polygons(outlines))
+    points = [point for rings in polygons for ring in rings for point in ring]
+    if not points:
+        return None
+
+    lons = [lon for lon, _ in points]
+    lats = [lat for _, lat in points]
+    origin_lat, origin_lon = sum(lats) / len(lats), sum(lons) / len(lons)
+
+    area = weighted_x = weighted_y = 0.0
+    is_valid = True
+    for rings in polygons:
+        for i, ring in enumerate(rings):
+            is_valid = is_valid and is_valid_ring(ring)
+            ring_area, centroid = ring_area_and_centroid(
+                project_ring(ring, origin_lat, origin_lon)
+            )
+            if centroid is None:
+                continue
+            # holes are subtracted from their exterior ring
+            ring_area = abs(ring_area) if i == 0 else -abs(ring_area)
+            area += ring_area
+            weighted_x += centroid[0] * ring_area
+            weighted_y += centroid[1] * ring_area
+
+    centroid_lat, centroid_lon = origin_lat, origin_lon
+    if area > 0:
+        centroid_lat += math.degrees(weighted_y / area / EARTH_RADIUS)
+        centroid_lon += math.degrees(
+            weighted_x / area / EARTH_RADIUS / math.cos(math.radians(origin_lat))
+        )
+    else:
+        is_valid = False
+
+    return {
+        "min_lat": min(lats),
+        "min_lon": min(lons),
+        "max_lat": max(lats),
+        "max_lon": max(lons),
+        "centroid_lat": centroid_lat,
+        "centroid_lon": centroid_lon,
+        "area": area,
+        "vertex_count": len(points),
+        "polygon_count": len(polygons),
+        "is_valid": is_valid,
+    }
@@ -1,61 +1,195 @@
 """json module for parsing the google API responses"""
 
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from functools import partial
+
 import requests
 from requests.exceptions import RequestException
 from tenacity import (
     retry,
-    retry_if_exception_type,
+    retry_if_exception,
     stop_after_attempt,
     wait_exponential,
 )
 
+from app.api_keys import (
+    acquire_api_key,
+    get_api_key_count,
+    is_api_key_available,
+    report_api_key_failure,
+    report_api_key_success,
+)
 from app.config import Config
+from app.enums import ArchiveMode, ResponseProfile
+from app.latency import get_hedge_delay, get_timeout, record_latency, take_hedge_budget
+from app.metrics import increment_counter
+from app.quota import QuotaExceededError, consume_geocoding_call
+from app.response_archive import record_response, replay_response
+from app.tracing import traced
 
 logger = Config.logger
 
+# runs the hedged calls and their slower duplicates until they time out, so
+# it must not be smaller than the concurrent calls of a job
+HEDGE_EXECUTOR_WORKERS = 64
+
+# the hedge executor, started on the first hedged call
+_hedge_state = {"lock": threading.Lock(), "executor": None}
+
+FIELD_MASKS = {
+    ResponseProfile.LOCATION: "destinations.primary.location",
+    # building polygons are also found in the containing places
+    ResponseProfile.OUTLINES: (
+        "destinations.primary.structureType,destinations.primary.displayPolygon,"
+        "destinations.containingPlaces"
+    ),
+    ResponseProfile.FULL: (
+        "destinations.primary.place,destinations.primary.location,"
+        "destinations.primary.structureType,destinations.primary.displayPolygon,"
+        "destinations.containingPlaces"
+    ),
+}
+
+
+def _get_hedge_executor():
+    """Returns the hedge executor, starting it on first use"""
+    with _hedge_state["lock"]:
+        if _hedge_state["executor"] is None:
+            _hedge_state["executor"] = ThreadPoolExecutor(
+                max_workers=HEDGE_EXECUTOR_WORKERS,
+                thread_name_prefix="geocoding-hedge",
+            )
+        return _hedge_state["executor"]
+
+
+def shutdown_hedge_executor():
+    """Stops the hedge executor without waiting for the slower calls, which
+    end at their timeout. A later hedged call starts a new one"""
+    with _hedge_state["lock"]:
+        executor, _hedge_state["executor"] = _hedge_state["executor"], None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _forget_hedge_executor():
+    """Drops the hedge executor of the parent in a forked child, whose copy
+    has no threads and maybe a held lock"""
+    _hedge_state.update(lock=threading.Lock(), executor=None)
+
+
+os.register_at_fork(after_in_child=_forget_hedge_executor)
+
 
 def is_retryable(exception):
-    """function that returns whether the google api call error is a 429 error
-    so that the call could be retried"""
-    return (
-        isinstance(exception, RequestException)
-        and getattr(exception, "response", None) is not None
-        and exception.response.status_code == 429
+    """function that returns whether the google api call error is a 429 error,
+    or a 403 error another pooled key may not get, so that the call could be
+    retried. Timeouts are retried with adaptive timeouts, which cut off slow
+    but healthy calls"""
+    if isinstance(exception, requests.Timeout):
+        return Config.GEOCODING_ADAPTIVE_TIMEOUT_ENABLED
+    if (
+        not isinstance(exception, RequestException)
+        or getattr(exception, "response", None) is None
+    ):
+        return False
+    status = exception.response.status_code
+    return status == 429 or (status == 403 and get_api_key_count() > 1)
+
+
+def get_response_profile():
+    """Returns the response profile of the donee_geocoder, which only needs the
+    outlines when they are stored"""
+    if Config.DONEE_GEOCODER_ENABLE_OUTLINES:
+        return ResponseProfile.FULL
+    return ResponseProfile.LOCATION
+
+
+def wait_retry_after(retry_state):
+    """Waits the Retry-After seconds of a 429 response, capped at the max wait,
+    or backs off exponentially without one. Retries right away when another
+    pooled key is available"""
+    if get_api_key_count() > 1 and is_api_key_available():
+        return 0
+    retry_after = get_retry_after(
+        getattr(retry_state.outcome.exception(), "response", None)
     )
+    if retry_after is not None:
+        return min(retry_after, Config.GEOCODING_RETRY_MAX_WAIT)
+    return wait_exponential(
+        multiplier=1,
+        min=Config.GEOCODING_RETRY_MIN_WAIT,
+        max=Config.GEOCODING_RETRY_MAX_WAIT,
+    )(retry_state)
 
 
-def geocoding_api_address(address, city, state, zipcode, country):
-    """Function calling text search API"""
-    data = {
+def get_retry_after(response):
+    """Returns the Retry-After seconds of a response, or None"""
+    try:
+        return float(response.headers["Retry-After"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
+def get_address_query(address, city, state, zipcode, country):
+    """Returns the Geocoding API request body of an address"""
+    return {
         "addressQuery": {
             "addressQuery": f"{address}, {city}, {state} {zipcode}, {country}"
         }
     }
-    return _call_geocoding_api(data)
+
+
+@traced("geocoding_api_address")
+def geocoding_api_address(
+    address, city, state, zipcode, country, profile=ResponseProfile.FULL
+):
+    """Function calling text search API"""
+    data = get_address_query(address, city, state, zipcode, country)
+    archive_mode = ArchiveMode(Config.GEOCODING_ARCHIVE_MODE)
+    if archive_mode == ArchiveMode.REPLAY:
+        response = replay_response(data)
+        increment_counter("api_cache_hits")
+        return response
+
+    if archive_mode == ArchiveMode.RECORD:
+        # recordings keep every field so any extraction can be replayed
+        response = _call_geocoding_api(data, ResponseProfile.FULL)
+        record_response(data, response)
+        return response
+    return _call_geocoding_api(data, profile)
 
 
 @retry(
-    wait=wait_exponential(multiplier=1, min=5, max=10),
-    stop=stop_after_attempt(3),
-    retry=retry_if_exception_type(is_retryable),
+    wait=wait_retry_after,
+    stop=stop_after_attempt(Config.GEOCODING_RETRY_ATTEMPTS),
+    retry=retry_if_exception(is_retryable),
+    before_sleep=lambda _retry_state: increment_counter("api_retries"),
 )
-def _call_geocoding_api(data):
+@traced("geocoding_api_attempt")
+def _call_geocoding_api(data, profile=ResponseProfile.FULL):
     """Internal function to call the Google Geocoding API with given params."""
-    base_url = "https://geocode.googleapis.com/v4alpha/geocode/destinations"
+    api_key = acquire_api_key()
+    consume_geocoding_call()
+    increment_counter("api_calls")
+    base_url = f"{Config.GOOGLE_GEOCODING_BASE_URL}/v4alpha/geocode/destinations"
     headers = {
-        "X-Goog-Api-Key": Config.GOOGLE_API_KEY,
+        "X-Goog-Api-Key": api_key.value,
         "Content-Type": "application/json",
-        "X-Goog-FieldMask": "destinations.primary.place,destinations.primary.location,destinations.primary.structureType,destinations.primary.displayPolygon,destinations.containingPlaces",
+        "X-Goog-FieldMask": FIELD_MASKS[profile],
     }
     try:
-        response = requests.post(base_url, headers=headers, json=data, timeout=30)
-        response.raise_for_status()
+        response = _post(base_url, headers, data, api_key)
+        record_payload_size(response, profile)
         return response.json()
     except RequestException as e:
         params = {k: v for k, v in data.items() if k != "key"}
 
         if isinstance(e, requests.HTTPError) and e.response is not None:
             status = e.response.status_code
+            report_api_key_failure(api_key, status, get_retry_after(e.response))
 
             if status == 429:
                 logger.error(
@@ -75,3 +209,98 @@ def _call_geocoding_api(data):
 
         logger.error("Google Geocoding API call failed", value={"params": params})
         raise
+
+
+def _timed_post(url, headers, data, timeout):
+    """Posts a request, raising on error statuses, and records the latency of
+    the successful ones"""
+    started_at = time.perf_counter()
+    response = requests.post(url, headers=headers, json=data, timeout=timeout)
+    response.raise_for_status()
+    record_latency(time.perf_counter() - started_at)
+    return response
+
+
+def _post_hedge(url, headers, data, timeout, api_key):
+    """Posts a hedged request with its own key, reporting the key's health
+    since its failures never reach the caller"""
+    try:
+        response = _timed_post(
+            url, {**headers, "X-Goog-Api-Key": api_key.value}, data, timeout
+        )
+    except requests.HTTPError as e:
+        if e.response is not None:
+            report_api_key_failure(
+                api_key, e.response.status_code, get_retry_after(e.response)
+            )
+        raise
+    report_api_key_success(api_key)
+    return response
+
+
+def _report_abandoned_call(api_key, future):
+    """Reports the key's health from a call whose outcome never reaches the
+    caller, as the hedge won"""
+    if future.cancelled():
+        return
+    exception = future.exception()
+    if exception is None:
+        report_api_key_success(api_key)
+    elif isinstance(exception, requests.HTTPError) and exception.response is not None:
+        report_api_key_failure(
+            api_key,
+            exception.response.status_code,
+            get_retry_after(exception.response),
+        )
+
+
+def _post(url, headers, data, api_key):
+    """Posts a geocoding request with the current timeout. A request still
+    running after the hedge delay is duplicated, within the hedge budget and
+    with a key available right away, and the first successful response wins"""
+    timeout = get_timeout()
+    hedge_delay = get_hedge_delay()
+    if hedge_delay is None:
+        response = _timed_post(url, headers, data, timeout)
+        report_api_key_success(api_key)
+        return response
+
+    hedge_executor = _get_hedge_executor()
+    futures = [hedge_executor.submit(_timed_post, url, headers, data, timeout)]
+    if not wait(futures, timeout=hedge_delay).done and take_hedge_budget():
+        # the hedge never waits for a key, nor exceeds their rate limits
+        hedge_api_key = acquire_api_key(blocking=False)
+        if hedge_api_key is None:
+            increment_counter("geocoding_hedges_skipped")
+        else:
+            try:
+                consume_geocoding_call()
+                increment_counter("geocoding_hedged_requests")
+                futures.append(
+                    hedge_executor.submit(
+                        _post_hedge, url, headers, data, timeout, hedge_api_key
+                    )
+                )
+            except QuotaExceededError:
+                pass
+    for future in as_completed(futures):
+        if future.exception() is None:
+            if future is futures[0]:
+                report_api_key_success(api_key)
+            else:
+                increment_counter("geocoding_hedge_wins")
+                # run now if the call already failed, else once it ends
+                futures[0].add_done_callback(partial(_report_abandoned_call, api_key))
+            # requests can't abort the slower call, it ends at its timeout
+            return future.result()
+    return futures[0].result()
+
+
+def record_payload_size(response, profile):
+    """Counts the transferred (compressed) and decoded bytes of a response"""
+    decoded_bytes = len(response.content)
+    # Content-Length is the compressed size, absent on chunked responses
+    transferred_bytes = int(response.headers.get("Content-Length") or decoded_bytes)
+    increment_counter(f"geocoding_responses.{profile.value}")
+    increment_counter(f"geocoding_transferred_bytes.{profile.value}", transferred_bytes)
+    increment_counter(f"geocoding_decoded_bytes.{profile.value}", decoded_bytes)
@@ -1,27 +1,96 @@
 """Module that contains helper functions"""
 
-from sqlalchemy import select
+from sqlalchemy import delete, func, literal, literal_column, or_, select, update
+from sqlalchemy.dialects.mysql import insert
 from sqlalchemy.exc import SQLAlchemyError
 
+from app.change_detection import get_outlines_hash, has_changed
 from app.config import Config
-from app.models import GivingPartnerOutlines, GivingPartners
+from app.enums import CoordinateSource
+from app.geohash import encode_geohash
+from app.models import (
+    GIVING_PARTNER_ROW_COLUMNS,
+    GeocodingQueue,
+    GivingPartnerGeohash,
+    GivingPartnerLocationSource,
+    GivingPartnerOutlineMetrics,
+    GivingPartnerOutlines,
+    GivingPartnerRow,
+    GivingPartners,
+    SearchSyncOutbox,
+)
+from app.outline_encoding import get_outline_columns
+from app.quota import get_quota_status
+from app.tracing import traced
+from app.vector_geometry import compute_outline_metrics
+from app.zip_centroids import lookup_zip_centroid
 
 logger = Config.logger
 
+SEARCH_SYNC_EVENT_KEY = "search.giving-partner-search-sync-requested"
 
+COORDINATE_PRECISIONS = {
+    CoordinateSource.GOOGLE: "address",
+    CoordinateSource.ZIP_CENTROID: "postal_code",
+}
+
+
+def get_search_sync_message(giving_partner_id):
+    """Returns the SNS message that syncs the gp to search"""
+    return {"data": {"giving_partner_id": giving_partner_id, "operation": "update"}}
+
+
+def merge_outline_metrics(session, giving_partner_id, outlines, outline_metrics=None):
+    """Merges the geometry summary of the outlines, computing it unless given,
+    when OUTLINE_METRICS_ENABLED"""
+    if not Config.OUTLINE_METRICS_ENABLED:
+        return
+    if outline_metrics is None:
+        outline_metrics = compute_outline_metrics(outlines)
+    if outline_metrics is not None:
+        session.merge(
+            GivingPartnerOutlineMetrics(
+                giving_partner_id=giving_partner_id, **outline_metrics
+            )
+        )
+
+
+@traced("insert_google_data")
 def insert_google_data(
     session,
     giving_partner,
     latitude,
     longitude,
     outlines,
+    outline_metrics=None,
+    coordinate_source=CoordinateSource.GOOGLE,
+    with_outlines=None,
+    search_sync=True,
 ):
-    """Insert both location and outline data in a single transaction."""
+    """Insert both location and outline data in a single transaction. The
+    outlines are stored when with_outlines, which defaults to
+    DONEE_GEOCODER_ENABLE_OUTLINES, and the search-sync event is queued in the
+    outbox when search_sync. Returns False when change detection found
+    nothing to write"""
+    if with_outlines is None:
+        with_outlines = Config.DONEE_GEOCODER_ENABLE_OUTLINES
     try:
-        giving_partner.donee_lat = latitude
-        giving_partner.donee_lon = longitude
+        if coordinate_source == CoordinateSource.GOOGLE and skip_unchanged_data(
+            session,
+            giving_partner.donee_id,
+            (latitude, longitude),
+            outlines if with_outlines else None,
+        ):
+            return False
+
+        donee_info = GivingPartners.__table__
+        session.execute(
+            update(donee_info)
+            .where(donee_info.c.donee_id == giving_partner.donee_id)
+            .values(donee_lat=latitude, donee_lon=longitude)
+        )
 
-        if Config.DONEE_GEOCODER_ENABLE_OUTLINES:
+        if with_outlines:
             if outlines:
                 logger.info(
                     "Inserting outlines for giving partner",
@@ -29,11 +98,10 @@ def insert_google_data(
                         "giving_partner_id": str(giving_partner.donee_id),
                     },
                 )
-                gp_outline_data = GivingPartnerOutlines(
-                    giving_partner_id=giving_partner.donee_id,
-                    outlines=outlines,
+                upsert_outlines(session, giving_partner.donee_id, outlines)
+                merge_outline_metrics(
+                    session, giving_partner.donee_id, outlines, outline_metrics
                 )
-                session.merge(gp_outline_data)
             else:
                 logger.info(
                     "Unable to find outlines for giving partner",
@@ -42,6 +110,34 @@ def insert_google_data(
                     },
                 )
 
+        if Config.GEOHASH_INDEX_ENABLED:
+            update_geohash_index(
+                session, giving_partner.donee_id, latitude, longitude, coordinate_source
+            )
+
+        if search_sync:
+            add_search_sync_outbox(session, giving_partner.donee_id)
+
+        if Config.ZIP_CENTROID_FALLBACK_ENABLED:
+            session.merge(
+                GivingPartnerLocationSource(
+                    **get_location_source_values(
+                        giving_partner.donee_id, latitude, longitude, coordinate_source
+                    ),
+                    # also bumped when unchanged, it times the ZIP centroid retries
+                    updated_at=func.now(),
+                )
+            )
+
+        if Config.GEOCODING_QUEUE_ENABLED:
+            if coordinate_source == CoordinateSource.ZIP_CENTROID:
+                # keep approximate GPs queued so Google can refine them later
+                session.execute(
+                    get_reschedule_statement(giving_partner.donee_id, "approximate")
+                )
+            else:
+                session.execute(get_dequeue_statement(giving_partner.donee_id))
+
         session.commit()
         logger.info(
             "Succesfully inserted google data for Giving Partner",
@@ -49,6 +145,7 @@ def insert_google_data(
                 "giving_partner_id": str(giving_partner.donee_id),
             },
         )
+        return True
     except SQLAlchemyError:
         session.rollback()
         logger.error(
@@ -60,18 +157,120 @@ def insert_google_data(
         raise
 
 
+def get_location_source_values(
+    giving_partner_id, latitude, longitude, coordinate_source=CoordinateSource.GOOGLE
+):
+    """Returns the giving_partner_location_sources values of coordinates"""
+    located = (latitude, longitude) != (-1, -1)
+    return {
+        "giving_partner_id": giving_partner_id,
+        "source": coordinate_source.value,
+        "precision": COORDINATE_PRECISIONS[coordinate_source] if located else "none",
+    }
+
+
+def add_search_sync_outbox(session, giving_partner_id):
+    """Queues the search-sync event of a GP in the outbox, when enabled, so it
+    is committed with the GP writes"""
+    if Config.SEARCH_SYNC_OUTBOX_ENABLED:
+        session.add(
+            SearchSyncOutbox(
+                giving_partner_id=giving_partner_id,
+                message=get_search_sync_message(giving_partner_id),
+            )
+        )
+
+
+def get_outline_values(outlines):
+    """Returns the giving_partner_outlines column values of outlines. The hash
+    is only set with change detection, so its column may be unmigrated until
+    then"""
+    values = get_outline_columns(outlines)
+    if Config.CHANGE_DETECTION_ENABLED:
+        values["outlines_hash"] = get_outlines_hash(outlines)
+    return values
+
+
+def upsert_outlines(session, giving_partner_id, outlines):
+    """Inserts or updates the outlines of a GP, writing only the columns of
+    get_outline_values so the unmigrated optional columns are never touched"""
+    values = get_outline_values(outlines)
+    statement = insert(GivingPartnerOutlines).values(
+        giving_partner_id=giving_partner_id, **values
+    )
+    session.execute(
+        statement.on_duplicate_key_update(
+            {column: statement.inserted[column] for column in values}
+        )
+    )
+
+
+def skip_unchanged_data(session, giving_partner_id, coordinates=None, outlines=None):
+    """Returns whether change detection found the coordinates and outlines of
+    a GP already stored, in which case only its queue entry is removed"""
+    if not Config.CHANGE_DETECTION_ENABLED or has_changed(
+        session, giving_partner_id, coordinates, outlines
+    ):
+        return False
+    if coordinates is not None and Config.GEOCODING_QUEUE_ENABLED:
+        session.execute(get_dequeue_statement(giving_partner_id))
+    session.commit()
+    logger.info(
+        "Skipping unchanged giving partner",
+        value={
+            "giving_partner_id": str(giving_partner_id),
+        },
+    )
+    return True
+
+
+def update_geohash_index(
+    session,
+    giving_partner_id,
+    latitude,
+    longitude,
+    coordinate_source=CoordinateSource.GOOGLE,
+):
+    """Indexes the coordinates of a GP, or removes the GP from the index when
+    Google could not locate it and its coordinates are approximate"""
+    if coordinate_source != CoordinateSource.GOOGLE or (latitude, longitude) == (
+        -1,
+        -1,
+    ):
+        session.execute(
+            delete(GivingPartnerGeohash).where(
+                GivingPartnerGeohash.giving_partner_id == giving_partner_id
+            )
+        )
+        return
+    session.merge(
+        GivingPartnerGeohash(
+            giving_partner_id=giving_partner_id,
+            geohash=encode_geohash(latitude, longitude),
+            latitude=latitude,
+            longitude=longitude,
+        )
+    )
+
+
+@traced("insert_google_outlines")
 def insert_google_outlines(
     session,
     giving_partner_id,
     outlines,
+    outline_metrics=None,
+    search_sync=False,
 ):
-    """Handles the MySQL table insertion"""
+    """Handles the MySQL table insertion, returning False when change
+    detection found the same outlines stored. The search-sync event is queued
+    in the outbox when search_sync"""
     try:
-        gp_info = GivingPartnerOutlines(
-            giving_partner_id=giving_partner_id,
-            outlines=outlines,
-        )
-        session.merge(gp_info)
+        if skip_unchanged_data(session, giving_partner_id, outlines=outlines):
+            return False
+        upsert_outlines(session, giving_partner_id, outlines)
+        merge_outline_metrics(session, giving_partner_id, outlines, outline_metrics)
+        if search_sync:
+            add_search_sync_outbox(session, giving_partner_id)
         session.commit()
         logger.info(
             "Succesfully inserted google outline data for Giving Partner",
@@ -79,6 +278,7 @@ def insert_google_outlines(
                 "giving_partner_id": str(giving_partner_id),
             },
         )
+        return True
     except SQLAlchemyError:
         session.rollback()
         logger.error(
@@ -90,19 +290,187 @@ def insert_google_outlines(
         raise
 
 
+def get_priority():
+    """Returns the SQL priority of a GP, higher first: active registered GPs,
+    then active unregistered ones, then inactive registered and unregistered"""
+    return GivingPartners.active * 2 + (1 - GivingPartners.unregistered)
+
+
+def get_priority_order():
+    """Returns the ORDER BY columns of the GPs by get_priority, most recently
+    created first within a priority. Unlike the priority expression, the
+    active and unregistered flags can be read in order from an index"""
+    return (
+        GivingPartners.active.desc(),
+        GivingPartners.unregistered,
+        GivingPartners.donee_id.desc(),
+    )
+
+
+def get_fetch_limit(session):
+    """Returns how many pending GPs a run may pick up"""
+    limit = Config.DAILY_ITERATION_LIMIT
+    if Config.QUOTA_ENABLED:
+        limit = min(limit, get_quota_status(session)["allowance"])
+    return limit
+
+
+def insert_zip_centroid_fallback(session, giving_partner, outlines, search_sync=True):
+    """Stores the ZIP centroid of a GP Google could not locate and returns
+    whether the ZIP centroid was known"""
+    centroid = lookup_zip_centroid(giving_partner.zip, giving_partner.country)
+    if centroid is None:
+        return False
+    logger.info(
+        "Using ZIP centroid for giving partner",
+        value={
+            "giving_partner_id": str(giving_partner.donee_id),
+        },
+    )
+    latitude, longitude = centroid
+    insert_google_data(
+        session,
+        giving_partner,
+        latitude,
+        longitude,
+        outlines,
+        coordinate_source=CoordinateSource.ZIP_CENTROID,
+        search_sync=search_sync,
+    )
+    return True
+
+
+@traced("get_giving_partners")
 def get_giving_partners(session, gp_ids=None):
-    """Function that returns which query to use to get the GPs to process"""
+    """Function that returns the GPs to process as lean GivingPartnerRows"""
+    limit = None if gp_ids else get_fetch_limit(session)
+    if limit == 0:
+        logger.info("No Geocoding API budget left for this run")
+        return []
+
     if gp_ids:
-        query = select(GivingPartners).where(GivingPartners.donee_id.in_(gp_ids))
+        query = select(*GIVING_PARTNER_ROW_COLUMNS).where(
+            GivingPartners.donee_id.in_(gp_ids)
+        )
         logger.info("Retrieving GPs defined in GP_IDS", value={"gp_ids": str(gp_ids)})
+    elif Config.GEOCODING_QUEUE_ENABLED:
+        query = (
+            select(*GIVING_PARTNER_ROW_COLUMNS)
+            .join(
+                GeocodingQueue,
+                GeocodingQueue.giving_partner_id == GivingPartners.donee_id,
+            )
+            .where(GeocodingQueue.next_attempt_at <= func.now())
+            .order_by(
+                GeocodingQueue.priority.desc(),
+                GeocodingQueue.attempts,
+                GeocodingQueue.giving_partner_id.desc(),
+            )
+            .limit(limit)
+        )
     else:
         query = (
-            select(GivingPartners)
-            .where(GivingPartners.donee_lat == 0)
-            .limit(Config.DAILY_ITERATION_LIMIT)
+            select(*GIVING_PARTNER_ROW_COLUMNS)
+            .where(get_pending_predicate())
+            .order_by(*get_priority_order())
+            .limit(limit)
         )
 
-    return session.scalars(query).all()
+    # work discovery tolerates replica lag, so it doesn't load the primary
+    query = query.execution_options(use_replica=True)
+    return [GivingPartnerRow._make(row) for row in session.execute(query)]
+
+
+def get_pending_predicate():
+    """Returns the predicate of the GPs to geocode without the queue: the GPs
+    never geocoded, and with the ZIP centroid fallback the GPs placed at their
+    ZIP centroid more than ZIP_CENTROID_RETRY_HOURS ago, as their non-zero
+    coordinates would otherwise never be refined"""
+    never_geocoded = GivingPartners.donee_lat == 0
+    if not Config.ZIP_CENTROID_FALLBACK_ENABLED:
+        return never_geocoded
+    return or_(
+        never_geocoded,
+        GivingPartners.donee_id.in_(
+            select(GivingPartnerLocationSource.giving_partner_id).where(
+                GivingPartnerLocationSource.source
+                == CoordinateSource.ZIP_CENTROID.value,
+                GivingPartnerLocationSource.updated_at
+                <= func.timestampadd(
+                    literal_column("HOUR"),
+                    -Config.ZIP_CENTROID_RETRY_HOURS,
+                    func.now(),
+                ),
+            )
+        ),
+    )
+
+
+def get_reschedule_statement(giving_partner_id, reason=None):
+    """Returns the statement pushing back the next attempt of a queued GP"""
+    values = {
+        "attempts": GeocodingQueue.attempts + 1,
+        "next_attempt_at": func.timestampadd(
+            literal_column("MINUTE"),
+            Config.GEOCODING_QUEUE_RETRY_MINUTES * (GeocodingQueue.attempts + 1),
+            func.now(),
+        ),
+    }
+    if reason:
+        values["reason"] = reason
+    return (
+        update(GeocodingQueue)
+        .where(GeocodingQueue.giving_partner_id == giving_partner_id)
+        .values(**values)
+    )
+
+
+def get_dequeue_statement(*giving_partner_ids):
+    """Returns the statement removing GPs from the geocoding queue"""
+    return delete(GeocodingQueue).where(
+        GeocodingQueue.giving_partner_id.in_(giving_partner_ids)
+    )
+
+
+def reschedule_giving_partner(session, giving_partner_id):
+    """Pushes back the next attempt of a queued GP that failed to process. As
+    it runs while handling the failure, its own database errors are logged
+    without aborting the run, the GP keeping its current next attempt"""
+    try:
+        session.execute(get_reschedule_statement(giving_partner_id))
+        session.commit()
+    except SQLAlchemyError:
+        session.rollback()
+        logger.error(
+            "Error rescheduling giving partner",
+            value={
+                "giving_partner_id": str(giving_partner_id),
+            },
+            exc_info=True,
+        )
+
+
+def seed_geocoding_queue(session, reason="missing_coordinates"):
+    """Enqueues every GP without coordinates that is not queued yet"""
+    try:
+        statement = (
+            insert(GeocodingQueue)
+            .prefix_with("IGNORE")
+            .from_select(
+                ["giving_partner_id", "reason", "priority"],
+                select(GivingPartners.donee_id, literal(reason), get_priority()).where(
+                    GivingPartners.donee_lat == 0
+                ),
+            )
+        )
+        enqueued = session.execute(statement).rowcount
+        session.commit()
+    except SQLAlchemyError:
+        session.rollback()
+        logger.error("Error seeding geocoding queue")
+        raise
+    logger.info("Seeded geocoding queue", value={"enqueued": str(enqueued)})
+    return enqueued
 
 
 def extract_building_polygons(data):
@@ -0,0 +1,76 @@
+"""Module that tracks the Geocoding API latencies to derive adaptive timeouts
+and the delay after which a hedged (duplicate) request is sent"""
+
+import math
+import threading
+from collections import deque
+
+from app.config import Config
+
+_lock = threading.Lock()
+_latencies = deque(maxlen=Config.GEOCODING_LATENCY_WINDOW)
+_hedging = {"requests": 0, "hedges": 0}
+
+
+def record_latency(seconds):
+    """Records the latency of a successful call"""
+    with _lock:
+        _latencies.append(seconds)
+
+
+def get_latency_percentile(fraction):
+    """Returns the latency at fraction of the recent successful calls, or None
+    before GEOCODING_LATENCY_MIN_SAMPLES calls"""
+    with _lock:
+        if len(_latencies) < max(Config.GEOCODING_LATENCY_MIN_SAMPLES, 1):
+            return None
+        latencies = sorted(_latencies)
+    return latencies[min(len(latencies) - 1, math.ceil(fraction * len(latencies)) - 1)]
+
+
+def get_timeout():
+    """Returns the timeout of the next call: GEOCODING_TIMEOUT_SECONDS, or
+    with adaptive timeouts a multiple of the p99 latency within
+    [GEOCODING_TIMEOUT_MIN_SECONDS, GEOCODING_TIMEOUT_SECONDS]"""
+    if not Config.GEOCODING_ADAPTIVE_TIMEOUT_ENABLED:
+        return Config.GEOCODING_TIMEOUT_SECONDS
+    p99 = get_latency_percentile(0.99)
+    if p99 is None:
+        return Config.GEOCODING_TIMEOUT_SECONDS
+    return min(
+        max(
+            p99 * Config.GEOCODING_TIMEOUT_P99_MULTIPLIER,
+            Config.GEOCODING_TIMEOUT_MIN_SECONDS,
+        ),
+        Config.GEOCODING_TIMEOUT_SECONDS,
+    )
+
+
+def get_hedge_delay():
+    """Counts a call and returns the seconds after which to hedge it, or None
+    when it must not be hedged"""
+    with _lock:
+        _hedging["requests"] += 1
+    if not Config.GEOCODING_HEDGING_ENABLED:
+        return None
+    return get_latency_percentile(Config.GEOCODING_HEDGE_PERCENTILE)
+
+
+def take_hedge_budget():
+    """Returns whether a hedge may be sent, keeping the hedges under
+    GEOCODING_HEDGE_MAX_RATIO of the calls"""
+    with _lock:
+        if (
+            _hedging["hedges"] + 1
+            > _hedging["requests"] * Config.GEOCODING_HEDGE_MAX_RATIO
+        ):
+            return False
+        _hedging["hedges"] += 1
+        return True
+
+
+def reset_latencies():
+    """Forgets the recorded latencies and hedges"""
+    with _lock:
+        _latencies.clear()
+        _hedging.update(requests=0, hedges=0)
@@ -0,0 +1,46 @@
+# pylint: disable=too-few-public-methods
+"""Module that contains the logging handlers and filters built by Config.
+It must not import Config, which builds the logger on import"""
+
+import atexit
+import logging
+import queue
+import threading
+from collections import Counter
+from logging.handlers import QueueHandler, QueueListener
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps one in every rate records starting with one of the messages, and
+    drops them all with a rate of 0. Warnings and errors are always kept"""
+
+    def __init__(self, messages, rate):
+        super().__init__()
+        self.messages = tuple(messages)
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._seen = Counter()
+
+    def filter(self, record):
+        if self.rate == 1 or record.levelno >= logging.WARNING:
+            return True
+        message = record.getMessage()
+        for sampled_message in self.messages:
+            if message.startswith(sampled_message):
+                if self.rate == 0:
+                    return False
+                with self._lock:
+                    self._seen[sampled_message] += 1
+                    return self._seen[sampled_message] % self.rate == 1
+        return True
+
+
+def get_queue_handler(handler):
+    """Returns a handler that enqueues the records for a background thread
+    writing them to handler, so logging never blocks on I/O. The records left
+    in the queue are written at exit"""
+    records = queue.SimpleQueue()
+    listener = QueueListener(records, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return QueueHandler(records)
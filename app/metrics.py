@@ -0,0 +1,102 @@
+"""Module that keeps in-process counters summarized in the job logs"""
+
+import math
+import threading
+import time
+from array import array
+from collections import Counter
+
+from app.config import Config
+
+logger = Config.logger
+
+_lock = threading.Lock()
+_counters = Counter()
+# seconds spent on each processed GP, 8 bytes per GP
+_gp_durations = array("d")
+
+
+def increment_counter(name, value=1):
+    """Adds value to the counter name"""
+    with _lock:
+        _counters[name] += value
+
+
+def get_counters(prefix=""):
+    """Returns a copy of the counters whose name starts with prefix"""
+    with _lock:
+        return {
+            name: value for name, value in _counters.items() if name.startswith(prefix)
+        }
+
+
+def reset_counters():
+    """Clears every counter and GP duration"""
+    with _lock:
+        _counters.clear()
+        del _gp_durations[:]
+
+
+def record_gp_duration(seconds):
+    """Records the seconds spent on a processed GP"""
+    with _lock:
+        _gp_durations.append(seconds)
+
+
+def get_gp_duration_percentile(fraction):
+    """Returns the GP duration at fraction of the processed GPs, or None"""
+    with _lock:
+        durations = sorted(_gp_durations)
+    if not durations:
+        return None
+    return durations[min(len(durations) - 1, math.ceil(fraction * len(durations)) - 1)]
+
+
+def log_counters(message, prefix=""):
+    """Logs the counters whose name starts with prefix, if any"""
+    counters = get_counters(prefix)
+    if counters:
+        logger.info(
+            message,
+            value={name: str(value) for name, value in sorted(counters.items())},
+        )
+
+
+class ProgressReporter:
+    """Counts the processed GPs of a run by outcome and logs a summary every
+    interval GPs, so a run doesn't need a success line per GP. The outcomes
+    are also counted as gps_<outcome> counters"""
+
+    def __init__(self, name, interval=None):
+        self.name = name
+        self.interval = Config.LOG_PROGRESS_INTERVAL if interval is None else interval
+        self.outcomes = Counter()
+        self.started_at = time.monotonic()
+
+    def record(self, outcome, started_at=None):
+        """Counts a processed GP and logs a summary every interval GPs. The
+        time since started_at, the time.monotonic() at which the GP started,
+        is recorded as its duration"""
+        if started_at is not None:
+            record_gp_duration(time.monotonic() - started_at)
+        increment_counter(f"gps_{outcome}")
+        self.outcomes[outcome] += 1
+        if self.interval and self.processed % self.interval == 0:
+            self.log(f"{self.name} progress")
+
+    @property
+    def processed(self):
+        """Number of GPs processed so far"""
+        return sum(self.outcomes.values())
+
+    def log(self, message=None):
+        """Logs the outcome counts and throughput of the run"""
+        elapsed = time.monotonic() - self.started_at
+        logger.info(
+            message or f"{self.name} finished",
+            value={
+                "processed": str(self.processed),
+                **{outcome: str(count) for outcome, count in self.outcomes.items()},
+                "per_second": f"{self.processed / elapsed:.2f}" if elapsed else "0",
+            },
+        )
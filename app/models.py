@@ -1,8 +1,24 @@
 # pylint: disable=too-few-public-methods
 """datetime object for defining created_at, updated_at columns"""
 
-from sqlalchemy import JSON, Column, Float, Integer, String, create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from typing import NamedTuple
+
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    LargeBinary,
+    SmallInteger,
+    String,
+    create_engine,
+    desc,
+    func,
+)
+from sqlalchemy.orm import Session, declarative_base, deferred, sessionmaker
 
 from app.config import Config
 
@@ -16,14 +32,68 @@ class GivingPartnerOutlines(Base):
     __table_args__ = {"schema": Config.PLATFORM_DB_DATABASE}
 
     giving_partner_id = Column(Integer, primary_key=True)
-    outlines = Column(JSON, nullable=False)
+    # exactly one of the columns is set, see app.outline_encoding. The
+    # compact one is deferred so it is only read once it is migrated. None is
+    # stored as SQL NULL rather than the JSON null the cleared column would hold
+    outlines = Column(JSON(none_as_null=True))
+    outlines_compact = deferred(Column(LargeBinary(length=2**24 - 1)))
+    # app.change_detection hash of the outlines, deferred like outlines_compact
+    outlines_hash = deferred(Column(String(64)))
+
+
+class GivingPartnerOutlineMetrics(Base):
+    """giving_partner_outline_metrics table, geometry summaries of the outlines"""
+
+    __tablename__ = "giving_partner_outline_metrics"
+    __table_args__ = (
+        Index("ix_outline_metrics_bbox", "min_lat", "max_lat", "min_lon", "max_lon"),
+        Index("ix_outline_metrics_centroid", "centroid_lat", "centroid_lon"),
+        {"schema": Config.PLATFORM_DB_DATABASE},
+    )
+
+    giving_partner_id = Column(Integer, primary_key=True)
+    min_lat = Column(Float, nullable=False)
+    min_lon = Column(Float, nullable=False)
+    max_lat = Column(Float, nullable=False)
+    max_lon = Column(Float, nullable=False)
+    centroid_lat = Column(Float, nullable=False)
+    centroid_lon = Column(Float, nullable=False)
+    area = Column(Float, nullable=False)
+    vertex_count = Column(Integer, nullable=False)
+    polygon_count = Column(Integer, nullable=False)
+    is_valid = Column(Boolean, nullable=False)
+
+
+class GivingPartnerGeohash(Base):
+    """giving_partner_geohashes table, geohash index of the GP coordinates"""
+
+    __tablename__ = "giving_partner_geohashes"
+    __table_args__ = (
+        Index("ix_giving_partner_geohashes_geohash", "geohash"),
+        {"schema": Config.PLATFORM_DB_DATABASE},
+    )
+
+    giving_partner_id = Column(Integer, primary_key=True)
+    geohash = Column(String(12), nullable=False)
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
 
 
 class GivingPartners(Base):
     """giving_partners table"""
 
     __tablename__ = "donee_info"
-    __table_args__ = {"schema": Config.MONO_DB_DATABASE}
+    __table_args__ = (
+        # the GPs to geocode in helper.get_priority_order
+        Index(
+            "ix_donee_info_geocoding",
+            "donee_lat",
+            desc("active"),
+            "unregistered",
+            desc("donee_id"),
+        ),
+        {"schema": Config.MONO_DB_DATABASE},
+    )
 
     donee_id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String(255), nullable=False)
@@ -38,18 +108,166 @@ class GivingPartners(Base):
     unregistered = Column(Integer, nullable=False)
 
 
+class GivingPartnerLocationSource(Base):
+    """giving_partner_location_sources table, where the coordinates come from"""
+
+    __tablename__ = "giving_partner_location_sources"
+    __table_args__ = (
+        # the ZIP centroid GPs due for a new attempt
+        Index("ix_location_sources_source", "source", "updated_at"),
+        {"schema": Config.PLATFORM_DB_DATABASE},
+    )
+
+    giving_partner_id = Column(Integer, primary_key=True)
+    source = Column(String(16), nullable=False)
+    precision = Column(String(16), nullable=False)
+    updated_at = Column(
+        DateTime, nullable=False, server_default=func.now(), onupdate=func.now()
+    )
+
+
+class GeocodingQueue(Base):
+    """geocoding_queue table, the pending work of the donee_geocoder"""
+
+    __tablename__ = "geocoding_queue"
+    __table_args__ = (
+        Index("ix_geocoding_queue_next_attempt_at", "next_attempt_at", "id"),
+        # the order of helper.get_giving_partners, ending with the filter
+        Index(
+            "ix_geocoding_queue_order",
+            desc("priority"),
+            "attempts",
+            desc("giving_partner_id"),
+            "next_attempt_at",
+        ),
+        {"schema": Config.PLATFORM_DB_DATABASE},
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    giving_partner_id = Column(Integer, nullable=False, unique=True)
+    reason = Column(String(32), nullable=False)
+    # see helper.get_priority, higher is processed first
+    priority = Column(SmallInteger, nullable=False, server_default="0")
+    enqueued_at = Column(DateTime, nullable=False, server_default=func.now())
+    attempts = Column(Integer, nullable=False, server_default="0")
+    next_attempt_at = Column(DateTime, nullable=False, server_default=func.now())
+
+
+class SearchSyncOutbox(Base):
+    """search_sync_outbox table, search-sync events waiting to be sent to SNS"""
+
+    __tablename__ = "search_sync_outbox"
+    __table_args__ = {"schema": Config.PLATFORM_DB_DATABASE}
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    giving_partner_id = Column(Integer, nullable=False)
+    message = Column(JSON, nullable=False)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
+
+class GeocodingApiUsage(Base):
+    """geocoding_api_usage table, Geocoding API calls per quota window"""
+
+    __tablename__ = "geocoding_api_usage"
+    __table_args__ = {"schema": Config.PLATFORM_DB_DATABASE}
+
+    window_start = Column(DateTime, primary_key=True)
+    calls = Column(Integer, nullable=False, server_default="0")
+
+
+class GeocodingRunHistory(Base):
+    """geocoding_run_history table, the summary of each finished job run"""
+
+    __tablename__ = "geocoding_run_history"
+    __table_args__ = (
+        Index("ix_geocoding_run_history_job_started_at", "job", "started_at"),
+        {"schema": Config.PLATFORM_DB_DATABASE},
+    )
+
+    run_id = Column(String(32), primary_key=True)
+    job = Column(String(32), nullable=False)
+    started_at = Column(DateTime, nullable=False)
+    gps_attempted = Column(Integer, nullable=False)
+    gps_succeeded = Column(Integer, nullable=False)
+    api_calls = Column(Integer, nullable=False)
+    api_retries = Column(Integer, nullable=False)
+    api_cache_hits = Column(Integer, nullable=False)
+    wall_seconds = Column(Float, nullable=False)
+    gps_per_second = Column(Float, nullable=False)
+    latency_p50_ms = Column(Float)
+    latency_p99_ms = Column(Float)
+    peak_rss_mb = Column(Float)
+
+
+class GivingPartnerRow(NamedTuple):
+    """Lean, untracked giving partner record holding only what geocoding needs"""
+
+    donee_id: int
+    address: str
+    city: str
+    state: str
+    zip: str
+    country: str
+
+
+GIVING_PARTNER_ROW_COLUMNS = [
+    getattr(GivingPartners, field) for field in GivingPartnerRow._fields
+]
+
+
 # Database setup function
 def get_engine(db_host, db_port, db_user, db_password, db_name):
     """function to create the mysql engine"""
     connection_string = (
         f"mysql+pymysql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
     )
-    engine = create_engine(connection_string, pool_recycle=3600)
+    engine = create_engine(
+        connection_string,
+        pool_size=Config.DB_POOL_SIZE,
+        max_overflow=Config.DB_MAX_OVERFLOW,
+        pool_timeout=Config.DB_POOL_TIMEOUT,
+        pool_recycle=Config.DB_POOL_RECYCLE,
+        pool_pre_ping=Config.DB_POOL_PRE_PING,
+    )
     return engine
 
 
+def get_read_engine():
+    """function to create the read replica engine, None without a replica"""
+    if not Config.PLATFORM_DB_HOST_READ:
+        return None
+    return get_engine(
+        db_host=Config.PLATFORM_DB_HOST_READ,
+        db_port=Config.PLATFORM_DB_PORT_READ,
+        db_user=Config.PLATFORM_DB_USERNAME,
+        db_password=Config.PLATFORM_DB_PASSWORD,
+        db_name=Config.PLATFORM_DB_DATABASE,
+    )
+
+
+class RoutingSession(Session):
+    """Session sending the statements executed with the use_replica execution
+    option to the read replica, and everything else to the primary"""
+
+    def __init__(self, *args, read_engine=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.read_engine = read_engine
+
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        """Returns the read replica for use_replica statements outside a flush"""
+        if (
+            self.read_engine is not None
+            and not self._flushing
+            and clause is not None
+            and clause.get_execution_options().get("use_replica")
+        ):
+            return self.read_engine
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
 # Session factory
-def get_session(engine):
-    """function to create the session for the mysql database"""
-    session = sessionmaker(bind=engine)
+def get_session(engine, read_engine=None):
+    """function to create the session for the mysql database, reading from
+    read_engine the statements marked with use_replica"""
+    session = sessionmaker(bind=engine, class_=RoutingSession, read_engine=read_engine)
     return session()
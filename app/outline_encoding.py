@@ -0,0 +1,150 @@
+"""Module that contains the compact binary encoding of the building outlines.
+
+Coordinates are quantized to 1e-7 degrees (about 1cm, the precision Google
+returns), delta-encoded from the previous vertex, zigzag-encoded so small
+deltas have zero high bytes, split into byte planes and zlib-compressed.
+The ring structure is stored as a separate array of counts."""
+
+import json
+import struct
+import zlib
+
+import numpy as np
+
+from app.config import Config
+
+MAGIC = b"GPO1"
+COORDINATE_SCALE = 10**7
+# coordinate byte size, structure length and vertex count
+HEADER = struct.Struct("<BII")
+OUTLINE_TYPES = ("Polygon", "MultiPolygon")
+
+
+def _get_structure(outlines):
+    """Returns the counts describing the rings of outlines and their vertices,
+    or None when outlines hold anything but Polygon/MultiPolygon objects"""
+    structure = [len(outlines)]
+    points = []
+    for outline in outlines:
+        if (
+            not isinstance(outline, dict)
+            or set(outline) != {"type", "coordinates"}
+            or outline["type"] not in OUTLINE_TYPES
+            or not isinstance(outline["coordinates"], list)
+        ):
+            return None
+        polygons = outline["coordinates"]
+        if outline["type"] == "Polygon":
+            polygons = [polygons]
+        structure += [OUTLINE_TYPES.index(outline["type"]), len(polygons)]
+        for rings in polygons:
+            structure.append(len(rings))
+            for ring in rings:
+                structure.append(len(ring))
+                points.extend(ring)
+    return structure, points
+
+
+def encode_outlines(outlines):
+    """Returns the compact encoding of a list of displayPolygon objects, or
+    None when they can't be encoded"""
+    try:
+        structure, points = _get_structure(outlines)
+        coordinates = np.asarray(points, dtype=float).reshape(len(points), 2)
+    except (TypeError, ValueError):
+        return None
+
+    quantized = np.round(coordinates * COORDINATE_SCALE).astype(np.int64)
+    deltas = np.diff(quantized, axis=0, prepend=np.zeros((1, 2), np.int64)).ravel()
+    # antimeridian jumps need 64 bits
+    itemsize = 4 if np.abs(deltas).max(initial=0) < 2**30 else 8
+    deltas = deltas.astype(f"<i{itemsize}")
+    zigzag = ((deltas << 1) ^ (deltas >> (itemsize * 8 - 1))).view(f"<u{itemsize}")
+    planes = zigzag.view(np.uint8).reshape(-1, itemsize).T
+
+    payload = b"".join(
+        (
+            HEADER.pack(itemsize, len(structure), len(points)),
+            np.asarray(structure, dtype="<u4").tobytes(),
+            planes.tobytes(),
+        )
+    )
+    return MAGIC + zlib.compress(payload)
+
+
+def decode_coordinates(blob):
+    """Returns the structure counts and the (n, 2) [lon, lat] coordinate array
+    of a compact encoding, for readers working on arrays"""
+    if not blob.startswith(MAGIC):
+        raise ValueError("Not a compact outlines encoding")
+    payload = zlib.decompress(blob[len(MAGIC) :])
+    itemsize, structure_length, vertex_count = HEADER.unpack_from(payload)
+    offset = HEADER.size
+    structure = np.frombuffer(payload, "<u4", structure_length, offset)
+    offset += 4 * structure_length
+    planes = np.frombuffer(payload, np.uint8, vertex_count * 2 * itemsize, offset)
+    zigzag = planes.reshape(itemsize, -1).T.copy().view(f"<u{itemsize}").ravel()
+    deltas = (zigzag >> 1).astype(np.int64) ^ -(zigzag & 1).astype(np.int64)
+    return structure, np.cumsum(deltas.reshape(-1, 2), axis=0) / COORDINATE_SCALE
+
+
+def decode_outlines(blob):
+    """Returns the list of displayPolygon objects of a compact encoding"""
+    structure, coordinates = decode_coordinates(blob)
+    coordinates = coordinates.tolist()
+
+    counts = iter(structure.tolist())
+    start = 0
+    outlines = []
+    for _ in range(next(counts)):
+        outline_type = OUTLINE_TYPES[next(counts)]
+        polygons = []
+        for _ in range(next(counts)):
+            rings = []
+            for _ in range(next(counts)):
+                length = next(counts)
+                rings.append(coordinates[start : start + length])
+                start += length
+            polygons.append(rings)
+        outlines.append(
+            {
+                "type": outline_type,
+                "coordinates": polygons[0] if outline_type == "Polygon" else polygons,
+            }
+        )
+    return outlines
+
+
+def is_compact_column_enabled():
+    """Returns whether the outlines_compact column exists: with the compact
+    format, or once OUTLINES_COMPACT_COLUMN_ENABLED after its migration"""
+    return (
+        Config.OUTLINES_STORAGE_FORMAT == "compact"
+        or Config.OUTLINES_COMPACT_COLUMN_ENABLED
+    )
+
+
+def get_outline_columns(outlines, storage_format=None, with_compact=None):
+    """Returns the giving_partner_outlines column values storing outlines in
+    storage_format (OUTLINES_STORAGE_FORMAT by default). Outlines that can't
+    be encoded are stored as JSON. JSON outlines only clear outlines_compact
+    with_compact, which defaults to whether the column exists"""
+    storage_format = storage_format or Config.OUTLINES_STORAGE_FORMAT
+    if storage_format == "compact":
+        blob = encode_outlines(outlines)
+        if blob is not None:
+            return {"outlines": None, "outlines_compact": blob}
+    if with_compact is None:
+        with_compact = storage_format == "compact" or is_compact_column_enabled()
+    if with_compact:
+        return {"outlines": outlines, "outlines_compact": None}
+    return {"outlines": outlines}
+
+
+def load_outlines(outlines, outlines_compact=None):
+    """Returns the outlines of a giving_partner_outlines row in either format"""
+    if outlines_compact is not None:
+        return decode_outlines(outlines_compact)
+    if isinstance(outlines, (str, bytes)):
+        return json.loads(outlines)
+    return outlines
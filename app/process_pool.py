@@ -0,0 +1,111 @@
+"""Module that geocodes the GPs concurrently and runs the CPU-bound outline
+processing in a process pool"""
+
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from app.config import Config
+from app.enums import ResponseProfile
+from app.google_api_calls import geocoding_api_address
+from app.helper import extract_building_polygons, get_lat_lon
+from app.tracing import giving_partner_context, giving_partner_span, open_span
+from app.vector_geometry import compute_outline_metrics
+
+logger = Config.logger
+
+
+def extract_google_data(destinations, pool=None):
+    """Returns the coordinates, building outlines and outline metrics (None
+    unless OUTLINE_METRICS_ENABLED) of geocoding destinations. The extraction
+    runs in the process pool when given, which is sent the raw destinations
+    and only returns that result"""
+    with_metrics = Config.OUTLINE_METRICS_ENABLED
+    if pool is None or not destinations:
+        return extract_destinations(destinations, with_metrics)
+    # the workers don't see the patched or reloaded Config of this process
+    return pool.submit(extract_destinations, destinations, with_metrics).result()
+
+
+def extract_destinations(destinations, with_metrics):
+    """Returns the coordinates, building outlines and, with_metrics, the
+    outline metrics of geocoding destinations"""
+    latitude, longitude = get_lat_lon(destinations)
+    building_outlines = extract_building_polygons(destinations)
+    outline_metrics = None
+    if building_outlines and with_metrics:
+        outline_metrics = compute_outline_metrics(building_outlines)
+    return latitude, longitude, building_outlines, outline_metrics
+
+
+def get_process_pool():
+    """Returns the process pool, sized by core count unless configured. Its
+    workers are started by a fork server, as forking this process would copy
+    the locks of its running threads (hedging, logging) in whatever state"""
+    workers = Config.PROCESS_POOL_WORKERS or os.cpu_count()
+    start_method = (
+        "forkserver"
+        if "forkserver" in multiprocessing.get_all_start_methods()
+        else "spawn"
+    )
+    logger.info(
+        "Starting process pool",
+        value={"workers": str(workers), "start_method": start_method},
+    )
+    return ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context(start_method)
+    )
+
+
+def geocode_destinations(giving_partner, profile=ResponseProfile.FULL):
+    """Calls the geocoding API for a giving partner and returns its destinations"""
+    with giving_partner_context(giving_partner.donee_id):
+        geocoding_result = geocoding_api_address(
+            giving_partner.address,
+            giving_partner.city,
+            giving_partner.state,
+            giving_partner.zip,
+            giving_partner.country,
+            profile=profile,
+        )
+    return (geocoding_result or {}).get("destinations", [])
+
+
+def geocode_and_extract(pool, giving_partner, profile, span):
+    """Geocodes a GP and extracts its data within the span of the GP, which
+    is left open for its writes"""
+    with giving_partner_span(giving_partner.donee_id, span, end=False):
+        return extract_google_data(geocode_destinations(giving_partner, profile), pool)
+
+
+def iter_inline_giving_partners(giving_partners):
+    """Yields the (giving_partner, None, started_at, None) tuples of the GPs
+    processed inline, without a pooled extraction nor an open span"""
+    for giving_partner in giving_partners:
+        yield giving_partner, None, time.monotonic(), None
+
+
+def iter_pooled_extractions(pool, giving_partners, profile=ResponseProfile.FULL):
+    """Geocodes up to PROCESS_POOL_GEOCODING_THREADS giving partners at once,
+    with the pool computing their outline metrics, and yields
+    (giving_partner, future, started_at, span) in input order. started_at is
+    the time.monotonic() before geocoding and span the open span of the GP, to
+    enter with giving_partner_span. Errors are returned through the future"""
+    threads = Config.PROCESS_POOL_GEOCODING_THREADS
+    pending = deque()
+    with ThreadPoolExecutor(
+        max_workers=threads, thread_name_prefix="geocoding"
+    ) as geocoding_executor:
+        for giving_partner in giving_partners:
+            started_at = time.monotonic()
+            span = open_span("process_giving_partner", giving_partner.donee_id)
+            future = geocoding_executor.submit(
+                geocode_and_extract, pool, giving_partner, profile, span
+            )
+            pending.append((giving_partner, future, started_at, span))
+            if len(pending) >= threads:
+                yield pending.popleft()
+        while pending:
+            yield pending.popleft()
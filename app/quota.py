@@ -0,0 +1,198 @@
+"""Module that contains the Geocoding API quota ledger.
+
+Every Geocoding API call, retries included, is counted in the
+geocoding_api_usage table of the platform database so the budget is shared by
+every job and survives restarts. Each process reserves the calls in blocks of
+QUOTA_RESERVATION_SIZE, so the ledger is only written once per block. The
+ledger is only active once configure_quota_ledger has been called with an
+engine."""
+
+import threading
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import sessionmaker
+
+from app.config import Config
+from app.models import GeocodingApiUsage
+
+logger = Config.logger
+
+# guards _ledger and is notified when a reservation ends, the ledger I/O runs
+# without holding it
+_reserved = threading.Condition()
+_ledger = {}
+
+
+class QuotaExceededError(RuntimeError):
+    """Raised when a Geocoding API call would exceed the hard budget"""
+
+
+def configure_quota_ledger(engine):
+    """Activates the ledger on the given engine, or deactivates it with None,
+    giving the unused reserved calls back"""
+    with _reserved:
+        previous_ledger = dict(_ledger)
+        _ledger.clear()
+        if engine is not None:
+            _ledger.update(
+                session_factory=sessionmaker(bind=engine),
+                window_start=None,
+                reserved=0,
+                claim=None,
+            )
+        _reserved.notify_all()
+    release_reserved_calls(previous_ledger)
+
+
+def release_reserved_calls(ledger):
+    """Gives the unused reserved calls of a ledger back to their window. A
+    failure is logged, the calls then only count as spent"""
+    if not ledger.get("reserved"):
+        return
+    try:
+        with ledger["session_factory"]() as session:
+            session.execute(
+                update(GeocodingApiUsage)
+                .where(GeocodingApiUsage.window_start == ledger["window_start"])
+                .values(calls=GeocodingApiUsage.calls - ledger["reserved"])
+            )
+            session.commit()
+    except SQLAlchemyError:
+        logger.warn(
+            "Failed to release the reserved Geocoding API calls",
+            value={"reserved": str(ledger["reserved"])},
+            exc_info=True,
+        )
+
+
+def get_quota_window(now=None):
+    """Returns the start and end (naive UTC) of the quota window holding now"""
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    window = timedelta(hours=Config.QUOTA_WINDOW_HOURS)
+    offset = timedelta(hours=Config.QUOTA_WINDOW_OFFSET_HOURS)
+    start = datetime(1970, 1, 1) - offset
+    start += window * ((now - start) // window)
+    return start, start + window
+
+
+def consume_geocoding_call():
+    """Counts one Geocoding API call out of the calls reserved by this
+    process, raising QuotaExceededError instead when the hard budget of the
+    current window is spent or the ledger can't be reached"""
+    with _reserved:
+        while True:
+            if "session_factory" not in _ledger:
+                return
+            window_start, _ = get_quota_window()
+            if _ledger["window_start"] == window_start and _ledger["reserved"]:
+                _ledger["reserved"] -= 1
+                return
+            if _ledger["claim"] is None:
+                break
+            _reserved.wait()
+        # this thread reserves the next block, the others wait for it
+        _ledger["claim"] = window_start
+        session_factory = _ledger["session_factory"]
+
+    reserved = None
+    try:
+        reserved = reserve_calls(session_factory, window_start)
+    except SQLAlchemyError:
+        logger.error(
+            "Failed to reserve Geocoding API calls, stopping as if the quota "
+            "was exceeded",
+            value={"window_start": window_start.isoformat()},
+            exc_info=True,
+        )
+    with _reserved:
+        # unless the ledger was reconfigured meanwhile
+        if _ledger.get("claim") == window_start:
+            # the calls left in a past window are spent with it
+            _ledger.update(
+                window_start=window_start,
+                reserved=max((reserved or 0) - 1, 0),
+                claim=None,
+            )
+        _reserved.notify_all()
+    if reserved:
+        return
+
+    if reserved is not None:
+        logger.error(
+            "Geocoding API hard quota exceeded",
+            value={
+                "window_start": window_start.isoformat(),
+                "hard_limit": str(Config.QUOTA_HARD_LIMIT),
+            },
+        )
+    raise QuotaExceededError(window_start.isoformat())
+
+
+def reserve_calls(session_factory, window_start):
+    """Reserves a block of QUOTA_RESERVATION_SIZE calls of the window, or a
+    single call once less than a block is left, and returns the number of
+    calls reserved, 0 when the hard budget is spent"""
+    with session_factory() as session:
+        session.execute(
+            insert(GeocodingApiUsage)
+            .prefix_with("IGNORE")
+            .values(window_start=window_start, calls=0)
+        )
+        for size in dict.fromkeys((max(Config.QUOTA_RESERVATION_SIZE, 1), 1)):
+            # conditional increment, atomic across concurrent jobs
+            if session.execute(
+                update(GeocodingApiUsage)
+                .where(
+                    GeocodingApiUsage.window_start == window_start,
+                    GeocodingApiUsage.calls + size <= Config.QUOTA_HARD_LIMIT,
+                )
+                .values(calls=GeocodingApiUsage.calls + size)
+            ).rowcount:
+                session.commit()
+                return size
+        session.commit()
+    return 0
+
+
+def get_used_calls(session, window_start):
+    """Returns the calls already made in the window"""
+    return (
+        session.scalar(
+            select(GeocodingApiUsage.calls).where(
+                GeocodingApiUsage.window_start == window_start
+            )
+        )
+        or 0
+    )
+
+
+def get_quota_status(session, now=None):
+    """Returns the usage, the remaining budgets and the GPs a run may pick up
+    now. With pacing, the soft budget accrues evenly over the window so runs
+    spread the work instead of spending it all in the first run"""
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    window_start, window_end = get_quota_window(now)
+    used = get_used_calls(session, window_start)
+    budget = Config.QUOTA_SOFT_LIMIT
+    if Config.QUOTA_PACING_ENABLED:
+        budget = int(budget * (now - window_start) / (window_end - window_start))
+    return {
+        "window_start": window_start,
+        "used": used,
+        "soft_remaining": max(0, Config.QUOTA_SOFT_LIMIT - used),
+        "hard_remaining": max(0, Config.QUOTA_HARD_LIMIT - used),
+        "allowance": max(0, min(budget, Config.QUOTA_SOFT_LIMIT) - used),
+    }
+
+
+def log_quota_status(session):
+    """Logs the remaining budget of the current window"""
+    status = get_quota_status(session)
+    logger.info(
+        "Geocoding API quota status",
+        value={key: str(value) for key, value in status.items()},
+    )
+    return status
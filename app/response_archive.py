@@ -0,0 +1,84 @@
+"""Module that records and replays raw Google Geocoding API responses"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import zlib
+from datetime import datetime, timezone
+
+from app.config import Config
+
+logger = Config.logger
+
+_lock = threading.Lock()
+_connections = {}
+
+
+class ArchiveMissError(LookupError):
+    """Raised when replaying a request that was never recorded"""
+
+
+def get_archive_key(data):
+    """Returns the archive key of a geocoding request body"""
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def _get_connection(path):
+    """Returns the (cached) sqlite connection of the archive at path"""
+    if path not in _connections:
+        connection = sqlite3.connect(path, check_same_thread=False)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, request TEXT NOT NULL, "
+            "response BLOB NOT NULL, recorded_at TEXT NOT NULL)"
+        )
+        _connections[path] = connection
+    return _connections[path]
+
+
+def close_archives():
+    """Closes every open archive connection"""
+    with _lock:
+        for connection in _connections.values():
+            connection.close()
+        _connections.clear()
+
+
+def record_response(data, response, path=None):
+    """Stores the compressed response of a geocoding request, replacing any
+    previous recording of the same request"""
+    with _lock:
+        connection = _get_connection(path or Config.GEOCODING_ARCHIVE_PATH)
+        connection.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+            (
+                get_archive_key(data),
+                json.dumps(data),
+                zlib.compress(json.dumps(response).encode()),
+                datetime.now(timezone.utc).isoformat(),
+            ),
+        )
+        connection.commit()
+
+
+def lookup_response(data, path=None):
+    """Returns the recorded response of a geocoding request, raising
+    ArchiveMissError when it was never recorded"""
+    with _lock:
+        connection = _get_connection(path or Config.GEOCODING_ARCHIVE_PATH)
+        row = connection.execute(
+            "SELECT response FROM responses WHERE key = ?", (get_archive_key(data),)
+        ).fetchone()
+    if row is None:
+        raise ArchiveMissError(get_archive_key(data))
+    return json.loads(zlib.decompress(row[0]))
+
+
+def replay_response(data, path=None):
+    """Returns the recorded response of a geocoding request"""
+    try:
+        return lookup_response(data, path)
+    except ArchiveMissError:
+        logger.warn("Geocoding request not found in archive", value={"params": data})
+        raise
@@ -0,0 +1,85 @@
+"""Module that bounds a run by a deadline and stops it gracefully on SIGTERM.
+
+Once the run should stop, the GP loops take no new GP. The GPs already being
+geocoded are still stored, and the run ends with its usual summaries.
+configure_run starts the clock and installs the SIGTERM handler."""
+
+import signal
+import time
+
+from app.config import Config
+
+logger = Config.logger
+
+_run = {"started_at": time.monotonic(), "max_runtime": 0, "stop_reason": None}
+
+
+def add_run_arguments(parser):
+    """Adds the run control arguments to an argparse parser"""
+    parser.add_argument(
+        "--max-runtime",
+        type=float,
+        default=Config.MAX_RUNTIME_SECONDS,
+        help="seconds after which no new GP is started, 0 for no deadline",
+    )
+
+
+def configure_run(max_runtime=None):
+    """Starts the run clock with a deadline of max_runtime seconds
+    (MAX_RUNTIME_SECONDS by default, 0 for none) and makes SIGTERM stop the
+    run gracefully"""
+    _run.update(
+        started_at=time.monotonic(),
+        max_runtime=Config.MAX_RUNTIME_SECONDS if max_runtime is None else max_runtime,
+        stop_reason=None,
+    )
+    signal.signal(signal.SIGTERM, _handle_stop_signal)
+
+
+def _handle_stop_signal(signum, _frame):
+    """Requests a graceful stop, logging is left to the GP loop"""
+    request_stop(signal.Signals(signum).name)
+
+
+def request_stop(reason):
+    """Makes the run stop before its next GP"""
+    if _run["stop_reason"] is None:
+        _run["stop_reason"] = reason
+
+
+def get_elapsed():
+    """Returns the seconds since the run started"""
+    return time.monotonic() - _run["started_at"]
+
+
+def get_stop_reason():
+    """Returns why the run should stop (a signal name or "deadline"), or None"""
+    if (
+        _run["stop_reason"] is None
+        and _run["max_runtime"]
+        and get_elapsed() >= _run["max_runtime"]
+    ):
+        _run["stop_reason"] = "deadline"
+    return _run["stop_reason"]
+
+
+def iter_until_stopped(giving_partners):
+    """Yields the giving partners until the run should stop, then logs the
+    ones left for the next run"""
+    for index, giving_partner in enumerate(giving_partners):
+        reason = get_stop_reason()
+        if reason is not None:
+            remaining = giving_partners[index:]
+            logger.warn(
+                "Stopping run before its remaining giving partners",
+                value={
+                    "reason": reason,
+                    "elapsed_seconds": str(round(get_elapsed())),
+                    "remaining": str(len(remaining)),
+                    "remaining_giving_partner_ids": str(
+                        [gp.donee_id for gp in remaining[:100]]
+                    ),
+                },
+            )
+            return
+        yield giving_partner
@@ -0,0 +1,176 @@
+"""Module that keeps the summary of every job run in the geocoding_run_history
+table of the platform database, and checks the latest run of a job against
+the median of its previous runs so deploys that slow a job down are caught"""
+
+import resource
+import statistics
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import sessionmaker
+
+from app.config import Config
+from app.metrics import get_counters, get_gp_duration_percentile
+from app.models import GeocodingRunHistory
+from app.run_control import get_elapsed
+
+logger = Config.logger
+
+JOBS = ("donee_geocoder", "outlines", "unified_runner")
+# fewer previous runs make too noisy a baseline
+MIN_BASELINE_RUNS = 3
+# the compared metrics, and whether higher values are worse
+COMPARED_METRICS = {
+    "gps_per_second": False,
+    "latency_p50_ms": True,
+    "latency_p99_ms": True,
+}
+
+
+def get_peak_rss_mb():
+    """Returns the peak RSS of this process, or of its largest child process
+    when larger, in MB (ru_maxrss is in KB on Linux)"""
+    return (
+        max(
+            resource.getrusage(who).ru_maxrss
+            for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)
+        )
+        / 1024
+    )
+
+
+def to_milliseconds(seconds):
+    """Returns seconds in rounded milliseconds, keeping None"""
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def get_run_summary(run_id, job):
+    """Returns the GeocodingRunHistory row of the current run, from the run
+    clock and the counters and GP durations of the ProgressReporters"""
+    counters = get_counters()
+    gps_attempted = sum(get_counters("gps_").values())
+    wall_seconds = get_elapsed()
+    return GeocodingRunHistory(
+        run_id=run_id,
+        job=job,
+        started_at=datetime.now(timezone.utc).replace(tzinfo=None)
+        - timedelta(seconds=wall_seconds),
+        gps_attempted=gps_attempted,
+        gps_succeeded=counters.get("gps_succeeded", 0),
+        api_calls=counters.get("api_calls", 0),
+        api_retries=counters.get("api_retries", 0),
+        api_cache_hits=counters.get("api_cache_hits", 0),
+        wall_seconds=round(wall_seconds, 3),
+        gps_per_second=round(gps_attempted / wall_seconds, 3) if wall_seconds else 0,
+        latency_p50_ms=to_milliseconds(get_gp_duration_percentile(0.5)),
+        latency_p99_ms=to_milliseconds(get_gp_duration_percentile(0.99)),
+        peak_rss_mb=round(get_peak_rss_mb(), 1),
+    )
+
+
+def record_run(engine, run_id, job):
+    """Logs the summary of the current run and stores it. A failure to store
+    it is logged without failing the run"""
+    summary = get_run_summary(run_id, job)
+    logger.info(
+        "Run summary",
+        value={
+            column.name: str(getattr(summary, column.name))
+            for column in GeocodingRunHistory.__table__.columns
+        },
+    )
+    try:
+        with sessionmaker(bind=engine)() as session:
+            session.add(summary)
+            session.commit()
+    except SQLAlchemyError:
+        logger.warn(
+            "Failed to record the run history",
+            value={"run_id": run_id},
+            exc_info=True,
+        )
+
+
+def check_run_regressions(session, job):
+    """Compares the latest run of a job with the median of its
+    RUN_HISTORY_BASELINE_RUNS previous runs, ignoring the runs of fewer than
+    RUN_HISTORY_MIN_GPS GPs, and returns the regressed metrics as
+    (metric, value, baseline) tuples. A small latest run is not checked"""
+    latest = (
+        session.execute(
+            select(GeocodingRunHistory)
+            .where(GeocodingRunHistory.job == job)
+            .order_by(GeocodingRunHistory.started_at.desc())
+            .limit(1)
+        )
+        .scalars()
+        .first()
+    )
+    if latest is None:
+        logger.info("No run for a regression check", value={"job": job})
+        return []
+    if latest.gps_attempted < Config.RUN_HISTORY_MIN_GPS:
+        logger.info(
+            "Latest run too small for a regression check",
+            value={
+                "job": job,
+                "run_id": latest.run_id,
+                "gps_attempted": str(latest.gps_attempted),
+            },
+        )
+        return []
+
+    previous_runs = (
+        session.execute(
+            select(GeocodingRunHistory)
+            .where(
+                GeocodingRunHistory.job == job,
+                GeocodingRunHistory.started_at < latest.started_at,
+                GeocodingRunHistory.gps_attempted >= Config.RUN_HISTORY_MIN_GPS,
+            )
+            .order_by(GeocodingRunHistory.started_at.desc())
+            .limit(Config.RUN_HISTORY_BASELINE_RUNS)
+        )
+        .scalars()
+        .all()
+    )
+    if len(previous_runs) < MIN_BASELINE_RUNS:
+        logger.info(
+            "Not enough runs for a regression check",
+            value={"job": job, "runs": str(len(previous_runs) + 1)},
+        )
+        return []
+
+    regressions = []
+    for metric, higher_is_worse in COMPARED_METRICS.items():
+        value = getattr(latest, metric)
+        values = [
+            getattr(run, metric)
+            for run in previous_runs
+            if getattr(run, metric) is not None
+        ]
+        if value is None or len(values) < MIN_BASELINE_RUNS:
+            continue
+        baseline = statistics.median(values)
+        if higher_is_worse:
+            regressed = value > baseline * (1 + Config.RUN_HISTORY_MAX_LATENCY_INCREASE)
+        else:
+            regressed = value < baseline * (1 - Config.RUN_HISTORY_MAX_THROUGHPUT_DROP)
+        if regressed:
+            regressions.append((metric, value, baseline))
+
+    log_value = {
+        "job": job,
+        "run_id": latest.run_id,
+        "baseline_runs": str(len(previous_runs)),
+        **{
+            metric: f"{value} (baseline {baseline})"
+            for metric, value, baseline in regressions
+        },
+    }
+    if regressions:
+        logger.error("Run regression detected", value=log_value)
+    else:
+        logger.info("No run regression", value=log_value)
+    return regressions
@@ -0,0 +1,24 @@
+"""Module that builds the offline ZIP centroid index from a CSV file"""
+
+import sys
+
+from app.config import Config
+from app.zip_centroids import build_zip_centroid_index
+
+logger = Config.logger
+
+
+def main():
+    """Main module"""
+    try:
+        build_zip_centroid_index(
+            Config.ZIP_CENTROID_SOURCE_PATH, Config.ZIP_CENTROID_INDEX_PATH
+        )
+    except Exception:
+        logger.error("Failed to build the ZIP centroid index.", exc_info=True)
+        return 1
+    return 0
+
+
+if "__main__" == __name__:
+    sys.exit(main())
@@ -0,0 +1,24 @@
+"""Module that geocodes a file of giving partners into an append-only results file"""
+
+import sys
+
+from app.config import Config
+from app.metrics import log_counters
+from app.services.bulk_backfill import run_bulk_backfill
+
+logger = Config.logger
+
+
+def main():
+    """Main module"""
+    try:
+        run_bulk_backfill(Config.BULK_INPUT_PATH, Config.BULK_OUTPUT_PATH)
+        log_counters("Geocoding API payloads", prefix="geocoding_")
+    except Exception:
+        logger.error("Failed to run bulk backfill.", exc_info=True)
+        return 1
+    return 0
+
+
+if "__main__" == __name__:
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""Module that loads a bulk backfill results file into the mysql server"""
+
+import os
+import sys
+
+from app.config import Config
+from app.models import get_engine, get_session
+from app.services.bulk_backfill import load_backfill_results
+from app.services.location_and_outlines import get_sns_client, get_sns_client_local
+
+logger = Config.logger
+
+
+def main():
+    """Main module"""
+    engine = None
+    try:
+        if os.environ.get("LOCALSTACK_HOSTNAME"):
+            sns_client = get_sns_client_local()
+        else:
+            sns_client = get_sns_client()
+
+        engine = get_engine(
+            db_host=Config.PLATFORM_DB_HOST_WRITE,
+            db_port=Config.PLATFORM_DB_PORT,
+            db_user=Config.PLATFORM_DB_USERNAME,
+            db_password=Config.PLATFORM_DB_PASSWORD,
+            db_name=Config.PLATFORM_DB_DATABASE,
+        )
+        with get_session(engine) as session:
+            load_backfill_results(
+                session, Config.BULK_OUTPUT_PATH, sns_client=sns_client
+            )
+    except Exception:
+        logger.error("Failed to load bulk backfill results.", exc_info=True)
+        return 1
+    finally:
+        if engine:
+            engine.dispose()
+    return 0
+
+
+if "__main__" == __name__:
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""Module that checks the latest run of each job against its run history and
+exits non-zero on a throughput or latency regression"""
+
+import argparse
+import sys
+
+from app.config import Config
+from app.models import get_engine, get_session
+from app.run_history import JOBS, check_run_regressions
+
+logger = Config.logger
+
+
+def main(argv=()):
+    """Main module"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--job",
+        choices=JOBS,
+        action="append",
+        help="job to check, repeatable, every job by default",
+    )
+    args = parser.parse_args(argv)
+    engine = None
+    try:
+        engine = get_engine(
+            db_host=Config.PLATFORM_DB_HOST_WRITE,
+            db_port=Config.PLATFORM_DB_PORT,
+            db_user=Config.PLATFORM_DB_USERNAME,
+            db_password=Config.PLATFORM_DB_PASSWORD,
+            db_name=Config.PLATFORM_DB_DATABASE,
+        )
+        with get_session(engine) as session:
+            regressions = [
+                regression
+                for job in args.job or JOBS
+                for regression in check_run_regressions(session, job)
+            ]
+    except Exception:
+        logger.error("Failed to check the run history.", exc_info=True)
+        return 1
+    finally:
+        if engine:
+            engine.dispose()
+    return 1 if regressions else 0
+
+
+if "__main__" == __name__:
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,35 @@
+"""Module that converts the stored outlines to OUTLINES_STORAGE_FORMAT"""
+
+import sys
+
+from app.config import Config
+from app.models import get_engine, get_session
+from app.services.outline_storage import convert_outlines
+
+logger = Config.logger
+
+
+def main():
+    """Main module"""
+    engine = None
+    try:
+        engine = get_engine(
+            db_host=Config.PLATFORM_DB_HOST_WRITE,
+            db_port=Config.PLATFORM_DB_PORT,
+            db_user=Config.PLATFORM_DB_USERNAME,
+            db_password=Config.PLATFORM_DB_PASSWORD,
+            db_name=Config.PLATFORM_DB_DATABASE,
+        )
+        with get_session(engine) as session:
+            convert_outlines(session)
+    except Exception:
+        logger.error("Failed to convert the stored outlines.", exc_info=True)
+        return 1
+    finally:
+        if engine:
+            engine.dispose()
+    return 0
+
+
+if "__main__" == __name__:
+    sys.exit(main())
@@ -1,23 +1,36 @@
 """Module that connects to mysql server and performs database operations"""
 
+import argparse
 import os
 import sys
 
 from app.config import Config
-from app.models import get_engine, get_session
+from app.google_api_calls import shutdown_hedge_executor
+from app.metrics import log_counters
+from app.models import get_engine, get_read_engine, get_session
+from app.quota import configure_quota_ledger, log_quota_status
+from app.run_control import add_run_arguments, configure_run
+from app.run_history import record_run
 from app.services.location_and_outlines import (
     get_sns_client,
     get_sns_client_local,
     run_location_and_outlines,
 )
+from app.services.search_sync_relay import relay_after_geocoding
+from app.tracing import configure_tracing, shutdown_tracing
 
 logger = Config.logger
 
 
-def main():
+def main(argv=()):
     """Main module"""
-    engine = None
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_run_arguments(parser)
+    args = parser.parse_args(argv)
+    engine = read_engine = None
     try:
+        configure_run(args.max_runtime)
+        run_id = configure_tracing()
         if os.environ.get("LOCALSTACK_HOSTNAME"):
             sns_client = get_sns_client_local()
         else:
@@ -30,17 +43,33 @@ def main():
             db_password=Config.PLATFORM_DB_PASSWORD,
             db_name=Config.PLATFORM_DB_DATABASE,
         )
-        with get_session(engine) as session:
+        if Config.QUOTA_ENABLED:
+            configure_quota_ledger(engine)
+        read_engine = get_read_engine()
+        with get_session(engine, read_engine) as session:
             run_location_and_outlines(session, sns_client)
+            if Config.SEARCH_SYNC_OUTBOX_ENABLED:
+                relay_after_geocoding(session, sns_client)
+            if Config.QUOTA_ENABLED:
+                log_quota_status(session)
+        log_counters("Geocoding API payloads", prefix="geocoding_")
+        log_counters("Change detection", prefix="writes_")
+        if Config.RUN_HISTORY_ENABLED:
+            record_run(engine, run_id, "donee_geocoder")
 
     except Exception:
         logger.error("Failed to update with Google data.", exc_info=True)
         return 1
     finally:
+        shutdown_tracing()
+        shutdown_hedge_executor()
+        configure_quota_ledger(None)
         if engine:
             engine.dispose()
+        if read_engine:
+            read_engine.dispose()
     return 0
 
 
 if "__main__" == __name__:
-    sys.exit(main())
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,74 @@
+"""Module that runs the on-demand geocoding HTTP service"""
+
+import os
+import signal
+import sys
+import threading
+
+from app.config import Config
+from app.google_api_calls import shutdown_hedge_executor
+from app.models import get_engine, get_read_engine, get_session
+from app.quota import configure_quota_ledger
+from app.services.geocoding_service import GeocodingHTTPServer, GeocodingService
+from app.services.location_and_outlines import get_sns_client, get_sns_client_local
+from app.tracing import configure_tracing, shutdown_tracing
+
+logger = Config.logger
+
+
+def main():
+    """Main module"""
+    engine = read_engine = server = None
+    try:
+        configure_tracing()
+        if os.environ.get("LOCALSTACK_HOSTNAME"):
+            sns_client = get_sns_client_local()
+        else:
+            sns_client = get_sns_client()
+
+        engine = get_engine(
+            db_host=Config.PLATFORM_DB_HOST_WRITE,
+            db_port=Config.PLATFORM_DB_PORT,
+            db_user=Config.PLATFORM_DB_USERNAME,
+            db_password=Config.PLATFORM_DB_PASSWORD,
+            db_name=Config.PLATFORM_DB_DATABASE,
+        )
+        if Config.QUOTA_ENABLED:
+            configure_quota_ledger(engine)
+        read_engine = get_read_engine()
+        service = GeocodingService(
+            session_factory=lambda: get_session(engine, read_engine),
+            sns_client=sns_client,
+        )
+        server = GeocodingHTTPServer(
+            (Config.SERVICE_HOST, Config.SERVICE_PORT), service
+        )
+        # shutdown() blocks until serve_forever returns, so not in the handler
+        signal.signal(
+            signal.SIGTERM,
+            lambda *_: threading.Thread(target=server.shutdown).start(),
+        )
+        logger.info(
+            "Geocoding service listening",
+            value={"host": Config.SERVICE_HOST, "port": str(Config.SERVICE_PORT)},
+        )
+        server.serve_forever()
+
+    except Exception:
+        logger.error("Geocoding service failed.", exc_info=True)
+        return 1
+    finally:
+        if server:
+            server.server_close()
+        shutdown_tracing()
+        shutdown_hedge_executor()
+        configure_quota_ledger(None)
+        if engine:
+            engine.dispose()
+        if read_engine:
+            read_engine.dispose()
+    return 0
+
+
+if "__main__" == __name__:
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""Module that rebuilds the geohash index of the GP coordinates"""
+
+import sys
+
+from app.config import Config
+from app.models import get_engine, get_read_engine, get_session
+from app.services.nearby_giving_partners import (
+    find_duplicate_locations,
+    rebuild_geohash_index,
+)
+
+logger = Config.logger
+
+
+def main():
+    """Main module"""
+    engine = read_engine = None
+    try:
+        engine = get_engine(
+            db_host=Config.PLATFORM_DB_HOST_WRITE,
+            db_port=Config.PLATFORM_DB_PORT,
+            db_user=Config.PLATFORM_DB_USERNAME,
+            db_password=Config.PLATFORM_DB_PASSWORD,
+            db_name=Config.PLATFORM_DB_DATABASE,
+        )
+        read_engine = get_read_engine()
+        with get_session(engine, read_engine) as session:
+            rebuild_geohash_index(session)
+            duplicates = find_duplicate_locations(session)
+            logger.info(
+                "Found duplicate GP locations",
+                value={
+                    "cells": str(len(duplicates)),
+                    "giving_partner_ids": str([ids for _, ids in duplicates[:20]]),
+                },
+            )
+    except Exception:
+        logger.error("Failed to rebuild the geohash index.", exc_info=True)
+        return 1
+    finally:
+        if engine:
+            engine.dispose()
+        if read_engine:
+            read_engine.dispose()
+    return 0
+
+
+if "__main__" == __name__:
+    sys.exit(main())
@@ -0,0 +1,42 @@
+"""Module that relays the search-sync outbox to SNS"""
+
+import os
+import sys
+
+from app.config import Config
+from app.models import get_engine, get_session
+from app.services.location_and_outlines import get_sns_client, get_sns_client_local
+from app.services.search_sync_relay import run_search_sync_relay
+
+logger = Config.logger
+
+
+def main():
+    """Main module"""
+    engine = None
+    try:
+        if os.environ.get("LOCALSTACK_HOSTNAME"):
+            sns_client = get_sns_client_local()
+        else:
+            sns_client = get_sns_client()
+
+        engine = get_engine(
+            db_host=Config.PLATFORM_DB_HOST_WRITE,
+            db_port=Config.PLATFORM_DB_PORT,
+            db_user=Config.PLATFORM_DB_USERNAME,
+            db_password=Config.PLATFORM_DB_PASSWORD,
+            db_name=Config.PLATFORM_DB_DATABASE,
+        )
+        with get_session(engine) as session:
+            run_search_sync_relay(session, sns_client)
+    except Exception:
+        logger.error("Failed to relay search-sync events.", exc_info=True)
+        return 1
+    finally:
+        if engine:
+            engine.dispose()
+    return 0
+
+
+if "__main__" == __name__:
+    sys.exit(main())
@@ -1,12 +1,22 @@
 """Module containing service functions outlines only path"""
 
 from app.config import Config
+from app.enums import ResponseProfile
 from app.google_api_calls import geocoding_api_address
 from app.helper import (
     extract_building_polygons,
     get_giving_partners,
     insert_google_outlines,
 )
+from app.metrics import ProgressReporter
+from app.process_pool import (
+    get_process_pool,
+    iter_inline_giving_partners,
+    iter_pooled_extractions,
+)
+from app.quota import QuotaExceededError
+from app.run_control import iter_until_stopped
+from app.tracing import giving_partner_span, start_span
 
 logger = Config.logger
 
@@ -27,9 +37,49 @@ def run_outlines(session):
         )
         return
 
-    for giving_partner in result:
+    if Config.PROCESS_POOL_ENABLED:
+        with get_process_pool() as pool:
+            _process_giving_partners(
+                session,
+                iter_pooled_extractions(
+                    pool, iter_until_stopped(result), ResponseProfile.OUTLINES
+                ),
+            )
+    else:
+        _process_giving_partners(
+            session,
+            iter_inline_giving_partners(iter_until_stopped(result)),
+        )
+
+
+def _process_giving_partners(session, giving_partners):
+    """Processes (giving_partner, extraction, started_at, span) tuples, where
+    extraction is the future of a pooled extraction or None to process the GP
+    inline, started_at the time.monotonic() at which the GP started and span
+    its open span, if any"""
+    progress = ProgressReporter("Outlines")
+    for giving_partner, extraction, started_at, span in giving_partners:
         try:
-            process_outlines(session, giving_partner)
+            with giving_partner_span(giving_partner.donee_id, span):
+                if extraction is None:
+                    process_outlines(session, giving_partner)
+                else:
+                    _, _, building_outlines, outline_metrics = extraction.result()
+                    store_outlines(
+                        session,
+                        giving_partner,
+                        building_outlines,
+                        outline_metrics=outline_metrics,
+                    )
+            progress.record("succeeded", started_at)
+        except QuotaExceededError:
+            logger.error(
+                "Stopping run, Geocoding API quota exceeded",
+                value={
+                    "giving_partner_id": str(giving_partner.donee_id),
+                },
+            )
+            break
         except Exception:
             logger.error(
                 "Error processing outlines for giving partner",
@@ -38,10 +88,12 @@ def run_outlines(session):
                 },
                 exc_info=True,
             )
+            progress.record("failed", started_at)
+    progress.log()
 
 
 def process_outlines(session, giving_partner):
-    """process_outlines"""
+    """process_outlines, returning whether the stored outlines changed"""
     logger.info(
         "Processing outline for giving partner",
         value={
@@ -54,21 +106,29 @@ def process_outlines(session, giving_partner):
         giving_partner.state,
         giving_partner.zip,
         giving_partner.country,
+        profile=ResponseProfile.OUTLINES,
     )
 
     destinations = (geocoding_result or {}).get("destinations", [])
-    building_outlines = extract_building_polygons(destinations)
+    with start_span("extract_building_polygons"):
+        building_outlines = extract_building_polygons(destinations)
+    return store_outlines(session, giving_partner, building_outlines)
+
 
+def store_outlines(session, giving_partner, building_outlines, **insert_kwargs):
+    """Inserts the building outlines of a giving partner, if any, and returns
+    whether they changed"""
     if building_outlines:
-        insert_google_outlines(
+        return insert_google_outlines(
             session,
             giving_partner.donee_id,
             building_outlines,
+            **insert_kwargs,
         )
-    else:
-        logger.info(
-            "Unable to find outlines for giving partner",
-            value={
-                "giving_partner_id": str(giving_partner.donee_id),
-            },
-        )
+    logger.info(
+        "Unable to find outlines for giving partner",
+        value={
+            "giving_partner_id": str(giving_partner.donee_id),
+        },
+    )
+    return False
@@ -0,0 +1,280 @@
+"""Module containing service functions for the offline bulk backfill path"""
+
+import csv
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+
+from sqlalchemy import func, update
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.config import Config
+from app.google_api_calls import geocoding_api_address
+from app.helper import (
+    add_search_sync_outbox,
+    extract_building_polygons,
+    get_dequeue_statement,
+    get_lat_lon,
+    get_location_source_values,
+    get_outline_values,
+)
+from app.models import (
+    GivingPartnerLocationSource,
+    GivingPartnerOutlineMetrics,
+    GivingPartnerOutlines,
+    GivingPartnerRow,
+    GivingPartners,
+)
+from app.services.location_and_outlines import publish_sns_search_sync
+from app.services.nearby_giving_partners import upsert_geohashes
+from app.vector_geometry import compute_outline_metrics_batch
+
+logger = Config.logger
+
+
+def read_giving_partner_records(path):
+    """Yields GivingPartnerRows from a CSV (or mysql CSV export) or JSONL file"""
+    with open(path, encoding="utf-8", newline="") as input_file:
+        if path.endswith((".jsonl", ".json")):
+            rows = (json.loads(line) for line in input_file if line.strip())
+        else:
+            rows = csv.DictReader(input_file)
+        for row in rows:
+            yield GivingPartnerRow(
+                donee_id=int(row["donee_id"]),
+                **{
+                    field: row.get(field) or ""
+                    for field in GivingPartnerRow._fields[1:]
+                },
+            )
+
+
+def read_processed_ids(path):
+    """Returns the giving partner ids already present in a backfill output file"""
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as output_file:
+        return {
+            json.loads(line)["giving_partner_id"]
+            for line in output_file
+            if line.strip()
+        }
+
+
+def geocode_record(record):
+    """Geocodes a single record and returns the result line to append"""
+    geocoding_result = geocoding_api_address(
+        record.address,
+        record.city,
+        record.state,
+        record.zip,
+        record.country,
+    )
+    destinations = (geocoding_result or {}).get("destinations", [])
+    latitude, longitude = get_lat_lon(destinations)
+    return {
+        "giving_partner_id": record.donee_id,
+        "latitude": latitude,
+        "longitude": longitude,
+        "outlines": extract_building_polygons(destinations),
+        "geocoded_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def _safe_geocode_record(record):
+    """geocode_record that logs and swallows errors so a rerun can retry the GP"""
+    try:
+        return geocode_record(record)
+    except Exception:
+        logger.error(
+            "Error geocoding giving partner for bulk backfill",
+            value={
+                "giving_partner_id": str(record.donee_id),
+            },
+            exc_info=True,
+        )
+        return None
+
+
+def write_results(futures, output_file):
+    """Appends the results of done futures to output_file and returns the
+    (written, failed) counts"""
+    written = failed = 0
+    for future in futures:
+        result = future.result()
+        if result is None:
+            failed += 1
+            continue
+        output_file.write(json.dumps(result) + "\n")
+        written += 1
+    output_file.flush()
+    return written, failed
+
+
+def run_bulk_backfill(input_path, output_path, workers=None):
+    """Geocodes every record of input_path not yet in output_path and appends
+    the results to output_path, which makes the run resumable. At most twice
+    as many records as workers are in flight, so the input is read as the
+    workers free up instead of being queued whole"""
+    workers = workers or Config.BULK_WORKERS
+    processed_ids = read_processed_ids(output_path)
+
+    written = failed = skipped = 0
+    in_flight = set()
+    with ThreadPoolExecutor(max_workers=workers) as executor, open(
+        output_path, "a", encoding="utf-8"
+    ) as output_file:
+        for record in read_giving_partner_records(input_path):
+            if record.donee_id in processed_ids:
+                skipped += 1
+                continue
+            if len(in_flight) >= workers * 2:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                done_written, done_failed = write_results(done, output_file)
+                written += done_written
+                failed += done_failed
+            in_flight.add(executor.submit(_safe_geocode_record, record))
+        done_written, done_failed = write_results(wait(in_flight).done, output_file)
+        written += done_written
+        failed += done_failed
+
+    logger.info(
+        "Finished bulk backfill",
+        value={
+            "written": str(written),
+            "failed": str(failed),
+            "skipped": str(skipped),
+        },
+    )
+    return written, failed
+
+
+def read_backfill_results(path, batch_size):
+    """Yields lists of at most batch_size result lines from a backfill output file"""
+    batch = []
+    with open(path, encoding="utf-8") as results_file:
+        for line in results_file:
+            if not line.strip():
+                continue
+            batch.append(json.loads(line))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def load_backfill_results(session, path, batch_size=None, sns_client=None):
+    """Bulk loads a backfill output file into donee_info and
+    giving_partner_outlines. Like insert_google_data, each batch also records
+    the location sources, dequeues the GPs and queues their search-sync events
+    in the outbox, or publishes them with sns_client after the commit"""
+    loaded = 0
+    for batch in read_backfill_results(path, batch_size or Config.BULK_LOAD_BATCH_SIZE):
+        coordinates = [
+            {
+                "donee_id": result["giving_partner_id"],
+                "donee_lat": result["latitude"],
+                "donee_lon": result["longitude"],
+            }
+            for result in batch
+        ]
+        located = [result for result in batch if result.get("outlines")]
+        outlines = [
+            {
+                "giving_partner_id": result["giving_partner_id"],
+                **get_outline_values(result["outlines"]),
+            }
+            for result in located
+        ]
+        # one vectorized pass over the whole batch
+        outline_metrics = (
+            [
+                {"giving_partner_id": result["giving_partner_id"], **metrics}
+                for result, metrics in zip(
+                    located,
+                    compute_outline_metrics_batch(
+                        [result["outlines"] for result in located]
+                    ),
+                )
+                if metrics is not None
+            ]
+            if Config.OUTLINE_METRICS_ENABLED
+            else []
+        )
+        try:
+            session.execute(update(GivingPartners), coordinates)
+            if outlines:
+                statement = insert(GivingPartnerOutlines)
+                session.execute(
+                    statement.on_duplicate_key_update(
+                        {
+                            column: statement.inserted[column]
+                            for column in outlines[0]
+                            if column != "giving_partner_id"
+                        }
+                    ),
+                    outlines,
+                )
+            if outline_metrics:
+                statement = insert(GivingPartnerOutlineMetrics)
+                session.execute(
+                    statement.on_duplicate_key_update(
+                        {
+                            column: statement.inserted[column]
+                            for column in outline_metrics[0]
+                            if column != "giving_partner_id"
+                        }
+                    ),
+                    outline_metrics,
+                )
+            if Config.GEOHASH_INDEX_ENABLED:
+                upsert_geohashes(
+                    session,
+                    [
+                        (row["donee_id"], row["donee_lat"], row["donee_lon"])
+                        for row in coordinates
+                        if (row["donee_lat"], row["donee_lon"]) != (-1, -1)
+                    ],
+                )
+            if Config.ZIP_CENTROID_FALLBACK_ENABLED:
+                statement = insert(GivingPartnerLocationSource)
+                session.execute(
+                    statement.on_duplicate_key_update(
+                        source=statement.inserted.source,
+                        precision=statement.inserted.precision,
+                        updated_at=func.now(),
+                    ),
+                    [
+                        get_location_source_values(
+                            row["donee_id"], row["donee_lat"], row["donee_lon"]
+                        )
+                        for row in coordinates
+                    ],
+                )
+            if Config.GEOCODING_QUEUE_ENABLED:
+                session.execute(
+                    get_dequeue_statement(*(row["donee_id"] for row in coordinates))
+                )
+            for row in coordinates:
+                add_search_sync_outbox(session, row["donee_id"])
+            session.commit()
+        except SQLAlchemyError:
+            session.rollback()
+            logger.error(
+                "Error loading bulk backfill batch",
+                value={
+                    "first_giving_partner_id": str(batch[0]["giving_partner_id"]),
+                    "loaded": str(loaded),
+                },
+            )
+            raise
+        if sns_client is not None and not Config.SEARCH_SYNC_OUTBOX_ENABLED:
+            for row in coordinates:
+                publish_sns_search_sync(sns_client, row["donee_id"])
+        loaded += len(batch)
+
+    logger.info("Finished loading bulk backfill", value={"loaded": str(loaded)})
+    return loaded
@@ -0,0 +1,318 @@
+"""Module containing the on-demand geocoding HTTP service.
+
+Identical concurrent requests are coalesced into one upstream call, answers
+are kept in an in-memory LRU in front of the optional persistent cache (the
+response archive), and upstream calls are bounded by a semaphore"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tenacity import RetryError
+
+from app.config import Config
+from app.enums import ResponseProfile
+from app.google_api_calls import geocoding_api_address, get_address_query
+from app.helper import (
+    extract_building_polygons,
+    get_giving_partners,
+    get_lat_lon,
+    insert_google_data,
+)
+from app.metrics import increment_counter
+from app.quota import QuotaExceededError
+from app.response_archive import (
+    ArchiveMissError,
+    get_archive_key,
+    lookup_response,
+    record_response,
+)
+from app.services.location_and_outlines import publish_sns_search_sync
+
+logger = Config.logger
+
+ADDRESS_FIELDS = ("address", "city", "state", "zip", "country")
+
+
+class UpstreamBusyError(Exception):
+    """Raised when no upstream slot frees up in time"""
+
+
+class GivingPartnerNotFoundError(Exception):
+    """Raised when the GP of a request does not exist"""
+
+
+class LRUCache:
+    """Thread-safe least recently used cache with a time to live"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """Returns the cached value of key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """Caches value, evicting the least recently used entry when full"""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+class SingleFlight:  # pylint: disable=too-few-public-methods
+    """Runs one call per key at a time, the concurrent callers of the same key
+    waiting for and sharing its result"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, function):
+        """Returns (result of function, whether it was shared with a call
+        already in flight)"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = function()
+            future.set_result(result)
+            return result, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+def parse_geocode_request(payload):
+    """Returns the (giving_partner_id, address fields, outlines) of a geocode
+    request body, the address fields being None for a GP. Raises ValueError
+    when the body is invalid"""
+    try:
+        body = json.loads(payload)
+        outlines = bool(body.get("outlines"))
+        if "giving_partner_id" in body:
+            return int(body["giving_partner_id"]), None, outlines
+        return (
+            None,
+            tuple(str(body.get(field) or "") for field in ADDRESS_FIELDS),
+            outlines,
+        )
+    except (AttributeError, TypeError, ValueError) as e:
+        raise ValueError("Invalid geocode request") from e
+
+
+def extract_result(response):
+    """Returns the coordinates and outlines of a geocoding response"""
+    destinations = (response or {}).get("destinations", [])
+    latitude, longitude = get_lat_lon(destinations)
+    return {
+        "latitude": latitude,
+        "longitude": longitude,
+        "outlines": extract_building_polygons(destinations),
+    }
+
+
+class GeocodingService:
+    """Geocodes addresses and GPs on demand"""
+
+    def __init__(
+        self,
+        session_factory=None,
+        sns_client=None,
+        cache_size=None,
+        upstream_concurrency=None,
+    ):
+        self.session_factory = session_factory
+        self.sns_client = sns_client
+        self.cache = LRUCache(
+            cache_size or Config.SERVICE_CACHE_SIZE, Config.SERVICE_CACHE_TTL_SECONDS
+        )
+        self.single_flight = SingleFlight()
+        self.upstream = threading.BoundedSemaphore(
+            upstream_concurrency or Config.SERVICE_UPSTREAM_CONCURRENCY
+        )
+
+    def geocode_address(self, address, city, state, zipcode, country, outlines=False):
+        """Returns the coordinates and outlines of an address"""
+        # the persistent cache only holds full responses
+        profile = (
+            ResponseProfile.FULL
+            if outlines or Config.SERVICE_PERSISTENT_CACHE_ENABLED
+            else ResponseProfile.LOCATION
+        )
+        data = get_address_query(address, city, state, zipcode, country)
+        key = (get_archive_key(data), profile.value)
+
+        result = self.cache.get(key)
+        if result is not None:
+            increment_counter("service_cache_hits")
+            return result
+        result, shared = self.single_flight.do(
+            key,
+            lambda: self._fetch(
+                key, data, (address, city, state, zipcode, country), profile
+            ),
+        )
+        if shared:
+            increment_counter("service_coalesced_requests")
+        return result
+
+    def _fetch(self, key, data, address_fields, profile):
+        """Returns the result of the persistent cache or of an upstream call,
+        caching it before the coalesced callers are released"""
+        if Config.SERVICE_PERSISTENT_CACHE_ENABLED:
+            try:
+                response = lookup_response(data)
+            except ArchiveMissError:
+                response = self._call_upstream(address_fields, profile)
+                record_response(data, response)
+        else:
+            response = self._call_upstream(address_fields, profile)
+        result = extract_result(response)
+        self.cache.put(key, result)
+        return result
+
+    def _call_upstream(self, address_fields, profile):
+        """Calls the Geocoding API once an upstream slot is free"""
+        if not self.upstream.acquire(  # pylint: disable=consider-using-with
+            timeout=Config.SERVICE_UPSTREAM_WAIT_SECONDS
+        ):
+            raise UpstreamBusyError()
+        try:
+            increment_counter("service_upstream_calls")
+            return geocoding_api_address(*address_fields, profile=profile)
+        finally:
+            self.upstream.release()
+
+    def geocode_giving_partner(self, giving_partner_id, outlines=False):
+        """Geocodes a GP, stores its coordinates and outlines and returns them.
+        No session is held during the upstream call, which may be slow"""
+        with self.session_factory() as session:
+            giving_partners = get_giving_partners(session, [giving_partner_id])
+        if not giving_partners:
+            raise GivingPartnerNotFoundError(giving_partner_id)
+        giving_partner = giving_partners[0]
+        result = self.geocode_address(
+            giving_partner.address,
+            giving_partner.city,
+            giving_partner.state,
+            giving_partner.zip,
+            giving_partner.country,
+            outlines=outlines or Config.DONEE_GEOCODER_ENABLE_OUTLINES,
+        )
+        with self.session_factory() as session:
+            changed = insert_google_data(
+                session,
+                giving_partner,
+                result["latitude"],
+                result["longitude"],
+                result["outlines"],
+            )
+        if (
+            changed
+            and not Config.SEARCH_SYNC_OUTBOX_ENABLED
+            and self.sns_client is not None
+        ):
+            publish_sns_search_sync(self.sns_client, giving_partner_id)
+        return result
+
+
+class GeocodingRequestHandler(BaseHTTPRequestHandler):
+    """Serves POST /geocode and GET /health"""
+
+    server: "GeocodingHTTPServer"
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Handles the health check"""
+        if self.path == "/health":
+            self._send(200, {"status": "ok"})
+        else:
+            self._send(404, {"error": "Not found"})
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Handles a geocode request for an address or a giving_partner_id"""
+        if self.path != "/geocode":
+            self._send(404, {"error": "Not found"})
+            return
+        try:
+            giving_partner_id, address_fields, outlines = parse_geocode_request(
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            )
+        except ValueError:
+            self._send(400, {"error": "Invalid request"})
+            return
+        try:
+            if giving_partner_id is not None:
+                result = self.server.service.geocode_giving_partner(
+                    giving_partner_id, outlines
+                )
+            else:
+                result = self.server.service.geocode_address(
+                    *address_fields, outlines=outlines
+                )
+        except GivingPartnerNotFoundError:
+            self._send(404, {"error": "Giving partner not found"})
+            return
+        except QuotaExceededError:
+            self._send(429, {"error": "Geocoding API quota exceeded"})
+            return
+        except (UpstreamBusyError, RetryError):
+            self._send(503, {"error": "Geocoding API unavailable"})
+            return
+        except Exception:  # pylint: disable=broad-exception-caught
+            logger.error(
+                "Error geocoding on demand", value={"path": self.path}, exc_info=True
+            )
+            self._send(500, {"error": "Geocoding failed"})
+            return
+
+        if not outlines:
+            result = {k: v for k, v in result.items() if k != "outlines"}
+        self._send(200, result)
+
+    def _send(self, status, body):
+        """Sends a JSON response"""
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Logs the access log at debug level"""
+        logger.debug("Geocoding service request", value={"request": format % args})
+
+
+class GeocodingHTTPServer(ThreadingHTTPServer):
+    """Threaded HTTP server of a GeocodingService"""
+
+    daemon_threads = True
+
+    def __init__(self, server_address, service):
+        super().__init__(server_address, GeocodingRequestHandler)
+        self.service = service
@@ -5,15 +5,29 @@ import os
 import uuid
 
 import boto3
+from tenacity import RetryError
 
 from app.config import Config
-from app.google_api_calls import geocoding_api_address
+from app.google_api_calls import geocoding_api_address, get_response_profile
 from app.helper import (
+    SEARCH_SYNC_EVENT_KEY,
     extract_building_polygons,
     get_giving_partners,
     get_lat_lon,
+    get_search_sync_message,
     insert_google_data,
+    insert_zip_centroid_fallback,
+    reschedule_giving_partner,
 )
+from app.metrics import ProgressReporter
+from app.process_pool import (
+    get_process_pool,
+    iter_inline_giving_partners,
+    iter_pooled_extractions,
+)
+from app.quota import QuotaExceededError
+from app.run_control import iter_until_stopped
+from app.tracing import giving_partner_span, start_span, traced
 
 logger = Config.logger
 
@@ -26,10 +40,47 @@ def run_location_and_outlines(session, sns_client):
             "No Giving Partner(s) to process",
         )
         return
-    for giving_partner in result:
+    if Config.PROCESS_POOL_ENABLED:
+        with get_process_pool() as pool:
+            _process_giving_partners(
+                session,
+                sns_client,
+                iter_pooled_extractions(
+                    pool, iter_until_stopped(result), get_response_profile()
+                ),
+            )
+    else:
+        _process_giving_partners(
+            session,
+            sns_client,
+            iter_inline_giving_partners(iter_until_stopped(result)),
+        )
+
+
+def _process_giving_partners(session, sns_client, giving_partners):
+    """Processes (giving_partner, extraction, started_at, span) tuples, where
+    extraction is the future of a pooled extraction or None to process the GP
+    inline, started_at the time.monotonic() at which the GP started and span
+    its open span, if any"""
+    progress = ProgressReporter("Location and outlines")
+    for giving_partner, extraction, started_at, span in giving_partners:
         try:
-            process_location_and_outlines(session, giving_partner)
-            publish_sns_search_sync(sns_client, giving_partner.donee_id)
+            with giving_partner_span(giving_partner.donee_id, span):
+                if extraction is None:
+                    changed = process_location_and_outlines(session, giving_partner)
+                else:
+                    changed = _store_extraction(session, giving_partner, extraction)
+                if changed and not Config.SEARCH_SYNC_OUTBOX_ENABLED:
+                    publish_sns_search_sync(sns_client, giving_partner.donee_id)
+            progress.record("succeeded", started_at)
+        except QuotaExceededError:
+            logger.error(
+                "Stopping run, Geocoding API quota exceeded",
+                value={
+                    "giving_partner_id": str(giving_partner.donee_id),
+                },
+            )
+            break
         except Exception:
             logger.error(
                 "Error processing location and outlines for giving partner",
@@ -38,28 +89,96 @@ def run_location_and_outlines(session, sns_client):
                 },
                 exc_info=True,
             )
+            progress.record("failed", started_at)
+            if Config.GEOCODING_QUEUE_ENABLED:
+                reschedule_giving_partner(session, giving_partner.donee_id)
+    progress.log()
+
+
+def _store_extraction(session, giving_partner, extraction):
+    """Stores the result of a pooled extraction of a GP and returns whether
+    anything changed"""
+    try:
+        latitude, longitude, building_outlines, outline_metrics = extraction.result()
+    except RetryError as e:
+        store_throttled_fallback(session, giving_partner, e)
+        return True
+    if store_unlocated_fallback(
+        session, giving_partner, latitude, longitude, building_outlines
+    ):
+        return True
+    return insert_google_data(
+        session,
+        giving_partner,
+        latitude,
+        longitude,
+        building_outlines,
+        outline_metrics=outline_metrics,
+    )
+
+
+def store_throttled_fallback(session, giving_partner, error, search_sync=True):
+    """Stores the ZIP centroid of a GP whose Geocoding API call kept being
+    throttled, re-raising the error when there is no fallback for it"""
+    if not Config.ZIP_CENTROID_FALLBACK_ENABLED:
+        raise error
+    logger.warn(
+        "Geocoding API unavailable, falling back to the ZIP centroid",
+        value={
+            "giving_partner_id": str(giving_partner.donee_id),
+        },
+    )
+    if not insert_zip_centroid_fallback(
+        session, giving_partner, [], search_sync=search_sync
+    ):
+        raise error
+
+
+def store_unlocated_fallback(
+    session, giving_partner, latitude, longitude, outlines, search_sync=True
+):
+    """Stores the ZIP centroid of a GP Google could not locate and returns
+    whether it was stored"""
+    return (
+        Config.ZIP_CENTROID_FALLBACK_ENABLED
+        and (latitude, longitude) == (-1, -1)
+        and insert_zip_centroid_fallback(
+            session, giving_partner, outlines, search_sync=search_sync
+        )
+    )
 
 
 def process_location_and_outlines(session, giving_partner):
-    """Module that processes location and outlines each GP"""
+    """Module that processes location and outlines each GP, returning whether
+    anything changed"""
     logger.info(
         "Processing location and outline for giving partner",
         value={
             "giving_partner_id": str(giving_partner.donee_id),
         },
     )
-    geocoding_result = geocoding_api_address(
-        giving_partner.address,
-        giving_partner.city,
-        giving_partner.state,
-        giving_partner.zip,
-        giving_partner.country,
-    )
+    try:
+        geocoding_result = geocoding_api_address(
+            giving_partner.address,
+            giving_partner.city,
+            giving_partner.state,
+            giving_partner.zip,
+            giving_partner.country,
+            profile=get_response_profile(),
+        )
+    except RetryError as e:
+        store_throttled_fallback(session, giving_partner, e)
+        return True
     destinations = (geocoding_result or {}).get("destinations", [])
-    building_outlines = extract_building_polygons(destinations)
+    with start_span("extract_building_polygons"):
+        building_outlines = extract_building_polygons(destinations)
     latitude, longitude = get_lat_lon(destinations)
 
-    insert_google_data(
+    if store_unlocated_fallback(
+        session, giving_partner, latitude, longitude, building_outlines
+    ):
+        return True
+    return insert_google_data(
         session,
         giving_partner,
         latitude,
@@ -84,23 +203,20 @@ def get_sns_client_local():
     )
 
 
+@traced("publish_sns_search_sync")
 def publish_sns_search_sync(sns_client, giving_partner_id: int) -> None:
     """
     Publish a message to the SNS topic to sync the gp to search.
     """
-    sns_message = {
-        "data": {"giving_partner_id": giving_partner_id, "operation": "update"}
-    }
-
     sns_client.publish(
         TopicArn=Config.AWS_SNS_TOPIC,
-        Message=json.dumps(sns_message),
+        Message=json.dumps(get_search_sync_message(giving_partner_id)),
         MessageGroupId="group",
         MessageDeduplicationId=str(uuid.uuid4()),
         MessageAttributes={
             "eventKey": {
                 "DataType": "String",
-                "StringValue": "search.giving-partner-search-sync-requested",
+                "StringValue": SEARCH_SYNC_EVENT_KEY,
             }
         },
     )
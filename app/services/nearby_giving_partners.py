@@ -0,0 +1,178 @@
+"""Module containing service functions for the geohash index of the GPs"""
+
+from itertools import groupby
+
+from sqlalchemy import and_, delete, false, func, or_, select
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.config import Config
+from app.enums import CoordinateSource
+from app.geohash import encode_geohashes, query_nearest, query_radius
+from app.models import (
+    GivingPartnerGeohash,
+    GivingPartnerLocationSource,
+    GivingPartners,
+)
+
+logger = Config.logger
+
+
+def is_located():
+    """Returns the condition of the GPs with coordinates from Google"""
+    return and_(
+        GivingPartners.donee_lat != 0,
+        ~and_(GivingPartners.donee_lat == -1, GivingPartners.donee_lon == -1),
+    )
+
+
+def is_approximate(giving_partner_id):
+    """Returns the condition of the GPs whose coordinates don't come from
+    Google, such as ZIP centroids, which are kept out of the index. Their
+    sources are only recorded with ZIP_CENTROID_FALLBACK_ENABLED"""
+    if not Config.ZIP_CENTROID_FALLBACK_ENABLED:
+        return false()
+    return giving_partner_id.in_(
+        select(GivingPartnerLocationSource.giving_partner_id).where(
+            GivingPartnerLocationSource.source != CoordinateSource.GOOGLE.value
+        )
+    )
+
+
+def upsert_geohashes(session, rows):
+    """Upserts the geohash index rows of (giving_partner_id, latitude, longitude)"""
+    if not rows:
+        return
+    geohashes = encode_geohashes(
+        [latitude for _, latitude, _ in rows], [longitude for _, _, longitude in rows]
+    )
+    statement = insert(GivingPartnerGeohash)
+    session.execute(
+        statement.on_duplicate_key_update(
+            geohash=statement.inserted.geohash,
+            latitude=statement.inserted.latitude,
+            longitude=statement.inserted.longitude,
+        ),
+        [
+            {
+                "giving_partner_id": giving_partner_id,
+                "geohash": geohash.decode(),
+                "latitude": latitude,
+                "longitude": longitude,
+            }
+            for (giving_partner_id, latitude, longitude), geohash in zip(
+                rows, geohashes
+            )
+        ],
+    )
+
+
+def rebuild_geohash_index(session, batch_size=None):
+    """Indexes every GP located by Google in batches of donee_id ranges and
+    removes the other GPs, returning the number of indexed GPs"""
+    batch_size = batch_size or Config.GEOHASH_REBUILD_BATCH_SIZE
+    indexed = last_id = 0
+    try:
+        while True:
+            rows = session.execute(
+                select(
+                    GivingPartners.donee_id,
+                    GivingPartners.donee_lat,
+                    GivingPartners.donee_lon,
+                )
+                .where(
+                    GivingPartners.donee_id > last_id,
+                    is_located(),
+                    ~is_approximate(GivingPartners.donee_id),
+                )
+                .order_by(GivingPartners.donee_id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            upsert_geohashes(session, rows)
+            session.commit()
+            indexed += len(rows)
+            last_id = rows[-1][0]
+
+        session.execute(
+            delete(GivingPartnerGeohash).where(
+                or_(
+                    GivingPartnerGeohash.giving_partner_id.in_(
+                        select(GivingPartners.donee_id).where(~is_located())
+                    ),
+                    is_approximate(GivingPartnerGeohash.giving_partner_id),
+                )
+            )
+        )
+        session.commit()
+    except SQLAlchemyError:
+        session.rollback()
+        logger.error("Error rebuilding geohash index", value={"last_id": str(last_id)})
+        raise
+
+    logger.info("Rebuilt geohash index", value={"indexed": str(indexed)})
+    return indexed
+
+
+def _get_candidate_fetcher(session):
+    """Returns the fetch_candidates function reading the geohash cells with
+    one prefix range scan per cell"""
+
+    def fetch_candidates(cells):
+        return session.execute(
+            select(
+                GivingPartnerGeohash.giving_partner_id,
+                GivingPartnerGeohash.latitude,
+                GivingPartnerGeohash.longitude,
+            )
+            .where(or_(*(GivingPartnerGeohash.geohash.startswith(c) for c in cells)))
+            .execution_options(use_replica=True)
+        ).all()
+
+    return fetch_candidates
+
+
+def find_giving_partners_within_radius(session, latitude, longitude, radius):
+    """Returns the (giving_partner_id, distance) of the GPs within radius
+    meters of a point, nearest first"""
+    return query_radius(_get_candidate_fetcher(session), latitude, longitude, radius)
+
+
+def find_nearest_giving_partners(session, latitude, longitude, count, max_radius):
+    """Returns the (giving_partner_id, distance) of the count GPs nearest to a
+    point within max_radius meters"""
+    return query_nearest(
+        _get_candidate_fetcher(session), latitude, longitude, count, max_radius
+    )
+
+
+def find_duplicate_locations(session, precision=None):
+    """Returns (geohash cell, giving partner ids) of the cells shared by several
+    GPs, which are suspicious duplicate locations. GPs close to each other on
+    both sides of a cell border are not reported, nor are the approximate
+    locations, where GPs share a ZIP centroid. Reads the primary, as it
+    runs right after the rebuild, and groups the ids in Python since
+    group_concat truncates them at group_concat_max_len"""
+    cell = func.left(
+        GivingPartnerGeohash.geohash, precision or Config.GEOHASH_DUPLICATE_PRECISION
+    )
+    # indexed before approximate locations were kept out of the index
+    is_exact = ~is_approximate(GivingPartnerGeohash.giving_partner_id)
+    duplicate_cells = (
+        select(cell.label("cell"))
+        .where(is_exact)
+        .group_by(cell)
+        .having(func.count() > 1)
+        .subquery()
+    )
+    rows = session.execute(
+        select(duplicate_cells.c.cell, GivingPartnerGeohash.giving_partner_id)
+        .join(duplicate_cells, cell == duplicate_cells.c.cell)
+        .where(is_exact)
+        .order_by(duplicate_cells.c.cell, GivingPartnerGeohash.giving_partner_id)
+    )
+    return [
+        (geohash, [gp_id for _, gp_id in cell_rows])
+        for geohash, cell_rows in groupby(rows, key=lambda row: row[0])
+    ]
@@ -0,0 +1,90 @@
+"""Module containing service functions converting the stored outlines between
+the JSON and compact storage formats"""
+
+import json
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.config import Config
+from app.models import GivingPartnerOutlines
+from app.outline_encoding import (
+    get_outline_columns,
+    is_compact_column_enabled,
+    load_outlines,
+)
+
+logger = Config.logger
+
+
+def convert_outlines(session, storage_format=None, batch_size=None):
+    """Rewrites the stored outlines not yet in storage_format
+    (OUTLINES_STORAGE_FORMAT by default) in batches of giving_partner_id
+    ranges, returning the counts and the stored bytes before and after"""
+    storage_format = storage_format or Config.OUTLINES_STORAGE_FORMAT
+    if storage_format != "compact" and not is_compact_column_enabled():
+        raise ValueError("Converting outlines needs the outlines_compact column")
+    batch_size = batch_size or Config.OUTLINES_CONVERT_BATCH_SIZE
+    # the compact column tells the formats apart, rows written before outlines
+    # was declared none_as_null hold a JSON null rather than SQL NULL
+    if storage_format == "compact":
+        pending = GivingPartnerOutlines.outlines_compact.is_(None)
+    else:
+        pending = GivingPartnerOutlines.outlines_compact.is_not(None)
+    summary = {"converted": 0, "skipped": 0, "bytes_before": 0, "bytes_after": 0}
+    last_id = 0
+    try:
+        while True:
+            rows = session.execute(
+                select(
+                    GivingPartnerOutlines.giving_partner_id,
+                    GivingPartnerOutlines.outlines,
+                    GivingPartnerOutlines.outlines_compact,
+                )
+                .where(
+                    GivingPartnerOutlines.giving_partner_id > last_id,
+                    pending,
+                )
+                .order_by(GivingPartnerOutlines.giving_partner_id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            updates = []
+            for giving_partner_id, outlines, outlines_compact in rows:
+                outlines = load_outlines(outlines, outlines_compact)
+                columns = get_outline_columns(
+                    outlines, storage_format, with_compact=True
+                )
+                if storage_format == "compact" and columns["outlines_compact"] is None:
+                    # outlines the compact format can't hold stay JSON
+                    summary["skipped"] += 1
+                    continue
+                summary["bytes_before"] += get_stored_size(outlines_compact, outlines)
+                summary["bytes_after"] += get_stored_size(
+                    columns["outlines_compact"], columns["outlines"]
+                )
+                updates.append({"giving_partner_id": giving_partner_id, **columns})
+            if updates:
+                session.execute(update(GivingPartnerOutlines), updates)
+            session.commit()
+            summary["converted"] += len(updates)
+            last_id = rows[-1][0]
+    except SQLAlchemyError:
+        session.rollback()
+        logger.error("Error converting outlines", value={"last_id": str(last_id)})
+        raise
+
+    logger.info(
+        "Converted stored outlines",
+        value={"storage_format": storage_format}
+        | {name: str(count) for name, count in summary.items()},
+    )
+    return summary
+
+
+def get_stored_size(outlines_compact, outlines):
+    """Returns the stored byte size of a row's outlines"""
+    if outlines_compact is not None:
+        return len(outlines_compact)
+    return len(json.dumps(outlines).encode())
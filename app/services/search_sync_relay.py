@@ -0,0 +1,113 @@
+"""Module containing service functions for the search-sync outbox relay"""
+
+import json
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.config import Config
+from app.helper import SEARCH_SYNC_EVENT_KEY
+from app.models import SearchSyncOutbox
+
+logger = Config.logger
+
+# SNS PublishBatch accepts at most 10 entries per call
+SNS_BATCH_LIMIT = 10
+
+
+def run_search_sync_relay(session, sns_client):
+    """Drains the search-sync outbox to SNS and returns the published count.
+    No lock is held while SNS is called, so the GP writes adding events are
+    never blocked. Concurrent relays may read the same entries, which SNS
+    then deduplicates by their MessageDeduplicationId"""
+    published = 0
+    while True:
+        entries = session.execute(
+            select(SearchSyncOutbox.id, SearchSyncOutbox.message)
+            .order_by(SearchSyncOutbox.id)
+            .limit(Config.SEARCH_SYNC_RELAY_BATCH_SIZE)
+        ).all()
+        # ends the read transaction before the SNS calls
+        session.commit()
+        if not entries:
+            break
+
+        published_ids = []
+        for i in range(0, len(entries), SNS_BATCH_LIMIT):
+            published_ids.extend(
+                publish_sns_search_sync_batch(
+                    sns_client, entries[i : i + SNS_BATCH_LIMIT]
+                )
+            )
+
+        try:
+            if published_ids:
+                session.execute(
+                    delete(SearchSyncOutbox).where(
+                        SearchSyncOutbox.id.in_(published_ids)
+                    )
+                )
+            session.commit()
+        except SQLAlchemyError:
+            session.rollback()
+            logger.error(
+                "Error deleting published search-sync events",
+                value={"outbox_ids": str(published_ids)},
+            )
+            raise
+        published += len(published_ids)
+
+        if len(published_ids) < len(entries):
+            # failed entries stay in the outbox for the next relay run
+            break
+
+    logger.info(
+        "Relayed search-sync events to SNS", value={"published": str(published)}
+    )
+    return published
+
+
+def relay_after_geocoding(session, sns_client):
+    """Drains the outbox at the end of a geocoding job without changing its
+    exit status: the events left in the outbox are relayed by the next run"""
+    try:
+        return run_search_sync_relay(session, sns_client)
+    except Exception:
+        logger.error("Failed to relay search-sync events", exc_info=True)
+        return 0
+
+
+def publish_sns_search_sync_batch(sns_client, entries):
+    """Publishes up to 10 outbox entries in one SNS call and returns the ids
+    of the entries that were published"""
+    response = sns_client.publish_batch(
+        TopicArn=Config.AWS_SNS_TOPIC,
+        PublishBatchRequestEntries=[
+            {
+                "Id": str(entry.id),
+                "Message": json.dumps(entry.message),
+                "MessageGroupId": "group",
+                # deterministic so a relay that dies before deleting the
+                # entries does not emit duplicates within the dedup window
+                "MessageDeduplicationId": f"search-sync-{entry.id}",
+                "MessageAttributes": {
+                    "eventKey": {
+                        "DataType": "String",
+                        "StringValue": SEARCH_SYNC_EVENT_KEY,
+                    }
+                },
+            }
+            for entry in entries
+        ],
+    )
+
+    for failure in response.get("Failed", []):
+        logger.error(
+            "Failed to publish search-sync event",
+            value={
+                "outbox_id": failure.get("Id"),
+                "code": failure.get("Code"),
+                "message": failure.get("Message"),
+            },
+        )
+    return [int(success["Id"]) for success in response.get("Successful", [])]
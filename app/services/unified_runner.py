@@ -0,0 +1,203 @@
+"""Module containing service functions for the unified path, which stores the
+coordinates, the outlines and the search-sync event of a GP from a single
+Geocoding API call"""
+
+from tenacity import RetryError
+
+from app.config import Config
+from app.enums import ResponseProfile
+from app.google_api_calls import geocoding_api_address
+from app.helper import (
+    extract_building_polygons,
+    get_giving_partners,
+    get_lat_lon,
+    insert_google_data,
+    reschedule_giving_partner,
+)
+from app.metrics import ProgressReporter
+from app.process_pool import (
+    get_process_pool,
+    iter_inline_giving_partners,
+    iter_pooled_extractions,
+)
+from app.quota import QuotaExceededError
+from app.run_control import iter_until_stopped
+from app.services.building_outlines import store_outlines
+from app.services.location_and_outlines import (
+    publish_sns_search_sync,
+    store_throttled_fallback,
+    store_unlocated_fallback,
+)
+from app.tracing import giving_partner_span, start_span
+
+logger = Config.logger
+
+TARGETS = ("coordinates", "outlines", "search_sync")
+
+
+def get_targets():
+    """Returns the configured GEOCODING_TARGETS"""
+    targets = frozenset(Config.GEOCODING_TARGETS)
+    unknown = targets.difference(TARGETS)
+    if unknown or not targets & {"coordinates", "outlines"}:
+        raise ValueError(f"Invalid GEOCODING_TARGETS: {sorted(targets)}")
+    return targets
+
+
+def get_targets_profile(targets):
+    """Returns the response profile holding every stored field"""
+    if "outlines" not in targets:
+        return ResponseProfile.LOCATION
+    if "coordinates" not in targets:
+        return ResponseProfile.OUTLINES
+    return ResponseProfile.FULL
+
+
+def run_unified(session, sns_client, targets=None):
+    """Processes the GPs of GP_IDS, or the pending GPs without GP_IDS, with one
+    Geocoding API call each. Without the coordinates target GP_IDS is
+    required, as the pending GPs would stay pending and be geocoded again on
+    every run"""
+    targets = targets or get_targets()
+    gp_ids = [int(x.strip()) for x in Config.GP_IDS.split(",") if x.strip()]
+    if not gp_ids and "coordinates" not in targets:
+        logger.warn(
+            "`GP_IDS` is empty, it is required without the coordinates target",
+            value={"targets": ",".join(sorted(targets))},
+        )
+        return
+    result = get_giving_partners(session, gp_ids or None)
+    if len(result) == 0:
+        logger.info(
+            "No Giving Partner(s) to process",
+        )
+        return
+
+    profile = get_targets_profile(targets)
+    logger.info(
+        "Processing giving partners for targets",
+        value={"targets": ",".join(sorted(targets)), "count": str(len(result))},
+    )
+    if Config.PROCESS_POOL_ENABLED:
+        with get_process_pool() as pool:
+            _process_giving_partners(
+                session,
+                sns_client,
+                iter_pooled_extractions(pool, iter_until_stopped(result), profile),
+                targets,
+            )
+    else:
+        _process_giving_partners(
+            session,
+            sns_client,
+            iter_inline_giving_partners(iter_until_stopped(result)),
+            targets,
+        )
+
+
+def _process_giving_partners(session, sns_client, giving_partners, targets):
+    """Processes (giving_partner, extraction, started_at, span) tuples, where
+    extraction is the future of a pooled extraction or None to process the GP
+    inline, started_at the time.monotonic() at which the GP started and span
+    its open span, if any"""
+    progress = ProgressReporter("Unified")
+    profile = get_targets_profile(targets)
+    for giving_partner, extraction, started_at, span in giving_partners:
+        try:
+            with giving_partner_span(giving_partner.donee_id, span):
+                changed = process_giving_partner(
+                    session, giving_partner, targets, profile, extraction
+                )
+                if (
+                    changed
+                    and "search_sync" in targets
+                    and not Config.SEARCH_SYNC_OUTBOX_ENABLED
+                ):
+                    publish_sns_search_sync(sns_client, giving_partner.donee_id)
+            progress.record("succeeded", started_at)
+        except QuotaExceededError:
+            logger.error(
+                "Stopping run, Geocoding API quota exceeded",
+                value={
+                    "giving_partner_id": str(giving_partner.donee_id),
+                },
+            )
+            break
+        except Exception:
+            logger.error(
+                "Error processing giving partner",
+                value={
+                    "giving_partner_id": str(giving_partner.donee_id),
+                },
+                exc_info=True,
+            )
+            progress.record("failed", started_at)
+            if Config.GEOCODING_QUEUE_ENABLED and "coordinates" in targets:
+                reschedule_giving_partner(session, giving_partner.donee_id)
+    progress.log()
+
+
+def process_giving_partner(session, giving_partner, targets, profile, extraction=None):
+    """Geocodes a GP once, or reads its pooled extraction, and stores the
+    targeted fields of the response, returning whether anything changed. The
+    search-sync event only goes to the outbox when targeted"""
+    logger.info(
+        "Processing giving partner",
+        value={
+            "giving_partner_id": str(giving_partner.donee_id),
+        },
+    )
+    outline_metrics = None
+    search_sync = "search_sync" in targets
+    try:
+        if extraction is None:
+            geocoding_result = geocoding_api_address(
+                giving_partner.address,
+                giving_partner.city,
+                giving_partner.state,
+                giving_partner.zip,
+                giving_partner.country,
+                profile=profile,
+            )
+            destinations = (geocoding_result or {}).get("destinations", [])
+            with start_span("extract_building_polygons"):
+                building_outlines = extract_building_polygons(destinations)
+            latitude, longitude = get_lat_lon(destinations)
+        else:
+            latitude, longitude, building_outlines, outline_metrics = (
+                extraction.result()
+            )
+    except RetryError as e:
+        if "coordinates" not in targets:
+            raise
+        store_throttled_fallback(session, giving_partner, e, search_sync=search_sync)
+        return True
+
+    if "coordinates" not in targets:
+        return store_outlines(
+            session,
+            giving_partner,
+            building_outlines,
+            outline_metrics=outline_metrics,
+            search_sync=search_sync,
+        )
+    with_outlines = "outlines" in targets
+    if store_unlocated_fallback(
+        session,
+        giving_partner,
+        latitude,
+        longitude,
+        building_outlines if with_outlines else [],
+        search_sync=search_sync,
+    ):
+        return True
+    return insert_google_data(
+        session,
+        giving_partner,
+        latitude,
+        longitude,
+        building_outlines,
+        outline_metrics=outline_metrics,
+        with_outlines=with_outlines,
+        search_sync=search_sync,
+    )
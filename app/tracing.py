@@ -0,0 +1,147 @@
+"""Module that traces the processing of each GP with OpenTelemetry spans.
+Tracing is optional: without TRACING_ENABLED or the opentelemetry packages
+every span is a no-op"""
+
+import contextlib
+import contextvars
+import functools
+import uuid
+
+from app.config import Config
+
+try:
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    from opentelemetry.trace import use_span
+except ImportError:
+    TracerProvider = use_span = None
+
+try:
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+        OTLPSpanExporter,
+    )
+except ImportError:
+    OTLPSpanExporter = None
+
+logger = Config.logger
+
+_tracing = {}
+_giving_partner_id = contextvars.ContextVar("giving_partner_id", default=None)
+
+
+def get_span_exporter():
+    """Returns the span exporter of TRACING_EXPORTER, a JSON lines file or an
+    OTLP collector configured with the standard OTEL_EXPORTER_OTLP_* env vars"""
+    if Config.TRACING_EXPORTER == "file":
+        # closed by shutdown_tracing
+        span_file = open(  # pylint: disable=consider-using-with
+            Config.TRACING_FILE_PATH, "a", encoding="utf-8"
+        )
+        _tracing["span_file"] = span_file
+        return ConsoleSpanExporter(
+            out=span_file, formatter=lambda span: span.to_json(indent=None) + "\n"
+        )
+    return OTLPSpanExporter()
+
+
+def configure_tracing(run_id=None):
+    """Starts exporting spans when tracing is enabled and returns the run id
+    every span of this run is tagged with"""
+    run_id = run_id or uuid.uuid4().hex
+    if not Config.TRACING_ENABLED:
+        return run_id
+    if TracerProvider is None or (
+        Config.TRACING_EXPORTER != "file" and OTLPSpanExporter is None
+    ):
+        logger.warn("Tracing is enabled but opentelemetry is not installed")
+        return run_id
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": "google-locations", "run.id": run_id})
+    )
+    provider.add_span_processor(BatchSpanProcessor(get_span_exporter()))
+    _tracing.update(
+        provider=provider, tracer=provider.get_tracer(__name__), run_id=run_id
+    )
+    logger.info("Tracing run", value={"run_id": run_id})
+    return run_id
+
+
+def shutdown_tracing():
+    """Exports the pending spans and stops tracing"""
+    if "provider" in _tracing:
+        _tracing["provider"].shutdown()
+    if "span_file" in _tracing:
+        _tracing["span_file"].close()
+    _tracing.clear()
+
+
+def get_span_attributes(giving_partner_id, **attributes):
+    """Returns the attributes of a span, with the run id and the giving
+    partner, if any"""
+    attributes["run.id"] = _tracing["run_id"]
+    if giving_partner_id is not None:
+        attributes["giving_partner_id"] = str(giving_partner_id)
+    return attributes
+
+
+@contextlib.contextmanager
+def start_span(name, **attributes):
+    """Context manager of a span tagged with the run id and the giving
+    partner being processed, if any"""
+    tracer = _tracing.get("tracer")
+    if tracer is None:
+        yield None
+        return
+    with tracer.start_as_current_span(
+        name, attributes=get_span_attributes(_giving_partner_id.get(), **attributes)
+    ) as span:
+        yield span
+
+
+def open_span(name, giving_partner_id=None):
+    """Returns a started span that isn't current anywhere yet, for a GP
+    processed across threads, or None without tracing. It is entered with
+    giving_partner_span"""
+    tracer = _tracing.get("tracer")
+    if tracer is None:
+        return None
+    return tracer.start_span(name, attributes=get_span_attributes(giving_partner_id))
+
+
+@contextlib.contextmanager
+def giving_partner_context(giving_partner_id):
+    """Context manager tagging every span started inside with a GP id"""
+    token = _giving_partner_id.set(giving_partner_id)
+    try:
+        yield
+    finally:
+        _giving_partner_id.reset(token)
+
+
+@contextlib.contextmanager
+def giving_partner_span(giving_partner_id, span=None, end=True):
+    """Context manager of the span of a GP, whose id tags every nested span.
+    The span of open_span is entered instead of a new one when given, and
+    only ended with end"""
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(giving_partner_context(giving_partner_id))
+        if span is None:
+            yield stack.enter_context(start_span("process_giving_partner"))
+        else:
+            yield stack.enter_context(use_span(span, end_on_exit=end))
+
+
+def traced(name):
+    """Decorator wrapping every call of a function in a span"""
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with start_span(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
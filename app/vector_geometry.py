@@ -0,0 +1,218 @@
+"""Module that contains NumPy-vectorized geometry helpers for the building outlines.
+
+Outlines are converted once into contiguous coordinate arrays (OutlineArrays)
+and every metric is computed with batched array operations over all the rings
+of all the outlines at once. app.geometry is the pure-Python reference."""
+
+from itertools import chain
+from typing import NamedTuple
+
+import numpy as np
+
+from app import geometry
+from app.geometry import EARTH_RADIUS, iter_polygons
+
+# Below this many vertices the fixed cost of the array operations outweighs
+# their speedup (see benchmarks/bench_geometry.py)
+VECTORIZE_MIN_VERTICES = 400
+
+
+class OutlineArrays(NamedTuple):
+    """Contiguous arrays of the rings of a batch of outlines"""
+
+    # (n, 2) [lon, lat] of every vertex, grouped by ring then by outlines
+    coordinates: np.ndarray
+    # offset of the first vertex and vertex count of every ring
+    ring_starts: np.ndarray
+    ring_lengths: np.ndarray
+    # index of the outlines and of the polygon (within the batch) of every ring
+    ring_owners: np.ndarray
+    ring_polygons: np.ndarray
+    ring_is_hole: np.ndarray
+    # polygon count and whether an empty ring was dropped, per outlines
+    polygon_counts: np.ndarray
+    has_empty_ring: np.ndarray
+
+
+def to_outline_arrays(outlines_batch):
+    """Converts a list of outlines (each a list of displayPolygon objects) into
+    OutlineArrays"""
+    points = []
+    ring_lengths, ring_owners, ring_polygons, ring_is_hole = [], [], [], []
+    polygon_counts, has_empty_ring = [], []
+    polygon_id = 0
+    for owner, outlines in enumerate(outlines_batch):
+        count, empty = 0, False
+        for rings in iter_polygons(outlines):
+            for i, ring in enumerate(rings):
+                if not ring:
+                    empty = True
+                    continue
+                points.extend(ring)
+                ring_lengths.append(len(ring))
+                ring_owners.append(owner)
+                ring_polygons.append(polygon_id)
+                ring_is_hole.append(i > 0)
+            count += 1
+            polygon_id += 1
+        polygon_counts.append(count)
+        has_empty_ring.append(empty)
+
+    ring_lengths = np.array(ring_lengths, dtype=np.int64)
+    return OutlineArrays(
+        coordinates=np.fromiter(
+            chain.from_iterable(points), dtype=np.float64, count=2 * len(points)
+        ).reshape(-1, 2),
+        ring_starts=np.cumsum(ring_lengths) - ring_lengths,
+        ring_lengths=ring_lengths,
+        ring_owners=np.array(ring_owners, dtype=np.int64),
+        ring_polygons=np.array(ring_polygons, dtype=np.int64),
+        ring_is_hole=np.array(ring_is_hole, dtype=bool),
+        polygon_counts=np.array(polygon_counts, dtype=np.int64),
+        has_empty_ring=np.array(has_empty_ring, dtype=bool),
+    )
+
+
+def _next_vertex_indexes(arrays):
+    """Returns the index of the next vertex of every vertex, wrapping each ring"""
+    next_indexes = np.arange(1, len(arrays.coordinates) + 1)
+    next_indexes[arrays.ring_starts + arrays.ring_lengths - 1] = arrays.ring_starts
+    return next_indexes
+
+
+def _has_three_distinct_vertices(arrays):
+    """Returns whether every ring has at least 3 distinct vertices, without
+    sorting: a 3rd distinct vertex differs from both the first vertex and the
+    first vertex that differs from it"""
+    coordinates = arrays.coordinates
+    ring_ids = np.repeat(np.arange(len(arrays.ring_lengths)), arrays.ring_lengths)
+    differs_from_first = np.any(
+        coordinates != coordinates[arrays.ring_starts][ring_ids], axis=1
+    )
+    second = np.zeros(len(arrays.ring_lengths), dtype=np.int64)
+    candidates = np.flatnonzero(differs_from_first)
+    firsts = np.flatnonzero(np.diff(ring_ids[candidates], prepend=-1))
+    second[ring_ids[candidates[firsts]]] = candidates[firsts]
+    differs_from_both = differs_from_first & np.any(
+        coordinates != coordinates[second][ring_ids], axis=1
+    )
+    return np.logical_or.reduceat(differs_from_both, arrays.ring_starts)
+
+
+def _valid_rings(arrays):
+    """Returns whether every ring is closed, has at least 3 distinct vertices
+    and only holds valid coordinates"""
+    coordinates = arrays.coordinates
+    ends = arrays.ring_starts + arrays.ring_lengths - 1
+    in_range = (np.abs(coordinates[:, 0]) <= 180) & (np.abs(coordinates[:, 1]) <= 90)
+    return (
+        (arrays.ring_lengths >= 4)
+        & np.all(coordinates[arrays.ring_starts] == coordinates[ends], axis=1)
+        & _has_three_distinct_vertices(arrays)
+        & np.logical_and.reduceat(in_range, arrays.ring_starts)
+    )
+
+
+def compute_outline_metrics_batch(outlines_batch):
+    """Returns the metrics of app.geometry.compute_outline_metrics for every
+    outlines of the batch, computed in a single vectorized pass"""
+    arrays = to_outline_arrays(outlines_batch)
+    owners = len(outlines_batch)
+    if arrays.coordinates.size == 0:
+        return [None] * owners
+
+    vertex_counts = np.bincount(
+        arrays.ring_owners, weights=arrays.ring_lengths, minlength=owners
+    ).astype(np.int64)
+    owner_starts = np.cumsum(vertex_counts) - vertex_counts
+    has_points = vertex_counts > 0
+    point_owners = np.repeat(np.arange(owners), vertex_counts)
+    lons, lats = arrays.coordinates[:, 0], arrays.coordinates[:, 1]
+
+    starts = owner_starts[has_points]
+    min_lon = np.full(owners, np.nan)
+    min_lat, max_lon, max_lat = min_lon.copy(), min_lon.copy(), min_lon.copy()
+    min_lon[has_points] = np.minimum.reduceat(lons, starts)
+    min_lat[has_points] = np.minimum.reduceat(lats, starts)
+    max_lon[has_points] = np.maximum.reduceat(lons, starts)
+    max_lat[has_points] = np.maximum.reduceat(lats, starts)
+    safe_counts = np.maximum(vertex_counts, 1)
+    origin_lon = np.bincount(point_owners, weights=lons, minlength=owners) / safe_counts
+    origin_lat = np.bincount(point_owners, weights=lats, minlength=owners) / safe_counts
+
+    # local equirectangular projection in meters around each outlines' origin
+    cos_lat = np.cos(np.radians(origin_lat))
+    x = (
+        np.radians(lons - origin_lon[point_owners])
+        * EARTH_RADIUS
+        * cos_lat[point_owners]
+    )
+    y = np.radians(lats - origin_lat[point_owners]) * EARTH_RADIUS
+
+    # shoelace area and centroid of every ring
+    next_indexes = _next_vertex_indexes(arrays)
+    x_next, y_next = x[next_indexes], y[next_indexes]
+    cross = x * y_next - x_next * y
+    ring_area = np.add.reduceat(cross, arrays.ring_starts) / 2
+    ring_cx = np.add.reduceat((x + x_next) * cross, arrays.ring_starts)
+    ring_cy = np.add.reduceat((y + y_next) * cross, arrays.ring_starts)
+    has_area = ring_area != 0
+    signed_area = np.where(arrays.ring_is_hole, -1, 1) * np.abs(ring_area)
+    signed_area[~has_area] = 0
+    safe_area = np.where(has_area, ring_area, 1)
+
+    area = np.bincount(arrays.ring_owners, weights=signed_area, minlength=owners)
+    weighted_x = np.bincount(
+        arrays.ring_owners,
+        weights=ring_cx / (6 * safe_area) * signed_area,
+        minlength=owners,
+    )
+    weighted_y = np.bincount(
+        arrays.ring_owners,
+        weights=ring_cy / (6 * safe_area) * signed_area,
+        minlength=owners,
+    )
+    positive = area > 0
+    safe_owner_area = np.where(positive, area, 1)
+    centroid_lat = origin_lat + np.where(
+        positive, np.degrees(weighted_y / safe_owner_area / EARTH_RADIUS), 0
+    )
+    centroid_lon = origin_lon + np.where(
+        positive,
+        np.degrees(weighted_x / safe_owner_area / EARTH_RADIUS / cos_lat),
+        0,
+    )
+
+    invalid_rings = np.bincount(
+        arrays.ring_owners, weights=~_valid_rings(arrays), minlength=owners
+    )
+    is_valid = (invalid_rings == 0) & positive & ~arrays.has_empty_ring
+
+    return [
+        (
+            {
+                "min_lat": float(min_lat[i]),
+                "min_lon": float(min_lon[i]),
+                "max_lat": float(max_lat[i]),
+                "max_lon": float(max_lon[i]),
+                "centroid_lat": float(centroid_lat[i]),
+                "centroid_lon": float(centroid_lon[i]),
+                "area": float(area[i]),
+                "vertex_count": int(vertex_counts[i]),
+                "polygon_count": int(arrays.polygon_counts[i]),
+                "is_valid": bool(is_valid[i]),
+            }
+            if has_points[i]
+            else None
+        )
+        for i in range(owners)
+    ]
+
+
+def compute_outline_metrics(outlines):
+    """app.geometry.compute_outline_metrics of a single outlines, vectorized
+    when the outlines are large enough for it to pay off"""
+    vertex_count = sum(len(ring) for rings in iter_polygons(outlines) for ring in rings)
+    if vertex_count < VECTORIZE_MIN_VERTICES:
+        return geometry.compute_outline_metrics(outlines)
+    return compute_outline_metrics_batch([outlines])[0]
@@ -0,0 +1,105 @@
+"""Module that contains the offline ZIP/postal code centroid index.
+
+The index is a binary file of fixed-size records sorted by key, so lookups are
+a binary search over a read-only memory map and the file is only paged in as
+needed. It is opened lazily on the first lookup."""
+
+import csv
+import mmap
+import struct
+import threading
+
+from app.config import Config
+
+logger = Config.logger
+
+MAGIC = b"ZIPC0001"
+HEADER = struct.Struct("<8sQ")
+# "<country>:<postal code>" key, latitude, longitude
+RECORD = struct.Struct("<16sdd")
+KEY_SIZE = 16
+
+US_COUNTRY_NAMES = {"", "US", "USA", "UNITED STATES", "UNITED STATES OF AMERICA"}
+
+_lock = threading.Lock()
+_indexes = {}
+
+
+def get_zip_key(zipcode, country):
+    """Returns the index key of a postal code, or None if it can't have one"""
+    country = (country or "").strip().upper()
+    zipcode = (zipcode or "").strip().upper()
+    if country in US_COUNTRY_NAMES:
+        country = "US"
+        # ZIP+4 codes share the centroid of their ZIP code
+        zipcode = zipcode.split("-")[0][:5]
+    key = f"{country}:{zipcode}".encode()
+    if not zipcode or len(key) > KEY_SIZE:
+        return None
+    return key
+
+
+def build_zip_centroid_index(source_path, index_path):
+    """Builds the index from a CSV with country, zip, latitude and longitude
+    columns and returns the number of records"""
+    centroids = {}
+    with open(source_path, encoding="utf-8", newline="") as source_file:
+        for row in csv.DictReader(source_file):
+            key = get_zip_key(row["zip"], row["country"])
+            if key is not None:
+                centroids[key] = (float(row["latitude"]), float(row["longitude"]))
+
+    with open(index_path, "wb") as index_file:
+        index_file.write(HEADER.pack(MAGIC, len(centroids)))
+        for key in sorted(centroids):
+            index_file.write(RECORD.pack(key, *centroids[key]))
+
+    logger.info(
+        "Built ZIP centroid index",
+        value={"records": str(len(centroids)), "index_path": index_path},
+    )
+    return len(centroids)
+
+
+def _get_index(index_path):
+    """Returns the memory map and record count of the index, opening it once"""
+    with _lock:
+        if index_path not in _indexes:
+            with open(index_path, "rb") as index_file:
+                index = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, count = HEADER.unpack_from(index)
+            if magic != MAGIC:
+                raise ValueError(f"{index_path} is not a ZIP centroid index")
+            _indexes[index_path] = (index, count)
+        return _indexes[index_path]
+
+
+def close_zip_centroid_indexes():
+    """Closes every open index"""
+    with _lock:
+        for index, _ in _indexes.values():
+            index.close()
+        _indexes.clear()
+
+
+def lookup_zip_centroid(zipcode, country, index_path=None):
+    """Returns the (latitude, longitude) centroid of a postal code, or None"""
+    key = get_zip_key(zipcode, country)
+    if key is None:
+        return None
+    index, count = _get_index(index_path or Config.ZIP_CENTROID_INDEX_PATH)
+    key = key.ljust(KEY_SIZE, b"\0")
+
+    low, high = 0, count
+    while low < high:
+        middle = (low + high) // 2
+        record_key, latitude, longitude = RECORD.unpack_from(
+            index, HEADER.size + middle * RECORD.size
+        )
+        if record_key == key:
+            return latitude, longitude
+        if record_key < key:
+            low = middle + 1
+        else:
+            high = middle
+    return None
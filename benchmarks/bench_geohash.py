@@ -0,0 +1,157 @@
+"""Benchmark of the geohash index against a vectorized full scan on 1M points.
+
+Run with: python3 -m benchmarks.bench_geohash"""
+
+import random
+import time
+import timeit
+
+import numpy as np
+
+from app.geohash import encode_geohashes, query_nearest, query_radius
+from app.geometry import EARTH_RADIUS
+
+POINT_COUNT = 1_000_000
+QUERY_COUNT = 200
+
+rng = np.random.default_rng(42)
+random.seed(42)
+
+
+class GeohashIndex:
+    """In-memory stand-in for the giving_partner_geohashes table, sorted like
+    its index so each cell is a binary-searched range"""
+
+    def __init__(self, ids, latitudes, longitudes):
+        geohashes = encode_geohashes(latitudes, longitudes)
+        order = np.argsort(geohashes)
+        self.geohashes = geohashes[order]
+        self.ids = np.asarray(ids)[order]
+        self.latitudes = np.asarray(latitudes, dtype=float)[order]
+        self.longitudes = np.asarray(longitudes, dtype=float)[order]
+
+    def fetch_candidates(self, cells):
+        """Yields the (id, latitude, longitude) of the points in the cells"""
+        for cell in cells:
+            start = np.searchsorted(self.geohashes, cell.encode(), side="left")
+            # "~" sorts after every geohash character
+            stop = np.searchsorted(self.geohashes, cell.encode() + b"~", side="left")
+            yield from zip(
+                self.ids[start:stop].tolist(),
+                self.latitudes[start:stop].tolist(),
+                self.longitudes[start:stop].tolist(),
+            )
+
+    def within_radius(self, latitude, longitude, radius):
+        """Returns the (id, distance) of the points within radius meters"""
+        return query_radius(self.fetch_candidates, latitude, longitude, radius)
+
+    def nearest(self, latitude, longitude, count, max_radius):
+        """Returns the (id, distance) of the count nearest points"""
+        return query_nearest(
+            self.fetch_candidates, latitude, longitude, count, max_radius
+        )
+
+
+def make_points(count):
+    """Returns points clustered around 200 US cities, like GP addresses"""
+    city_lats = rng.uniform(26, 48, 200)
+    city_lons = rng.uniform(-122, -71, 200)
+    cities = rng.integers(0, 200, count)
+    return (
+        city_lats[cities] + rng.normal(0, 0.1, count),
+        city_lons[cities] + rng.normal(0, 0.1, count),
+    )
+
+
+def scan_radius(latitudes, longitudes, latitude, longitude, radius):
+    """Full scan baseline: vectorized haversine distance to every point"""
+    phi1, phi2 = np.radians(latitude), np.radians(latitudes)
+    half_chord = (
+        np.sin((phi2 - phi1) / 2) ** 2
+        + np.cos(phi1)
+        * np.cos(phi2)
+        * np.sin(np.radians(longitudes - longitude) / 2) ** 2
+    )
+    distances = 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(half_chord, 1.0)))
+    matches = np.nonzero(distances <= radius)[0]
+    return matches[np.argsort(distances[matches])]
+
+
+def best_of(statement, number):
+    """Returns the best time of 3 repeats, in seconds per run"""
+    return min(timeit.repeat(statement, number=number, repeat=3)) / number
+
+
+def main():
+    """Prints the timings of every benchmark"""
+    latitudes, longitudes = make_points(POINT_COUNT)
+    ids = np.arange(POINT_COUNT)
+
+    started_at = time.perf_counter()
+    encode_geohashes(latitudes, longitudes)
+    print(f"encode {POINT_COUNT} geohashes: {time.perf_counter() - started_at:.2f}s")
+    started_at = time.perf_counter()
+    index = GeohashIndex(ids, latitudes, longitudes)
+    print(
+        f"build index of {POINT_COUNT} points: {time.perf_counter() - started_at:.2f}s"
+    )
+
+    queries = [
+        (latitudes[i], longitudes[i])
+        for i in random.sample(range(POINT_COUNT), QUERY_COUNT)
+    ]
+    # both paths must find the same points
+    for latitude, longitude in queries[:20]:
+        assert [
+            gp_id for gp_id, _ in index.within_radius(latitude, longitude, 500)
+        ] == (scan_radius(latitudes, longitudes, latitude, longitude, 500).tolist())
+
+    print(f"{'benchmark':<40}{'full scan':>12}{'geohash':>12}{'speedup':>10}")
+    for radius in (100, 500, 2000):
+        baseline = (
+            best_of(
+                lambda radius=radius: [
+                    scan_radius(latitudes, longitudes, lat, lon, radius)
+                    for lat, lon in queries
+                ],
+                1,
+            )
+            / QUERY_COUNT
+        )
+        indexed = (
+            best_of(
+                lambda radius=radius: [
+                    index.within_radius(lat, lon, radius) for lat, lon in queries
+                ],
+                1,
+            )
+            / QUERY_COUNT
+        )
+        print(
+            f"{f'radius {radius}m, per query':<40}{baseline * 1000:>10.3f}ms"
+            f"{indexed * 1000:>10.3f}ms{baseline / indexed:>9.1f}x"
+        )
+
+    baseline = (
+        best_of(
+            lambda: [
+                scan_radius(latitudes, longitudes, lat, lon, 5000)[:10]
+                for lat, lon in queries
+            ],
+            1,
+        )
+        / QUERY_COUNT
+    )
+    indexed = (
+        best_of(lambda: [index.nearest(lat, lon, 10, 5000) for lat, lon in queries], 1)
+        / QUERY_COUNT
+    )
+    print(
+        f"{'10 nearest within 5km, per query':<40}{baseline * 1000:>10.3f}ms"
+        f"{indexed * 1000:>10.3f}ms{baseline / indexed:>9.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
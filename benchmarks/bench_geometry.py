@@ -0,0 +1,98 @@
+"""Benchmark of the NumPy-vectorized geometry against the pure-Python baseline.
+
+Run with: python3 -m benchmarks.bench_geometry"""
+
+import math
+import random
+import timeit
+
+from app import geometry, vector_geometry
+
+random.seed(42)
+
+
+def make_footprint(vertex_count, hole_count=0):
+    """Returns a displayPolygon shaped like a building footprint of ~100m"""
+    center_lon, center_lat = random.uniform(-120, -70), random.uniform(25, 48)
+
+    def ring(radius, count):
+        points = [
+            [
+                center_lon + radius * math.cos(2 * math.pi * i / count),
+                center_lat + radius * math.sin(2 * math.pi * i / count),
+            ]
+            for i in range(count)
+        ]
+        return points + points[:1]
+
+    return {
+        "type": "Polygon",
+        "coordinates": [ring(5e-4, vertex_count)]
+        + [ring(5e-5, 6) for _ in range(hole_count)],
+    }
+
+
+def make_outlines(gp_count, min_vertices, max_vertices):
+    """Returns the outlines of gp_count GPs with 1-3 footprints each"""
+    return [
+        [
+            make_footprint(
+                random.randint(min_vertices, max_vertices), random.randint(0, 1)
+            )
+            for _ in range(random.randint(1, 3))
+        ]
+        for _ in range(gp_count)
+    ]
+
+
+def best_of(statement, number):
+    """Returns the best time of 5 repeats, in seconds per run"""
+    return min(timeit.repeat(statement, number=number, repeat=5)) / number
+
+
+def main():
+    """Prints the timings of every benchmark"""
+    print(f"{'benchmark':<50}{'python':>12}{'numpy':>12}{'speedup':>10}")
+    for label, min_vertices, max_vertices in (
+        ("metrics, 2000 GPs, 4-20 vertices", 4, 20),
+        ("metrics, 2000 GPs, 20-200 vertices", 20, 200),
+        ("metrics, 200 GPs, 500-2000 vertices", 500, 2000),
+    ):
+        gp_count = 200 if min_vertices >= 500 else 2000
+        batch = make_outlines(gp_count, min_vertices, max_vertices)
+        baseline = best_of(
+            lambda batch=batch: [geometry.compute_outline_metrics(o) for o in batch],
+            1,
+        )
+        per_gp = best_of(
+            lambda batch=batch: [
+                vector_geometry.compute_outline_metrics_batch([o]) for o in batch
+            ],
+            1,
+        )
+        dispatched = best_of(
+            lambda batch=batch: [
+                vector_geometry.compute_outline_metrics(o) for o in batch
+            ],
+            1,
+        )
+        batched = best_of(
+            lambda batch=batch: vector_geometry.compute_outline_metrics_batch(batch),
+            1,
+        )
+        print(
+            f"{label + ' (per GP)':<50}{baseline:>11.4f}s{per_gp:>11.4f}s"
+            f"{baseline / per_gp:>9.1f}x"
+        )
+        print(
+            f"{label + ' (dispatched)':<50}{baseline:>11.4f}s{dispatched:>11.4f}s"
+            f"{baseline / dispatched:>9.1f}x"
+        )
+        print(
+            f"{label + ' (batch)':<50}{baseline:>11.4f}s{batched:>11.4f}s"
+            f"{baseline / batched:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
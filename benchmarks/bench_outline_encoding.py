@@ -0,0 +1,74 @@
+"""Benchmark of the compact outline encoding against the JSON storage.
+
+Run with: python3 -m benchmarks.bench_outline_encoding"""
+
+import json
+import random
+
+from app.outline_encoding import decode_coordinates, decode_outlines, encode_outlines
+from app.vector_geometry import to_outline_arrays
+from benchmarks.bench_geometry import best_of, make_outlines
+
+random.seed(42)
+
+
+def round_outlines(outlines):
+    """Returns outlines with Google's 7-decimal coordinates"""
+    return json.loads(
+        json.dumps(outlines), parse_float=lambda value: round(float(value), 7)
+    )
+
+
+def per_outlines(statement, batch):
+    """Returns the best time of statement over batch, in microseconds per GP"""
+    return best_of(statement, 3) / len(batch) * 1e6
+
+
+def main():
+    """Prints the size and decode times of every benchmark"""
+    print(f"  {'':<36}{'json':>11}{'compact':>11}{'gain':>8}")
+    for name, min_vertices, max_vertices in (
+        ("small footprints (4-30 vertices)", 4, 30),
+        ("large campuses (200-2000 vertices)", 200, 2000),
+    ):
+        batch = [
+            round_outlines(outlines)
+            for outlines in make_outlines(200, min_vertices, max_vertices)
+        ]
+        documents = [json.dumps(outlines) for outlines in batch]
+        blobs = [encode_outlines(outlines) for outlines in batch]
+        assert [decode_outlines(blob) for blob in blobs] == batch
+
+        json_size = sum(len(document) for document in documents) / len(batch)
+        compact_size = sum(len(blob) for blob in blobs) / len(batch)
+        print(f"{name}, per GP")
+        print(
+            f"  {'stored size':<36}{json_size:>10.0f}B{compact_size:>10.0f}B"
+            f"{json_size / compact_size:>8.1f}x"
+        )
+        for label, json_statement, compact_statement in (
+            (
+                "decode to displayPolygon lists",
+                lambda documents=documents: [
+                    json.loads(document) for document in documents
+                ],
+                lambda blobs=blobs: [decode_outlines(blob) for blob in blobs],
+            ),
+            (
+                "decode to coordinate arrays",
+                lambda documents=documents: [
+                    to_outline_arrays([json.loads(document)]) for document in documents
+                ],
+                lambda blobs=blobs: [decode_coordinates(blob) for blob in blobs],
+            ),
+        ):
+            json_time = per_outlines(json_statement, batch)
+            compact_time = per_outlines(compact_statement, batch)
+            print(
+                f"  {label:<36}{json_time:>9.1f}us{compact_time:>9.1f}us"
+                f"{json_time / compact_time:>8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
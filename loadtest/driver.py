@@ -0,0 +1,160 @@
+"""Load test driver running the jobs against the fake Geocoding API server.
+
+Run with: LOG_SAMPLE_RATE=0 python3 -m loadtest.driver --job donee_geocoder \\
+    --gps 1000 --concurrency 8 --rate-429 0.02 --burst-429 5 --rate-5xx 0.01
+
+Writes are discarded, reads find no rows and SNS is not called, so the report
+only covers the Geocoding API client: throughput, requests per GP (error
+amplification) and per-GP latency percentiles."""
+
+import argparse
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import Config
+from app.models import GivingPartnerRow
+from app.services.building_outlines import process_outlines
+from app.services.location_and_outlines import process_location_and_outlines
+from loadtest.fake_geocoding_server import (
+    FakeGeocodingServer,
+    add_fault_arguments,
+    get_fault_profile,
+)
+
+JOBS = {
+    "donee_geocoder": process_location_and_outlines,
+    "outlines": process_outlines,
+}
+
+
+class NullResult:
+    """Result of a statement run by a NullSession, holding no rows"""
+
+    rowcount = 0
+
+    def one_or_none(self):
+        """Returns no row"""
+
+    def first(self):
+        """Returns no row"""
+
+    def scalar(self):
+        """Returns no value"""
+
+    def all(self):
+        """Returns no rows"""
+        return []
+
+    def scalars(self):
+        """Returns no values"""
+        return self
+
+
+class NullSession:
+    """Session discarding every write and reading no rows, so the load test
+    needs no database. With change detection, every GP then counts as changed
+    and goes through the whole write path"""
+
+    def execute(self, *args, **kwargs):
+        """Discards a statement, returning an empty result"""
+        return NullResult()
+
+    def scalar(self, *args, **kwargs):
+        """Reads no value"""
+
+    def merge(self, instance):
+        """Discards a merge"""
+
+    def add(self, instance):
+        """Discards an insert"""
+
+    def commit(self):
+        """Discards a commit"""
+
+    def rollback(self):
+        """Discards a rollback"""
+
+
+def make_giving_partners(gp_count):
+    """Returns gp_count synthetic giving partners"""
+    return [
+        GivingPartnerRow(
+            gp_id,
+            f"{gp_id} Main St",
+            "Springfield",
+            "IL",
+            str(62700 + gp_id % 100),
+            "US",
+        )
+        for gp_id in range(1, gp_count + 1)
+    ]
+
+
+def percentile(values, fraction):
+    """Returns the value at fraction of the sorted values"""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else 0
+
+
+def run_load_test(server, job, gp_count, concurrency):
+    """Runs the per-GP processing of job for gp_count GPs against the server
+    and returns the report"""
+    Config.GOOGLE_GEOCODING_BASE_URL = server.base_url
+    process = JOBS[job]
+    session = NullSession()
+
+    def timed_process(giving_partner):
+        started_at = time.perf_counter()
+        try:
+            process(session, giving_partner)
+            outcome = "succeeded"
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            outcome = type(e).__name__
+        return outcome, time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed_process, make_giving_partners(gp_count)))
+    elapsed = time.perf_counter() - started_at
+
+    latencies = [latency for _, latency in results]
+    requests = sum(server.statuses.values())
+    return {
+        "job": job,
+        "gps": gp_count,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 2),
+        "gps_per_second": round(gp_count / elapsed, 1),
+        "outcomes": dict(Counter(outcome for outcome, _ in results)),
+        "requests": requests,
+        "requests_per_gp": round(requests / gp_count, 2),
+        "server_statuses": dict(server.statuses),
+        "latency_p50_ms": round(percentile(latencies, 0.5) * 1000, 1),
+        "latency_p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "latency_p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "latency_max_ms": round(max(latencies, default=0) * 1000, 1),
+    }
+
+
+def main():
+    """Runs a load test and prints its report"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--job", choices=sorted(JOBS), default="donee_geocoder")
+    parser.add_argument("--gps", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=4)
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    server = FakeGeocodingServer(get_fault_profile(args), seed=args.seed).start()
+    try:
+        report = run_load_test(server, args.job, args.gps, args.concurrency)
+    finally:
+        server.shutdown()
+        server.server_close()
+    for name, value in report.items():
+        print(f"{name:>16}: {value}")
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,228 @@
+"""Fake Geocoding API server that injects latency and faults, for load tests.
+
+Run with: python3 -m loadtest.fake_geocoding_server --port 8080 --rate-429 0.05
+and point the jobs at it with GOOGLE_GEOCODING_BASE_URL=http://localhost:8080"""
+
+import argparse
+import gzip
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import NamedTuple
+
+GEOCODING_PATH = "/v4alpha/geocode/destinations"
+
+
+class FaultProfile(NamedTuple):
+    """Latency distribution and fault rates of the fake server"""
+
+    # log-normal latency around the median
+    latency_ms: float = 50.0
+    latency_sigma: float = 0.5
+    # stalled requests answer after stall_ms
+    rate_stall: float = 0.0
+    stall_ms: float = 3000.0
+    # a 429 starts a burst of burst_429 consecutive 429s
+    rate_429: float = 0.0
+    burst_429: int = 1
+    retry_after: float = 1.0
+    # calls per second of each X-Goog-Api-Key beyond which it gets 429s
+    key_rate_limit: int = 0
+    rate_5xx: float = 0.0
+    rate_400: float = 0.0
+    # polygons of oversized_vertices vertices
+    rate_oversized: float = 0.0
+    oversized_vertices: int = 5000
+
+
+def make_polygon(longitude, latitude, vertex_count):
+    """Returns a displayPolygon of a ~100m footprint around a point"""
+    ring = [
+        [
+            longitude + 5e-4 * math.cos(2 * math.pi * i / vertex_count),
+            latitude + 5e-4 * math.sin(2 * math.pi * i / vertex_count),
+        ]
+        for i in range(vertex_count)
+    ]
+    return {"type": "Polygon", "coordinates": [ring + ring[:1]]}
+
+
+def make_response(field_mask, vertex_count, rng):
+    """Returns a destinations response with the fields of the field mask"""
+    latitude, longitude = rng.uniform(25, 48), rng.uniform(-120, -70)
+    primary = {}
+    if "location" in field_mask:
+        primary["location"] = {"latitude": latitude, "longitude": longitude}
+    if "structureType" in field_mask:
+        primary["structureType"] = "BUILDING"
+    if "displayPolygon" in field_mask:
+        primary["displayPolygon"] = make_polygon(longitude, latitude, vertex_count)
+    if "place" in field_mask:
+        primary["place"] = f"places/fake-{rng.getrandbits(32):x}"
+    return {"destinations": [{"primary": primary}]}
+
+
+class FakeGeocodingHandler(BaseHTTPRequestHandler):
+    """Serves the destinations endpoint with the faults of the server profile"""
+
+    server: "FakeGeocodingServer"
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Handles a geocoding request"""
+        started_at = time.perf_counter()
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        time.sleep(self.server.sample_latency())
+        if self.path != GEOCODING_PATH:
+            status = 404
+        elif not self.server.take_key_call(self.headers.get("X-Goog-Api-Key")):
+            status = 429
+        else:
+            status = self.server.choose_status()
+
+        headers = {"Content-Type": "application/json"}
+        if status == 200:
+            body = make_response(
+                self.headers.get("X-Goog-FieldMask", ""),
+                self.server.choose_vertex_count(),
+                self.server.rng,
+            )
+        else:
+            body = {"error": {"code": status, "message": "Injected fault"}}
+            if status == 429:
+                headers["Retry-After"] = str(self.server.profile.retry_after)
+        payload = json.dumps(body).encode()
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            payload = gzip.compress(payload)
+            headers["Content-Encoding"] = "gzip"
+        headers["Content-Length"] = str(len(payload))
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+        self.server.record(status, time.perf_counter() - started_at)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Silences the access log"""
+
+
+class FakeGeocodingServer(ThreadingHTTPServer):
+    """Threaded fake Geocoding API server keeping per-status statistics"""
+
+    daemon_threads = True
+
+    def __init__(self, profile, port=0, seed=None):
+        super().__init__(("127.0.0.1", port), FakeGeocodingHandler)
+        self.profile = profile
+        self.rng = random.Random(seed)
+        self.statuses = Counter()
+        self.latencies = []
+        self._lock = threading.Lock()
+        self._burst_remaining = 0
+        self._key_calls = Counter()
+
+    @property
+    def base_url(self):
+        """Base URL to set as GOOGLE_GEOCODING_BASE_URL"""
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def sample_latency(self):
+        """Returns a log-normal latency in seconds"""
+        with self._lock:
+            if self.rng.random() < self.profile.rate_stall:
+                return self.profile.stall_ms / 1000
+            return (
+                self.profile.latency_ms
+                * math.exp(self.rng.gauss(0, self.profile.latency_sigma))
+                / 1000
+            )
+
+    def choose_status(self):
+        """Returns the status of the next response"""
+        with self._lock:
+            if self._burst_remaining:
+                self._burst_remaining -= 1
+                return 429
+            draw = self.rng.random()
+            for status, rate in (
+                (429, self.profile.rate_429),
+                (503, self.profile.rate_5xx),
+                (400, self.profile.rate_400),
+            ):
+                if draw < rate:
+                    if status == 429:
+                        self._burst_remaining = self.profile.burst_429 - 1
+                    return status
+                draw -= rate
+            return 200
+
+    def take_key_call(self, api_key):
+        """Counts a call of api_key in the current second and returns whether
+        it is within the key rate limit"""
+        if not self.profile.key_rate_limit:
+            return True
+        window = (api_key, int(time.monotonic()))
+        with self._lock:
+            self._key_calls[window] += 1
+            return self._key_calls[window] <= self.profile.key_rate_limit
+
+    def choose_vertex_count(self):
+        """Returns the vertex count of the next polygon"""
+        with self._lock:
+            if self.rng.random() < self.profile.rate_oversized:
+                return self.profile.oversized_vertices
+            return self.rng.randint(5, 40)
+
+    def record(self, status, latency):
+        """Records a served request"""
+        with self._lock:
+            self.statuses[status] += 1
+            self.latencies.append(latency)
+
+    def start(self):
+        """Serves requests on a background thread and returns the server"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def add_fault_arguments(parser):
+    """Adds the FaultProfile fields as command line arguments"""
+    for field, default in FaultProfile()._asdict().items():
+        parser.add_argument(
+            f"--{field.replace('_', '-')}", type=type(default), default=default
+        )
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def get_fault_profile(args):
+    """Returns the FaultProfile of parsed command line arguments"""
+    return FaultProfile(
+        **{field: getattr(args, field) for field in FaultProfile._fields}
+    )
+
+
+def main():
+    """Serves the fake Geocoding API until interrupted"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8080)
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    server = FakeGeocodingServer(get_fault_profile(args), args.port, args.seed)
+    print(f"Fake Geocoding API listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(dict(server.statuses))
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,125 @@
+"""unitest module for testing"""
+
+import unittest
+from collections import Counter
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from app.api_keys import (
+    ApiKeysExhaustedError,
+    acquire_api_key,
+    configure_api_keys,
+    parse_api_keys,
+    report_api_key_failure,
+)
+from app.config import Config
+from app.google_api_calls import _call_geocoding_api
+from app.metrics import get_counters, reset_counters
+
+
+def make_response(status_code):
+    """Returns a mock Geocoding API response with status_code"""
+    response = MagicMock(status_code=status_code, headers={}, content=b"{}")
+    response.json.return_value = {"destinations": []}
+    if status_code >= 400:
+        response.raise_for_status.side_effect = requests.HTTPError(response=response)
+    return response
+
+
+class TestApiKeys(unittest.TestCase):
+    """testing class for api_keys.py"""
+
+    def setUp(self):
+        """Start from the configured key and fresh counters"""
+        reset_counters()
+        self.addCleanup(configure_api_keys)
+
+    def test_parse_api_keys(self):
+        """Test weights and rate limits are parsed and invalid entries rejected"""
+        with patch.object(Config, "GOOGLE_API_KEY_RATE_LIMIT", 100):
+            api_keys = parse_api_keys(["a", "b:3", "c:2:50"])
+
+        self.assertEqual(
+            [(key.label, key.value, key.weight, key.rate_limit) for key in api_keys],
+            [("key1", "a", 1, 100), ("key2", "b", 3, 100), ("key3", "c", 2, 50)],
+        )
+        for entry in ("a:0", "a:x", "a:1:-1", ":1", "a:1:2:3"):
+            with self.assertRaises(ValueError):
+                parse_api_keys([entry])
+
+    def test_weighted_round_robin(self):
+        """Test the keys are used in proportion to their weights, interleaved"""
+        configure_api_keys(["a:2", "b:1"])
+
+        values = [acquire_api_key().value for _ in range(6)]
+
+        self.assertEqual(values, ["a", "b", "a", "a", "b", "a"])
+
+    @patch("app.api_keys.time.monotonic", return_value=1000.0)
+    def test_rate_limit(self, _mock_monotonic):
+        """Test a key at its per-minute limit is skipped until the pool waits"""
+        configure_api_keys(["a:5:1", "b:1:2"])
+
+        values = [acquire_api_key().value for _ in range(3)]
+
+        self.assertEqual(Counter(values), {"a": 1, "b": 2})
+        with patch.object(Config, "GOOGLE_API_KEY_MAX_WAIT_SECONDS", 10):
+            with self.assertRaises(ApiKeysExhaustedError):
+                acquire_api_key()
+
+    @patch.object(Config, "GOOGLE_API_KEY_COOLDOWN_SECONDS", 10)
+    @patch("app.api_keys.time.monotonic")
+    def test_cooldown(self, mock_monotonic):
+        """Test throttled keys cool down, longer with consecutive 429s"""
+        mock_monotonic.return_value = 1000.0
+        configure_api_keys(["a", "b"])
+        throttled = acquire_api_key()
+
+        report_api_key_failure(throttled, 429)
+        report_api_key_failure(throttled, 429)
+
+        self.assertEqual(throttled.cooldown_until, 1010.0)
+        self.assertEqual({acquire_api_key().value for _ in range(4)}, {"b"})
+        mock_monotonic.return_value = 1010.0
+        self.assertIn(throttled.value, {acquire_api_key().value for _ in range(2)})
+        report_api_key_failure(throttled, 429)
+        self.assertEqual(throttled.cooldown_until, 1030.0)
+        self.assertEqual(
+            get_counters("geocoding_key_throttled"), {"geocoding_key_throttled.key1": 3}
+        )
+
+    @patch("app.google_api_calls.requests.post")
+    def test_call_moves_to_the_next_key(self, mock_post):
+        """Test a 429 or 403 is retried right away on another key"""
+        configure_api_keys(["a", "b", "c"])
+        mock_post.side_effect = [
+            make_response(429),
+            make_response(403),
+            make_response(200),
+        ]
+
+        response = _call_geocoding_api({"addressQuery": {}})
+
+        self.assertEqual(response, {"destinations": []})
+        self.assertEqual(
+            [
+                call.kwargs["headers"]["X-Goog-Api-Key"]
+                for call in mock_post.call_args_list
+            ],
+            ["a", "b", "c"],
+        )
+        self.assertEqual(
+            get_counters("geocoding_key_"),
+            {
+                "geocoding_key_calls.key1": 1,
+                "geocoding_key_calls.key2": 1,
+                "geocoding_key_calls.key3": 1,
+                "geocoding_key_forbidden.key2": 1,
+                "geocoding_key_throttled.key1": 1,
+            },
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,233 @@
+"""unitest module for testing"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock, call, patch
+
+from sqlalchemy.dialects import mysql
+
+from app.config import Config
+from app.models import GivingPartnerRow
+from app.services.bulk_backfill import (
+    load_backfill_results,
+    read_giving_partner_records,
+    run_bulk_backfill,
+)
+
+
+class TestBulkBackfill(unittest.TestCase):
+    """testing class for bulk_backfill.py"""
+
+    def setUp(self):
+        """Setup temporary input and output files before each test"""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.tmp_dir, "gps.csv")
+        self.output_path = os.path.join(self.tmp_dir, "google_data.jsonl")
+        with open(self.csv_path, "w", encoding="utf-8") as csv_file:
+            csv_file.write("donee_id,address,city,state,zip,country\n")
+            csv_file.write("1,test_address,test_city,test_state,test_zip,US\n")
+            csv_file.write("2,test_address_2,test_city_2,test_state_2,test_zip_2,\n")
+
+    def tearDown(self):
+        """Remove temporary files after each test"""
+        shutil.rmtree(self.tmp_dir)
+
+    def _read_output(self):
+        """Returns the output lines by giving partner id, as they are written
+        in completion order"""
+        with open(self.output_path, encoding="utf-8") as output_file:
+            return sorted(
+                (json.loads(line) for line in output_file),
+                key=lambda result: result["giving_partner_id"],
+            )
+
+    def test_read_giving_partner_records_csv(self):
+        """Test reading records from a csv file"""
+        records = list(read_giving_partner_records(self.csv_path))
+
+        self.assertEqual(
+            records[0],
+            GivingPartnerRow(
+                1, "test_address", "test_city", "test_state", "test_zip", "US"
+            ),
+        )
+        self.assertEqual(records[1].country, "")
+
+    def test_read_giving_partner_records_jsonl(self):
+        """Test reading records from a jsonl file"""
+        jsonl_path = os.path.join(self.tmp_dir, "gps.jsonl")
+        with open(jsonl_path, "w", encoding="utf-8") as jsonl_file:
+            jsonl_file.write(json.dumps({"donee_id": "3", "address": "a"}) + "\n")
+
+        records = list(read_giving_partner_records(jsonl_path))
+
+        self.assertEqual(records, [GivingPartnerRow(3, "a", "", "", "", "")])
+
+    @patch("app.services.bulk_backfill.geocoding_api_address")
+    def test_run_bulk_backfill(self, mock_geocoding_api_address):
+        """Test run_bulk_backfill writes one line per geocoded record"""
+        polygon = {"type": "Polygon", "coordinates": [[[1, 2], [3, 4], [1, 2]]]}
+        mock_geocoding_api_address.side_effect = [
+            {
+                "destinations": [
+                    {
+                        "primary": {
+                            "location": {"latitude": 10, "longitude": 11},
+                            "structureType": "BUILDING",
+                            "displayPolygon": polygon,
+                        }
+                    }
+                ]
+            },
+            None,
+        ]
+
+        self.assertEqual(run_bulk_backfill(self.csv_path, self.output_path, 1), (2, 0))
+
+        results = self._read_output()
+        self.assertEqual(results[0]["giving_partner_id"], 1)
+        self.assertEqual((results[0]["latitude"], results[0]["longitude"]), (10, 11))
+        self.assertEqual(results[0]["outlines"], [polygon])
+        self.assertEqual((results[1]["latitude"], results[1]["longitude"]), (-1, -1))
+
+    @patch("app.services.bulk_backfill.logger")
+    @patch("app.services.bulk_backfill.geocoding_api_address")
+    def test_run_bulk_backfill_resumes(self, mock_geocoding_api_address, mock_logger):
+        """Test run_bulk_backfill skips records already written and retries failures"""
+        with open(self.output_path, "w", encoding="utf-8") as output_file:
+            output_file.write(json.dumps({"giving_partner_id": 1}) + "\n")
+            output_file.write(json.dumps({"giving_partner_id": 3}) + "\n")
+        mock_geocoding_api_address.side_effect = Exception("boom")
+
+        self.assertEqual(run_bulk_backfill(self.csv_path, self.output_path, 1), (0, 1))
+        self.assertEqual(
+            mock_logger.info.call_args.kwargs["value"],
+            {"written": "0", "failed": "1", "skipped": "1"},
+        )
+
+        mock_geocoding_api_address.assert_called_once_with(
+            "test_address_2", "test_city_2", "test_state_2", "test_zip_2", ""
+        )
+        self.assertEqual(len(self._read_output()), 2)
+
+    @patch("app.services.bulk_backfill.read_giving_partner_records")
+    @patch("app.services.bulk_backfill.geocoding_api_address", return_value=None)
+    def test_run_bulk_backfill_bounds_in_flight(
+        self, mock_geocoding_api_address, mock_read_giving_partner_records
+    ):
+        """Test the records are read as the workers free up"""
+        read_ids = []
+
+        def read_records(_path):
+            for gp_id in range(1, 21):
+                read_ids.append(gp_id)
+                yield GivingPartnerRow(gp_id, "", "", "", "", "")
+
+        mock_read_giving_partner_records.side_effect = read_records
+        read_ahead = []
+        mock_geocoding_api_address.side_effect = lambda *_: read_ahead.append(
+            len(read_ids)
+        )
+
+        self.assertEqual(run_bulk_backfill(self.csv_path, self.output_path, 2), (20, 0))
+        # each call started with at most the window of 4 records read ahead
+        self.assertLessEqual(
+            max(count - call for call, count in enumerate(read_ahead, 1)), 4
+        )
+
+    def _write_results(self):
+        """Writes the results of 3 GPs, the first one with outlines"""
+        with open(self.output_path, "w", encoding="utf-8") as output_file:
+            for gp_id, outlines in ((1, [{"type": "Polygon"}]), (2, []), (3, [])):
+                output_file.write(
+                    json.dumps(
+                        {
+                            "giving_partner_id": gp_id,
+                            "latitude": 10,
+                            "longitude": 11,
+                            "outlines": outlines,
+                        }
+                    )
+                    + "\n"
+                )
+
+    @patch.object(Config, "ZIP_CENTROID_FALLBACK_ENABLED", False)
+    @patch.object(Config, "GEOCODING_QUEUE_ENABLED", False)
+    @patch.object(Config, "SEARCH_SYNC_OUTBOX_ENABLED", False)
+    def test_load_backfill_results(self):
+        """Test load_backfill_results executes one bulk statement per target"""
+        self._write_results()
+        mock_session = MagicMock()
+
+        self.assertEqual(load_backfill_results(mock_session, self.output_path, 2), 3)
+
+        first_batch = mock_session.execute.call_args_list[0].args[1]
+        self.assertEqual(
+            first_batch,
+            [
+                {"donee_id": 1, "donee_lat": 10, "donee_lon": 11},
+                {"donee_id": 2, "donee_lat": 10, "donee_lon": 11},
+            ],
+        )
+        # batch 1: coordinates + outlines, batch 2: coordinates only
+        self.assertEqual(mock_session.execute.call_count, 3)
+        self.assertEqual(mock_session.commit.call_count, 2)
+        mock_session.add.assert_not_called()
+
+    @patch.object(Config, "ZIP_CENTROID_FALLBACK_ENABLED", True)
+    @patch.object(Config, "GEOCODING_QUEUE_ENABLED", True)
+    @patch.object(Config, "SEARCH_SYNC_OUTBOX_ENABLED", True)
+    def test_load_backfill_results_follow_up_writes(self):
+        """Test each batch records the location sources, dequeues the GPs and
+        queues their search-sync events in its transaction"""
+        self._write_results()
+        mock_session = MagicMock()
+        mock_sns_client = MagicMock()
+
+        load_backfill_results(mock_session, self.output_path, 3, mock_sns_client)
+
+        statements = [
+            str(execute.args[0].compile(dialect=mysql.dialect()))
+            for execute in mock_session.execute.call_args_list
+        ]
+        self.assertIn("INSERT INTO giving_partner_location_sources", statements[-2])
+        self.assertIn("updated_at = now()", statements[-2])
+        self.assertEqual(
+            mock_session.execute.call_args_list[-2].args[1][0],
+            {"giving_partner_id": 1, "source": "google", "precision": "address"},
+        )
+        self.assertIn("DELETE FROM geocoding_queue", statements[-1])
+        self.assertEqual(
+            mock_session.execute.call_args_list[-1].args[0].compile().params,
+            {"giving_partner_id_1": [1, 2, 3]},
+        )
+        self.assertEqual(
+            [added.args[0].giving_partner_id for added in mock_session.add.mock_calls],
+            [1, 2, 3],
+        )
+        mock_session.commit.assert_called_once()
+        mock_sns_client.publish.assert_not_called()
+
+    @patch.object(Config, "ZIP_CENTROID_FALLBACK_ENABLED", False)
+    @patch.object(Config, "GEOCODING_QUEUE_ENABLED", False)
+    @patch.object(Config, "SEARCH_SYNC_OUTBOX_ENABLED", False)
+    @patch("app.services.bulk_backfill.publish_sns_search_sync")
+    def test_load_backfill_results_publishes(self, mock_publish_sns_search_sync):
+        """Test the search-sync events are published after the commit without
+        the outbox"""
+        self._write_results()
+        mock_session = MagicMock()
+        mock_sns_client = MagicMock()
+
+        load_backfill_results(mock_session, self.output_path, 2, mock_sns_client)
+
+        mock_publish_sns_search_sync.assert_has_calls(
+            [call(mock_sns_client, gp_id) for gp_id in (1, 2, 3)]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+"""unitest module for testing"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.change_detection import coordinates_changed, get_outlines_hash
+from app.config import Config
+from app.helper import insert_google_data
+from app.metrics import get_counters, reset_counters
+from app.models import GivingPartnerRow
+from app.services.location_and_outlines import run_location_and_outlines
+
+OUTLINES = [{"type": "Polygon", "coordinates": [[[-88.2, 40.1], [-88.3, 40.2]]]}]
+RESPONSE = {
+    "destinations": [
+        {
+            "primary": {"location": {"latitude": 40.1, "longitude": -88.2}},
+            "structureType": "BUILDING",
+            "displayPolygon": OUTLINES[0],
+        }
+    ]
+}
+
+
+@patch.object(Config, "CHANGE_DETECTION_ENABLED", True)
+@patch.object(Config, "DONEE_GEOCODER_ENABLE_OUTLINES", True)
+class TestChangeDetection(unittest.TestCase):
+    """testing class for change_detection.py"""
+
+    def setUp(self):
+        """Setup mocks before each test"""
+        reset_counters()
+        self.mock_session = MagicMock()
+        self.stored_state = self.mock_session.execute.return_value.one_or_none
+        self.stored_state.return_value = (40.1, -88.2, get_outlines_hash(OUTLINES))
+        self.giving_partners = [
+            GivingPartnerRow(gp_id, "1 Main St", "Springfield", "IL", "62701", "US")
+            for gp_id in (1, 2)
+        ]
+
+    def test_coordinates_changed(self):
+        """Test coordinates only change beyond the tolerance"""
+        self.assertFalse(coordinates_changed((40.0, -88.0), (40.000005, -88.0)))
+        self.assertTrue(coordinates_changed((40.0, -88.0), (40.0001, -88.0)))
+        self.assertTrue(coordinates_changed((0, 0), (40.0, -88.0)))
+        self.assertTrue(coordinates_changed((40.0, -88.0), (-1, -1)))
+        self.assertFalse(coordinates_changed((-1, -1), (-1, -1)))
+
+    def test_outlines_hash(self):
+        """Test the hash only depends on the content of the outlines"""
+        reordered = [{"coordinates": OUTLINES[0]["coordinates"], "type": "Polygon"}]
+
+        self.assertEqual(get_outlines_hash(reordered), get_outlines_hash(OUTLINES))
+        self.assertNotEqual(
+            get_outlines_hash(OUTLINES[:0]), get_outlines_hash(OUTLINES)
+        )
+
+    def test_unchanged_write_is_skipped(self):
+        """Test an unchanged GP is not rewritten"""
+        changed = insert_google_data(
+            self.mock_session, self.giving_partners[0], 40.1, -88.2, OUTLINES
+        )
+
+        self.assertFalse(changed)
+        self.assertEqual(self.mock_session.execute.call_count, 1)
+        self.mock_session.merge.assert_not_called()
+        self.mock_session.commit.assert_called_once()
+        self.assertEqual(get_counters("writes_"), {"writes_unchanged": 1})
+
+    @patch("app.services.location_and_outlines.publish_sns_search_sync")
+    @patch("app.services.location_and_outlines.geocoding_api_address")
+    @patch("app.services.location_and_outlines.get_giving_partners")
+    def test_unchanged_event_is_skipped(
+        self,
+        mock_get_giving_partners,
+        mock_geocoding_api_address,
+        mock_publish_sns_search_sync,
+    ):
+        """Test only the changed GPs are written and published"""
+        mock_get_giving_partners.return_value = self.giving_partners
+        mock_geocoding_api_address.return_value = RESPONSE
+        self.stored_state.side_effect = [
+            self.stored_state.return_value,
+            (40.1, -88.2, None),
+        ]
+
+        run_location_and_outlines(self.mock_session, MagicMock())
+
+        mock_publish_sns_search_sync.assert_called_once_with(unittest.mock.ANY, 2)
+        self.assertTrue(
+            any(
+                "giving_partner_outlines" in str(execute_call.args[0])
+                and "INSERT" in str(execute_call.args[0])
+                for execute_call in self.mock_session.execute.call_args_list
+            )
+        )
+        self.assertEqual(
+            get_counters("writes_"), {"writes_changed": 1, "writes_unchanged": 1}
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
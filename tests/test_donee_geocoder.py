@@ -6,6 +6,7 @@ import uuid
 from unittest.mock import MagicMock, call, patch
 
 from app.config import Config
+from app.enums import ResponseProfile
 from app.scripts.donee_geocoder import main
 from app.services.location_and_outlines import (
     get_sns_client_local,
@@ -108,6 +109,7 @@ class TestDoneeGeocoder(unittest.TestCase):
     ):
         """Test run_location_and_outlines() success flow"""
         mock_get_giving_partners.return_value = [self.mock_gp_1, self.mock_gp_2]
+        mock_process_location_and_outlines.return_value = True
 
         run_location_and_outlines(self.mock_session, self.mock_sns)
         mock_get_giving_partners.assert_called_with(self.mock_session)
@@ -138,6 +140,31 @@ class TestDoneeGeocoder(unittest.TestCase):
         mock_get_giving_partners.assert_called_with(self.mock_session)
         mock_process_location_and_outlines.assert_not_called()
 
+    @patch.object(Config, "GEOCODING_QUEUE_ENABLED", True)
+    @patch("app.services.location_and_outlines.reschedule_giving_partner")
+    @patch("app.services.location_and_outlines.publish_sns_search_sync")
+    @patch("app.services.location_and_outlines.process_location_and_outlines")
+    @patch("app.services.location_and_outlines.get_giving_partners")
+    def test_run_location_and_outlines_reschedules_failures(
+        self,
+        mock_get_giving_partners,
+        mock_process_location_and_outlines,
+        mock_publish_sns_search_sync,
+        mock_reschedule_giving_partner,
+    ):
+        """Test run_location_and_outlines() reschedules queued GPs that failed"""
+        mock_get_giving_partners.return_value = [self.mock_gp_1, self.mock_gp_2]
+        mock_process_location_and_outlines.side_effect = [Exception("boom"), True]
+
+        run_location_and_outlines(self.mock_session, self.mock_sns)
+        mock_reschedule_giving_partner.assert_called_once_with(
+            self.mock_session, self.mock_gp_1.donee_id
+        )
+        mock_publish_sns_search_sync.assert_called_once_with(
+            self.mock_sns, self.mock_gp_2.donee_id
+        )
+
+    @patch.object(Config, "DONEE_GEOCODER_ENABLE_OUTLINES", False)
     @patch("app.services.location_and_outlines.geocoding_api_address")
     @patch("app.services.location_and_outlines.extract_building_polygons")
     @patch("app.services.location_and_outlines.get_lat_lon")
@@ -164,11 +191,13 @@ class TestDoneeGeocoder(unittest.TestCase):
             "test_state",
             "test_zip",
             "test_country",
+            profile=ResponseProfile.LOCATION,
         )
         mock_insert_google_data.assert_called_with(
             mock_session, self.mock_gp_1, 10, 10, mock_building_outlines
         )
 
+    @patch.object(Config, "DONEE_GEOCODER_ENABLE_OUTLINES", True)
     @patch("app.services.location_and_outlines.geocoding_api_address")
     @patch("app.services.location_and_outlines.insert_google_data")
     def test_process_location_and_outlines_no_results(
@@ -186,6 +215,7 @@ class TestDoneeGeocoder(unittest.TestCase):
             "test_state",
             "test_zip",
             "test_country",
+            profile=ResponseProfile.FULL,
         )
         mock_insert_google_data.assert_called_with(
             self.mock_session, self.mock_gp_1, -1, -1, []
@@ -0,0 +1,160 @@
+"""unitest module for testing"""
+
+import json
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from app.enums import ResponseProfile
+from app.services.geocoding_service import (
+    GeocodingHTTPServer,
+    GeocodingService,
+    LRUCache,
+    SingleFlight,
+)
+
+RESPONSE = {
+    "destinations": [
+        {"primary": {"location": {"latitude": 40.1, "longitude": -88.2}}},
+    ]
+}
+ADDRESS = ("1 Main St", "Springfield", "IL", "62701", "US")
+
+
+class TestGeocodingService(unittest.TestCase):
+    """testing class for the on-demand geocoding service"""
+
+    def test_lru_cache_evicts_least_recently_used(self):
+        """Test the cache keeps the most recently used entries"""
+        cache = LRUCache(2, 60)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), (1, None, 3))
+
+    def test_single_flight_shares_errors(self):
+        """Test an error of the leading call is raised to every caller"""
+        single_flight = SingleFlight()
+
+        with self.assertRaises(ValueError):
+            single_flight.do("key", lambda: int("x"))
+        self.assertEqual(single_flight.do("key", lambda: 1), (1, False))
+
+    @patch("app.services.geocoding_service.geocoding_api_address")
+    def test_geocode_address_coalesces_requests(self, mock_geocoding_api_address):
+        """Test concurrent identical requests make one upstream call"""
+        release = threading.Event()
+
+        def slow_upstream(*_args, **_kwargs):
+            release.wait(5)
+            return RESPONSE
+
+        mock_geocoding_api_address.side_effect = slow_upstream
+        service = GeocodingService(cache_size=10, upstream_concurrency=2)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [
+                executor.submit(service.geocode_address, *ADDRESS) for _ in range(8)
+            ]
+            threading.Timer(0.2, release.set).start()
+            results = [future.result() for future in futures]
+
+        mock_geocoding_api_address.assert_called_once_with(
+            *ADDRESS, profile=ResponseProfile.LOCATION
+        )
+        self.assertEqual({result["latitude"] for result in results}, {40.1})
+
+        service.geocode_address(*ADDRESS)
+        mock_geocoding_api_address.assert_called_once()
+
+    @patch("app.services.geocoding_service.geocoding_api_address")
+    def test_http_geocode(self, mock_geocoding_api_address):
+        """Test the geocode endpoint and its error statuses"""
+        mock_geocoding_api_address.return_value = RESPONSE
+        server = GeocodingHTTPServer(("127.0.0.1", 0), GeocodingService())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_address[1]}/geocode"
+
+        body = dict(zip(("address", "city", "state", "zip", "country"), ADDRESS))
+        with urlopen(
+            Request(url, data=json.dumps(body).encode(), method="POST"), timeout=5
+        ) as response:
+            self.assertEqual(
+                json.loads(response.read()), {"latitude": 40.1, "longitude": -88.2}
+            )
+
+        with self.assertRaises(HTTPError) as error:
+            with urlopen(Request(url, data=b"not json", method="POST"), timeout=5):
+                pass
+        self.assertEqual(error.exception.code, 400)
+        error.exception.close()
+
+        # upstream errors aren't blamed on the request
+        mock_geocoding_api_address.side_effect = KeyError("destinations")
+        body["address"] = "2 Main St"
+        with self.assertRaises(HTTPError) as error:
+            with urlopen(
+                Request(url, data=json.dumps(body).encode(), method="POST"), timeout=5
+            ):
+                pass
+        self.assertEqual(error.exception.code, 500)
+        error.exception.close()
+
+    @patch("app.services.geocoding_service.get_giving_partners", return_value=[])
+    def test_http_geocode_unknown_giving_partner(self, _mock_get_giving_partners):
+        """Test an unknown GP gets a 404"""
+        server = GeocodingHTTPServer(
+            ("127.0.0.1", 0), GeocodingService(session_factory=MagicMock())
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_address[1]}/geocode"
+
+        with self.assertRaises(HTTPError) as error:
+            with urlopen(
+                Request(url, data=b'{"giving_partner_id": 1}', method="POST"),
+                timeout=5,
+            ):
+                pass
+        self.assertEqual(error.exception.code, 404)
+        error.exception.close()
+
+    @patch("app.services.geocoding_service.insert_google_data", return_value=False)
+    @patch("app.services.geocoding_service.get_giving_partners")
+    @patch("app.services.geocoding_service.geocoding_api_address")
+    def test_geocode_giving_partner_releases_session(
+        self,
+        mock_geocoding_api_address,
+        mock_get_giving_partners,
+        _mock_insert_google_data,
+    ):
+        """Test no session is open during the upstream call"""
+        session_factory = MagicMock()
+        open_sessions = []
+        session_factory.return_value.__enter__.side_effect = (
+            lambda: open_sessions.append(1)
+        )
+        session_factory.return_value.__exit__.side_effect = (
+            lambda *_: open_sessions.pop() and None
+        )
+        mock_get_giving_partners.return_value = [MagicMock()]
+        mock_geocoding_api_address.side_effect = lambda *_, **__: (
+            self.assertEqual(open_sessions, []) or RESPONSE
+        )
+
+        result = GeocodingService(session_factory).geocode_giving_partner(1)
+
+        self.assertEqual(result["latitude"], 40.1)
+        self.assertEqual(session_factory.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
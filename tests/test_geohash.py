@@ -0,0 +1,188 @@
+"""unitest module for testing"""
+
+import random
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.config import Config
+from app.enums import CoordinateSource
+from app.geohash import (
+    encode_geohash,
+    encode_geohashes,
+    get_covering_cells,
+    get_distance,
+    query_nearest,
+    query_radius,
+)
+from app.helper import insert_google_data
+from app.services.nearby_giving_partners import (
+    find_duplicate_locations,
+    find_giving_partners_within_radius,
+    rebuild_geohash_index,
+)
+from tests.test_helper import compile_mysql
+
+
+class TestGeohash(unittest.TestCase):
+    """testing class for geohash.py and nearby_giving_partners.py"""
+
+    def setUp(self):
+        """Setup random points around a city before each test"""
+        rng = random.Random(1)
+        self.points = [
+            (gp_id, 40.75 + rng.uniform(-0.05, 0.05), -73.99 + rng.uniform(-0.05, 0.05))
+            for gp_id in range(2000)
+        ]
+        self.mock_session = MagicMock()
+
+    def test_encode_geohash(self):
+        """Test the scalar and vectorized encodings match the reference"""
+        self.assertEqual(encode_geohash(57.64911, 10.40744, 11), "u4pruydqqvj")
+        self.assertEqual(
+            encode_geohashes([57.64911, -90], [10.40744, 180]).tolist(),
+            [encode_geohash(57.64911, 10.40744).encode(), b"pbpbpbpbpbpb"],
+        )
+
+    def test_get_covering_cells(self):
+        """Test the covering cells contain every point within the radius"""
+        cells = tuple(get_covering_cells(40.75, -73.99, 3000))
+
+        for _, latitude, longitude in self.points:
+            if get_distance(40.75, -73.99, latitude, longitude) <= 3000:
+                self.assertTrue(encode_geohash(latitude, longitude).startswith(cells))
+        self.assertLessEqual(len(cells), 9)
+        self.assertEqual({len(cell) for cell in cells}, {5})
+
+    def test_geohash_queries(self):
+        """Test radius and nearest queries match a full scan"""
+        geohashes = [(encode_geohash(*point[1:]), point) for point in self.points]
+
+        def fetch_candidates(cells):
+            cells = tuple(cells)
+            return [point for geohash, point in geohashes if geohash.startswith(cells)]
+
+        distances = sorted(
+            (get_distance(40.75, -73.99, latitude, longitude), gp_id)
+            for gp_id, latitude, longitude in self.points
+        )
+
+        self.assertEqual(
+            [gp_id for gp_id, _ in query_radius(fetch_candidates, 40.75, -73.99, 800)],
+            [gp_id for distance, gp_id in distances if distance <= 800],
+        )
+        self.assertEqual(
+            [
+                gp_id
+                for gp_id, _ in query_nearest(fetch_candidates, 40.75, -73.99, 5, 10000)
+            ],
+            [gp_id for _, gp_id in distances[:5]],
+        )
+
+    def test_find_giving_partners_within_radius(self):
+        """Test the radius query reads prefix ranges of the covering cells"""
+        self.mock_session.execute.return_value.all.return_value = [
+            (1, 40.7501, -73.9901),
+            (2, 40.8, -73.99),
+        ]
+
+        results = find_giving_partners_within_radius(
+            self.mock_session, 40.75, -73.99, 500
+        )
+
+        self.assertEqual([gp_id for gp_id, _ in results], [1])
+        sql = compile_mysql(self.mock_session.execute.call_args.args[0])
+        self.assertIn("giving_partner_geohashes.geohash LIKE concat(%s, '%%')", sql)
+
+    def test_find_duplicate_locations(self):
+        """Test GPs sharing a cell are reported"""
+        self.mock_session.execute.return_value = [
+            ("dr5ru7c0b", 3),
+            ("dr5ru7c0b", 5),
+            ("dr5ru7c0c", 8),
+            ("dr5ru7c0c", 9),
+        ]
+
+        self.assertEqual(
+            find_duplicate_locations(self.mock_session, 9),
+            [("dr5ru7c0b", [3, 5]), ("dr5ru7c0c", [8, 9])],
+        )
+        statement = self.mock_session.execute.call_args.args[0]
+        sql = compile_mysql(statement)
+        self.assertIn("HAVING count(*) > %s", sql)
+        self.assertNotIn("group_concat", sql)
+        # the rebuild was just written to the primary
+        self.assertNotIn("use_replica", statement.get_execution_options())
+
+    def test_rebuild_geohash_index(self):
+        """Test the rebuild upserts batches and removes unlocated GPs"""
+        self.mock_session.execute.return_value.all.side_effect = [
+            [(1, 40.75, -73.99), (2, 40.76, -73.98)],
+            [],
+        ]
+
+        self.assertEqual(rebuild_geohash_index(self.mock_session, 2), 2)
+        upsert_call = self.mock_session.execute.call_args_list[1]
+        self.assertIn(
+            "ON DUPLICATE KEY UPDATE geohash", compile_mysql(upsert_call.args[0])
+        )
+        self.assertEqual(
+            upsert_call.args[1][0]["geohash"], encode_geohash(40.75, -73.99)
+        )
+        self.assertIn(
+            "DELETE FROM", compile_mysql(self.mock_session.execute.call_args.args[0])
+        )
+
+    @patch.object(Config, "ZIP_CENTROID_FALLBACK_ENABLED", True)
+    def test_approximate_locations_not_indexed(self):
+        """Test the rebuild and the duplicate detection leave out the GPs
+        whose coordinates don't come from Google"""
+        self.mock_session.execute.return_value.all.return_value = []
+        rebuild_geohash_index(self.mock_session)
+        find_duplicate_locations(self.mock_session)
+
+        select_sql, delete_sql, duplicates_sql = (
+            compile_mysql(execute.args[0])
+            for execute in self.mock_session.execute.call_args_list
+        )
+        approximate = "giving_partner_location_sources.source != %s"
+        self.assertIn("donee_info.donee_id NOT IN (SELECT", select_sql)
+        self.assertIn(approximate, select_sql)
+        self.assertIn("giving_partner_geohashes.giving_partner_id IN", delete_sql)
+        self.assertIn(approximate, delete_sql)
+        self.assertEqual(duplicates_sql.count(approximate), 2)
+
+    @patch.object(Config, "GEOHASH_INDEX_ENABLED", True)
+    def test_insert_google_data_geohash(self):
+        """Test insert_google_data indexes the new coordinates"""
+        mock_gp = MagicMock(donee_id=1)
+
+        insert_google_data(self.mock_session, mock_gp, 40.75, -73.99, [])
+
+        geohash_row = self.mock_session.merge.call_args.args[0]
+        self.assertEqual(geohash_row.geohash, encode_geohash(40.75, -73.99))
+
+    @patch.object(Config, "GEOHASH_INDEX_ENABLED", True)
+    @patch.object(Config, "ZIP_CENTROID_FALLBACK_ENABLED", False)
+    @patch.object(Config, "GEOCODING_QUEUE_ENABLED", False)
+    def test_insert_google_data_zip_centroid_not_indexed(self):
+        """Test a ZIP centroid removes the GP from the index"""
+        mock_gp = MagicMock(donee_id=1)
+
+        insert_google_data(
+            self.mock_session,
+            mock_gp,
+            40.75,
+            -73.99,
+            [],
+            coordinate_source=CoordinateSource.ZIP_CENTROID,
+        )
+
+        self.mock_session.merge.assert_not_called()
+        self.assertIn(
+            "DELETE FROM giving_partner_geohashes",
+            compile_mysql(self.mock_session.execute.call_args.args[0]),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
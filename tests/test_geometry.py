@@ -0,0 +1,93 @@
+"""module for unit testing"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.config import Config
+from app.geometry import compute_outline_metrics
+from app.helper import insert_google_outlines
+
+# ~111m x ~89m rectangle at latitude 36.94 with a ~11m x ~9m hole
+SQUARE = [[-92.666, 36.942], [-92.665, 36.942], [-92.665, 36.943], [-92.666, 36.943]]
+HOLE = [[-92.6655, 36.9425], [-92.6654, 36.9425], [-92.6654, 36.9426]]
+
+
+def close(ring):
+    """Returns the closed version of a ring"""
+    return ring + ring[:1]
+
+
+class TestGeometry(unittest.TestCase):
+    """unit test class to test geometry"""
+
+    def test_compute_outline_metrics(self):
+        """Test metrics of a single polygon"""
+        metrics = compute_outline_metrics(
+            [{"type": "Polygon", "coordinates": [close(SQUARE)]}]
+        )
+
+        self.assertEqual((metrics["min_lat"], metrics["min_lon"]), (36.942, -92.666))
+        self.assertEqual((metrics["max_lat"], metrics["max_lon"]), (36.943, -92.665))
+        self.assertAlmostEqual(metrics["centroid_lat"], 36.9425, places=6)
+        self.assertAlmostEqual(metrics["centroid_lon"], -92.6655, places=6)
+        self.assertAlmostEqual(metrics["area"], 111.2 * 88.9, delta=50)
+        self.assertEqual(metrics["vertex_count"], 5)
+        self.assertEqual(metrics["polygon_count"], 1)
+        self.assertTrue(metrics["is_valid"])
+
+    def test_compute_outline_metrics_holes_and_multipolygons(self):
+        """Test holes are subtracted and multipolygons counted per polygon"""
+        with_hole = compute_outline_metrics(
+            [{"type": "Polygon", "coordinates": [close(SQUARE), close(HOLE)]}]
+        )
+        multi = compute_outline_metrics(
+            [
+                {
+                    "type": "MultiPolygon",
+                    "coordinates": [[close(SQUARE)], [close(HOLE)]],
+                }
+            ]
+        )
+
+        self.assertAlmostEqual(
+            with_hole["area"], 111.2 * 88.9 - 11.12 * 11.12 / 2, delta=50
+        )
+        self.assertEqual(multi["polygon_count"], 2)
+        self.assertGreater(multi["area"], with_hole["area"])
+
+    def test_compute_outline_metrics_invalid(self):
+        """Test open or degenerate rings are flagged invalid"""
+        open_ring = compute_outline_metrics(
+            [{"type": "Polygon", "coordinates": [SQUARE]}]
+        )
+        degenerate = compute_outline_metrics(
+            [{"type": "Polygon", "coordinates": [[[1, 1], [1, 1], [1, 1], [1, 1]]]}]
+        )
+
+        self.assertFalse(open_ring["is_valid"])
+        self.assertFalse(degenerate["is_valid"])
+        self.assertEqual(degenerate["area"], 0)
+
+    def test_compute_outline_metrics_empty(self):
+        """Test there are no metrics without vertices"""
+        self.assertIsNone(compute_outline_metrics([]))
+        self.assertIsNone(compute_outline_metrics([{"type": "Point"}]))
+
+    @patch.object(Config, "OUTLINE_METRICS_ENABLED", True)
+    @patch("app.helper.GivingPartnerOutlineMetrics")
+    def test_insert_google_outlines_merges_metrics(self, mock_metrics):
+        """Test insert_google_outlines stores the metrics with the outlines"""
+        mock_session = MagicMock()
+        outlines = [{"type": "Polygon", "coordinates": [close(SQUARE)]}]
+
+        insert_google_outlines(mock_session, 1, outlines)
+
+        self.assertEqual(mock_metrics.call_args.kwargs["giving_partner_id"], 1)
+        self.assertEqual(mock_metrics.call_args.kwargs["vertex_count"], 5)
+        mock_session.execute.assert_called_once()
+        mock_session.merge.assert_called_once_with(mock_metrics.return_value)
+        mock_session.commit.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
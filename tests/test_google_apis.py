@@ -5,7 +5,9 @@ from unittest.mock import MagicMock, patch
 
 from requests import RequestException
 
+from app.enums import ResponseProfile
 from app.google_api_calls import _call_geocoding_api, geocoding_api_address
+from app.metrics import get_counters, reset_counters
 
 
 class TestApiFunctions(unittest.TestCase):
@@ -30,10 +32,34 @@ class TestApiFunctions(unittest.TestCase):
                 "addressQuery": {
                     "addressQuery": f"{address}, {city}, {state} {zipcode}, {country}"
                 }
-            }
+            },
+            ResponseProfile.FULL,
         )
         self.assertEqual(response, mock_response)
 
+    @patch("app.google_api_calls.requests.post")
+    def test_geocoding_api_profile(self, mock_post):
+        """Test _call_geocoding_api requests the profile fields and counts the
+        payload size"""
+        reset_counters()
+        mock_post.return_value.content = b"{}" * 10
+        mock_post.return_value.headers = {"Content-Length": "8"}
+
+        _call_geocoding_api({"addressQuery": {}}, ResponseProfile.LOCATION)
+
+        headers = mock_post.call_args.kwargs["headers"]
+        self.assertEqual(headers["X-Goog-FieldMask"], "destinations.primary.location")
+        # requests negotiates the compression itself
+        self.assertNotIn("Accept-Encoding", headers)
+        self.assertEqual(
+            get_counters("geocoding_"),
+            {
+                "geocoding_responses.location": 1,
+                "geocoding_transferred_bytes.location": 8,
+                "geocoding_decoded_bytes.location": 20,
+            },
+        )
+
     @patch("app.google_api_calls.requests.post")
     def test_geocoding_api_success(self, mock_post):
         """Test _call_geocoding_api success"""
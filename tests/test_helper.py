@@ -3,8 +3,23 @@
 import unittest
 from unittest.mock import MagicMock, patch
 
+from sqlalchemy.dialects import mysql
+from sqlalchemy.exc import SQLAlchemyError
+
 from app.config import Config
-from app.helper import insert_google_data
+from app.enums import CoordinateSource
+from app.helper import (
+    get_giving_partners,
+    insert_google_data,
+    reschedule_giving_partner,
+    seed_geocoding_queue,
+)
+from app.models import GivingPartnerRow
+
+
+def compile_mysql(statement):
+    """Returns the mysql SQL of a statement"""
+    return str(statement.compile(dialect=mysql.dialect()))
 
 
 class TestHelper(unittest.TestCase):
@@ -38,18 +53,224 @@ class TestHelper(unittest.TestCase):
         self.mock_session.commit.assert_called()
 
     @patch.object(Config, "DONEE_GEOCODER_ENABLE_OUTLINES", True)
-    @patch("app.helper.GivingPartnerOutlines")
-    def test_insert_google_data_outlines_enabled(self, mock_gp_outlines):
-        """Test insert_google_data outlines enabled"""
+    def test_insert_google_data_outlines_enabled(self):
+        """Test insert_google_data upserts the outlines without the optional
+        columns when they aren't enabled"""
+
+        insert_google_data(
+            self.mock_session,
+            self.mock_gp,
+            self.donee_lat,
+            self.donee_lon,
+            self.mock_outlines,
+        )
+        outlines_statement = self.mock_session.execute.call_args.args[0]
+        self.assertEqual(
+            outlines_statement.compile().params,
+            {
+                "giving_partner_id": self.mock_gp.donee_id,
+                "outlines": self.mock_outlines,
+            },
+        )
+        self.assertIn(
+            "ON DUPLICATE KEY UPDATE outlines = VALUES(outlines)",
+            compile_mysql(outlines_statement),
+        )
+        self.mock_session.commit.assert_called()
+
+    @patch.object(Config, "DONEE_GEOCODER_ENABLE_OUTLINES", True)
+    @patch.object(Config, "OUTLINES_COMPACT_COLUMN_ENABLED", True)
+    def test_insert_google_data_outlines_compact_column(self):
+        """Test the outlines_compact column is only written once enabled"""
+
+        insert_google_data(
+            self.mock_session,
+            self.mock_gp,
+            self.donee_lat,
+            self.donee_lon,
+            self.mock_outlines,
+        )
+        params = self.mock_session.execute.call_args.args[0].compile().params
+        self.assertIn("outlines_compact", params)
+        self.assertIsNone(params["outlines_compact"])
+
+    @patch.object(Config, "DONEE_GEOCODER_ENABLE_OUTLINES", True)
+    @patch.object(Config, "CHANGE_DETECTION_ENABLED", True)
+    @patch("app.helper.has_changed", return_value=True)
+    def test_insert_google_data_outlines_hash(self, _mock_has_changed):
+        """Test the outlines hash is only written with change detection"""
+
+        insert_google_data(
+            self.mock_session,
+            self.mock_gp,
+            self.donee_lat,
+            self.donee_lon,
+            [{"type": "Polygon", "coordinates": []}],
+        )
+        params = self.mock_session.execute.call_args.args[0].compile().params
+        self.assertEqual(len(params["outlines_hash"]), 64)
+
+    @patch.object(Config, "GEOCODING_QUEUE_ENABLED", True)
+    def test_insert_google_data_dequeues(self):
+        """Test insert_google_data removes the GP from the queue in the same commit"""
+        insert_google_data(
+            self.mock_session,
+            self.mock_gp,
+            self.donee_lat,
+            self.donee_lon,
+            self.mock_outlines,
+        )
+        update_statement, delete_statement = [
+            compile_mysql(execute_call.args[0])
+            for execute_call in self.mock_session.execute.call_args_list
+        ]
+        self.assertIn("UPDATE donee_info SET donee_lat=%s", update_statement)
+        self.assertIn("DELETE FROM geocoding_queue", delete_statement)
+        self.mock_session.commit.assert_called_once()
 
+    @patch.object(Config, "GEOCODING_QUEUE_ENABLED", True)
+    @patch.object(Config, "ZIP_CENTROID_FALLBACK_ENABLED", True)
+    def test_insert_google_data_zip_centroid(self):
+        """Test ZIP centroid coordinates are tagged and the GP stays queued"""
         insert_google_data(
             self.mock_session,
             self.mock_gp,
             self.donee_lat,
             self.donee_lon,
             self.mock_outlines,
+            coordinate_source=CoordinateSource.ZIP_CENTROID,
+        )
+        location_source = self.mock_session.merge.call_args.args[0]
+        self.assertEqual(
+            (location_source.source, location_source.precision),
+            ("zip_centroid", "postal_code"),
+        )
+        queue_statement = compile_mysql(
+            self.mock_session.execute.call_args_list[-1].args[0]
+        )
+        self.assertIn("UPDATE geocoding_queue SET reason=%s", queue_statement)
+        self.mock_session.commit.assert_called_once()
+
+    @patch.object(Config, "GEOCODING_QUEUE_ENABLED", True)
+    def test_get_giving_partners_from_queue(self):
+        """Test get_giving_partners reads pending GPs from the queue"""
+        get_giving_partners(self.mock_session)
+
+        sql = compile_mysql(self.mock_session.execute.call_args.args[0])
+        self.assertIn("JOIN geocoding_queue", sql)
+        self.assertIn("geocoding_queue.next_attempt_at <= now()", sql)
+        self.assertIn(
+            "ORDER BY geocoding_queue.priority DESC, geocoding_queue.attempts, "
+            "geocoding_queue.giving_partner_id DESC",
+            sql,
+        )
+        self.assertNotIn("donee_lat =", sql)
+
+    @patch.object(Config, "GEOCODING_QUEUE_ENABLED", False)
+    def test_get_giving_partners_scan(self):
+        """Test get_giving_partners scans donee_info when the queue is disabled"""
+        get_giving_partners(self.mock_session)
+
+        sql = compile_mysql(self.mock_session.execute.call_args.args[0])
+        self.assertIn("donee_info.donee_lat = %s", sql)
+        self.assertIn(
+            "ORDER BY donee_info.active DESC, donee_info.unregistered, "
+            "donee_info.donee_id DESC",
+            sql,
+        )
+
+    @patch.object(Config, "GEOCODING_QUEUE_ENABLED", False)
+    @patch.object(Config, "ZIP_CENTROID_FALLBACK_ENABLED", True)
+    def test_get_giving_partners_scan_zip_centroids(self):
+        """Test the scan also selects the GPs due to refine their ZIP centroid"""
+        get_giving_partners(self.mock_session)
+
+        sql = compile_mysql(self.mock_session.execute.call_args.args[0])
+        self.assertIn(
+            "WHERE donee_info.donee_lat = %s OR donee_info.donee_id IN "
+            "(SELECT giving_partner_location_sources.giving_partner_id",
+            sql,
+        )
+        self.assertIn("giving_partner_location_sources.source = %s", sql)
+        self.assertIn(
+            "giving_partner_location_sources.updated_at <= "
+            "timestampadd(HOUR, %s, now())",
+            sql,
+        )
+
+    def test_get_giving_partners_lean_rows(self):
+        """Test get_giving_partners selects only the needed columns into rows"""
+        self.mock_session.execute.return_value = [
+            (1, "test_address", "test_city", "test_state", "test_zip", "US")
+        ]
+
+        result = get_giving_partners(self.mock_session, [1])
+
+        self.assertEqual(
+            result,
+            [
+                GivingPartnerRow(
+                    1, "test_address", "test_city", "test_state", "test_zip", "US"
+                )
+            ],
+        )
+        sql = compile_mysql(self.mock_session.execute.call_args.args[0])
+        self.assertTrue(
+            sql.startswith(
+                "SELECT donee_info.donee_id, donee_info.address, donee_info.city, "
+                "donee_info.state, donee_info.zip, donee_info.country \nFROM"
+            )
+        )
+
+    def test_insert_google_data_core_update(self):
+        """Test insert_google_data updates the coordinates with a Core statement"""
+        insert_google_data(
+            self.mock_session,
+            GivingPartnerRow(self.gp_id, "", "", "", "", ""),
+            self.donee_lat,
+            self.donee_lon,
+            [],
+        )
+
+        statement = self.mock_session.execute.call_args.args[0]
+        self.assertEqual(
+            compile_mysql(statement),
+            "UPDATE donee_info SET donee_lat=%s, donee_lon=%s "
+            "WHERE donee_info.donee_id = %s",
         )
-        mock_gp_outlines.assert_called_with(
-            giving_partner_id=self.mock_gp.donee_id, outlines=self.mock_outlines
+        self.assertEqual(
+            statement.compile().params,
+            {"donee_lat": 10, "donee_lon": 11, "donee_id_1": 1},
+        )
+
+    def test_reschedule_giving_partner(self):
+        """Test reschedule_giving_partner backs off the next attempt"""
+        reschedule_giving_partner(self.mock_session, self.gp_id)
+
+        sql = compile_mysql(self.mock_session.execute.call_args.args[0])
+        self.assertIn("attempts=(geocoding_queue.attempts + %s)", sql)
+        self.assertIn("next_attempt_at=timestampadd(MINUTE", sql)
+        self.mock_session.commit.assert_called()
+
+    def test_reschedule_giving_partner_error(self):
+        """Test a failed reschedule is rolled back without raising"""
+        self.mock_session.execute.side_effect = SQLAlchemyError("gone away")
+
+        reschedule_giving_partner(self.mock_session, self.gp_id)
+
+        self.mock_session.rollback.assert_called_once()
+        self.mock_session.commit.assert_not_called()
+
+    def test_seed_geocoding_queue(self):
+        """Test seed_geocoding_queue enqueues GPs without coordinates"""
+        self.mock_session.execute.return_value.rowcount = 3
+
+        self.assertEqual(seed_geocoding_queue(self.mock_session), 3)
+        sql = compile_mysql(self.mock_session.execute.call_args.args[0])
+        self.assertIn(
+            "INSERT IGNORE INTO geocoding_queue (giving_partner_id, reason, priority)",
+            sql,
         )
+        self.assertIn("donee_info.active * %s + (%s - donee_info.unregistered)", sql)
+        self.assertIn("WHERE donee_info.donee_lat = %s", sql)
         self.mock_session.commit.assert_called()
@@ -0,0 +1,176 @@
+"""unitest module for testing"""
+
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from app.api_keys import acquire_api_key, configure_api_keys
+from app.config import Config
+from app.google_api_calls import (
+    _get_hedge_executor,
+    _post,
+    is_retryable,
+    shutdown_hedge_executor,
+)
+from app.latency import (
+    get_hedge_delay,
+    get_latency_percentile,
+    get_timeout,
+    record_latency,
+    reset_latencies,
+    take_hedge_budget,
+)
+from app.metrics import get_counters, reset_counters
+
+
+@patch.object(Config, "GEOCODING_LATENCY_MIN_SAMPLES", 10)
+class TestLatency(unittest.TestCase):
+    """testing class for latency.py and the hedged geocoding calls"""
+
+    def setUp(self):
+        """Forget the latencies and counters of other tests"""
+        reset_latencies()
+        reset_counters()
+        self.addCleanup(reset_latencies)
+
+    @patch.object(Config, "GEOCODING_ADAPTIVE_TIMEOUT_ENABLED", True)
+    def test_adaptive_timeout(self):
+        """Test the timeout follows the p99 latency within its bounds"""
+        self.assertEqual(get_timeout(), Config.GEOCODING_TIMEOUT_SECONDS)
+        for latency in range(1, 11):
+            record_latency(latency / 10)
+
+        self.assertEqual(get_latency_percentile(0.5), 0.5)
+        with patch.object(Config, "GEOCODING_TIMEOUT_MIN_SECONDS", 1):
+            self.assertEqual(get_timeout(), 3)
+        self.assertEqual(get_timeout(), Config.GEOCODING_TIMEOUT_MIN_SECONDS)
+
+    @patch.object(Config, "GEOCODING_HEDGING_ENABLED", True)
+    @patch.object(Config, "GEOCODING_HEDGE_MAX_RATIO", 0.1)
+    def test_hedge_budget(self):
+        """Test hedges are capped to a ratio of the calls"""
+        for _ in range(10):
+            record_latency(0.1)
+            get_hedge_delay()
+
+        self.assertEqual(get_hedge_delay(), 0.1)
+        self.assertTrue(take_hedge_budget())
+        self.assertFalse(take_hedge_budget())
+
+    @patch.object(Config, "GEOCODING_HEDGING_ENABLED", True)
+    @patch.object(Config, "GEOCODING_HEDGE_MAX_RATIO", 1)
+    @patch("app.google_api_calls.requests.post")
+    def test_hedged_request_wins(self, mock_post):
+        """Test a stalled call is hedged and the first response is returned"""
+        for _ in range(10):
+            record_latency(0.01)
+        stalled = threading.Event()
+        self.addCleanup(stalled.set)
+        hedge_response = MagicMock()
+
+        def post(*_args, **_kwargs):
+            if mock_post.call_count == 1:
+                stalled.wait(5)
+                return MagicMock()
+            return hedge_response
+
+        mock_post.side_effect = post
+        started_at = time.perf_counter()
+        response = _post("http://geocoding", {}, {}, acquire_api_key())
+
+        self.assertLess(time.perf_counter() - started_at, 1)
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertIs(response, hedge_response)
+        self.assertEqual(
+            get_counters("geocoding_hedge"),
+            {"geocoding_hedged_requests": 1, "geocoding_hedge_wins": 1},
+        )
+
+    @patch.object(Config, "GEOCODING_HEDGING_ENABLED", True)
+    @patch.object(Config, "GEOCODING_HEDGE_MAX_RATIO", 1)
+    @patch("app.google_api_calls.requests.post")
+    def test_hedge_uses_its_own_key(self, mock_post):
+        """Test the hedge takes another key under its rate limit, or is
+        skipped when none is available"""
+        for _ in range(10):
+            record_latency(0.01)
+        configure_api_keys(["a:1:1", "b:1:1"])
+        self.addCleanup(configure_api_keys)
+        responses = {"a": MagicMock(), "b": MagicMock()}
+
+        def post(*_args, headers, **_kwargs):
+            if headers["X-Goog-Api-Key"] == "a":
+                time.sleep(0.2)
+            return responses[headers["X-Goog-Api-Key"]]
+
+        mock_post.side_effect = post
+        api_key = acquire_api_key()
+        response = _post("http://geocoding", {"X-Goog-Api-Key": "a"}, {}, api_key)
+
+        self.assertIs(response, responses["b"])
+        # both keys are at their limit of 1 call per minute
+        response = _post("http://geocoding", {"X-Goog-Api-Key": "a"}, {}, api_key)
+
+        self.assertIs(response, responses["a"])
+        self.assertEqual(mock_post.call_count, 3)
+        self.assertEqual(
+            get_counters("geocoding_hedges_skipped"), {"geocoding_hedges_skipped": 1}
+        )
+
+    @patch.object(Config, "GEOCODING_HEDGING_ENABLED", True)
+    @patch.object(Config, "GEOCODING_HEDGE_MAX_RATIO", 1)
+    @patch("app.google_api_calls.report_api_key_failure")
+    @patch("app.google_api_calls.requests.post")
+    def test_abandoned_call_reports_its_key(
+        self, mock_post, mock_report_api_key_failure
+    ):
+        """Test the key of a call the hedge beat still reports its failure"""
+        for _ in range(10):
+            record_latency(0.01)
+        configure_api_keys(["a", "b"])
+        self.addCleanup(configure_api_keys)
+        stalled = threading.Event()
+        self.addCleanup(stalled.set)
+        throttled = MagicMock(status_code=429, headers={"Retry-After": "7"})
+        throttled.raise_for_status.side_effect = requests.HTTPError(response=throttled)
+        reported = threading.Event()
+        mock_report_api_key_failure.side_effect = lambda *_args: reported.set()
+
+        def post(*_args, headers, **_kwargs):
+            if headers["X-Goog-Api-Key"] == "a":
+                stalled.wait(5)
+                return throttled
+            return MagicMock()
+
+        mock_post.side_effect = post
+        api_key = acquire_api_key()
+        _post("http://geocoding", {"X-Goog-Api-Key": "a"}, {}, api_key)
+
+        mock_report_api_key_failure.assert_not_called()
+        stalled.set()
+        self.assertTrue(reported.wait(5))
+        mock_report_api_key_failure.assert_called_once_with(api_key, 429, 7.0)
+
+    def test_timeout_retried_with_adaptive_timeouts(self):
+        """Test a timeout is only retried when the timeout is adaptive"""
+        self.assertFalse(is_retryable(requests.Timeout()))
+        with patch.object(Config, "GEOCODING_ADAPTIVE_TIMEOUT_ENABLED", True):
+            self.assertTrue(is_retryable(requests.Timeout()))
+
+    def test_shutdown_hedge_executor(self):
+        """Test the hedge executor is stopped and restarted on demand"""
+        executor = _get_hedge_executor()
+        self.assertIs(_get_hedge_executor(), executor)
+
+        shutdown_hedge_executor()
+
+        with self.assertRaises(RuntimeError):
+            executor.submit(time.time)
+        self.assertIsNot(_get_hedge_executor(), executor)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+"""unitest module for testing"""
+
+import unittest
+from unittest.mock import patch
+
+from tenacity import RetryError
+
+from app.config import Config
+from app.google_api_calls import _call_geocoding_api
+from loadtest.driver import run_load_test
+from loadtest.fake_geocoding_server import FakeGeocodingServer, FaultProfile
+
+
+class TestLoadTest(unittest.TestCase):
+    """testing class for the load test harness"""
+
+    def start_server(self, **faults):
+        """Starts a fake Geocoding API server stopped after the test"""
+        server = FakeGeocodingServer(FaultProfile(latency_ms=1, **faults), seed=1)
+        server.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    @patch.object(Config, "GOOGLE_GEOCODING_BASE_URL")
+    def test_run_load_test(self, _):
+        """Test the report of a load test without faults"""
+        server = self.start_server()
+
+        report = run_load_test(server, "donee_geocoder", 5, 2)
+
+        self.assertEqual(report["outcomes"], {"succeeded": 5})
+        self.assertEqual(report["requests_per_gp"], 1)
+        self.assertEqual(report["server_statuses"], {200: 5})
+
+    @patch.object(Config, "GOOGLE_GEOCODING_BASE_URL")
+    @patch.object(Config, "CHANGE_DETECTION_ENABLED", True)
+    def test_run_load_test_change_detection(self, _):
+        """Test a load test with change detection, which reads through the
+        discarding session"""
+        server = self.start_server()
+
+        for job in ("donee_geocoder", "outlines"):
+            report = run_load_test(server, job, 3, 2)
+
+            self.assertEqual(report["outcomes"], {"succeeded": 3})
+
+    def test_geocoding_api_retries_429(self):
+        """Test 429 responses are retried after their Retry-After"""
+        server = self.start_server(rate_429=1.0, retry_after=0.0)
+
+        with patch.object(Config, "GOOGLE_GEOCODING_BASE_URL", server.base_url):
+            with self.assertRaises(RetryError):
+                _call_geocoding_api({"addressQuery": {}})
+
+        self.assertEqual(server.statuses[429], Config.GEOCODING_RETRY_ATTEMPTS)
+
+
+if __name__ == "__main__":
+    unittest.main()
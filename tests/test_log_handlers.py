@@ -0,0 +1,78 @@
+"""unitest module for testing"""
+
+import logging
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.log_handlers import SamplingFilter, get_queue_handler
+from app.metrics import ProgressReporter
+
+
+def make_record(message, level=logging.INFO):
+    """Returns a log record of message"""
+    return logging.LogRecord("test", level, __file__, 1, message, None, None)
+
+
+class TestLogHandlers(unittest.TestCase):
+    """testing class for log_handlers.py"""
+
+    def test_sampling_filter(self):
+        """Test one in every rate sampled records is kept"""
+        sampling_filter = SamplingFilter(["Processing giving partner"], 3)
+
+        kept = [
+            sampling_filter.filter(make_record(f"Processing giving partner {i}"))
+            for i in range(6)
+        ]
+
+        self.assertEqual(kept, [True, False, False, True, False, False])
+        self.assertTrue(sampling_filter.filter(make_record("Other message")))
+        self.assertTrue(
+            sampling_filter.filter(
+                make_record("Processing giving partner", logging.ERROR)
+            )
+        )
+
+    def test_sampling_filter_drops(self):
+        """Test a rate of 0 drops every sampled record"""
+        sampling_filter = SamplingFilter(["Processing giving partner"], 0)
+
+        self.assertFalse(
+            sampling_filter.filter(make_record("Processing giving partner"))
+        )
+
+    @patch("app.log_handlers.atexit.register")
+    def test_get_queue_handler(self, mock_register):
+        """Test queued records are written by the listener once it stops"""
+        mock_handler = MagicMock()
+        mock_handler.level = logging.NOTSET
+
+        queue_handler = get_queue_handler(mock_handler)
+        queue_handler.handle(make_record("queued"))
+        stop_listener = mock_register.call_args.args[0]
+        stop_listener()
+
+        self.assertEqual(mock_handler.handle.call_args.args[0].getMessage(), "queued")
+
+    @patch("app.metrics.logger")
+    def test_progress_reporter(self, mock_logger):
+        """Test progress summaries are logged every interval GPs"""
+        progress = ProgressReporter("Test", interval=2)
+
+        for outcome in ("succeeded", "failed", "succeeded"):
+            progress.record(outcome)
+        progress.log()
+
+        self.assertEqual(mock_logger.info.call_count, 2)
+        message, value = (
+            mock_logger.info.call_args.args[0],
+            mock_logger.info.call_args.kwargs["value"],
+        )
+        self.assertEqual(message, "Test finished")
+        self.assertEqual(
+            (value["processed"], value["succeeded"], value["failed"]), ("3", "2", "1")
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
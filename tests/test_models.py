@@ -0,0 +1,53 @@
+"""unitest module for testing"""
+
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import create_engine, literal, select, update
+
+from app.config import Config
+from app.models import GivingPartners, get_engine, get_read_engine, get_session
+
+
+class TestModels(unittest.TestCase):
+    """testing class for models.py"""
+
+    def setUp(self):
+        """Setup primary and replica engines before each test"""
+        self.engine = create_engine("sqlite://")
+        self.read_engine = create_engine("sqlite://")
+
+    def tearDown(self):
+        """Dispose the engines after each test"""
+        self.engine.dispose()
+        self.read_engine.dispose()
+
+    @patch.object(Config, "DB_POOL_SIZE", 20)
+    @patch.object(Config, "DB_POOL_PRE_PING", True)
+    def test_get_engine_pool(self):
+        """Test get_engine sizes the pool from the config"""
+        engine = get_engine("host", 3306, "user", "password", "platform")
+
+        self.assertEqual(engine.pool.size(), 20)
+        self.assertTrue(engine.pool._pre_ping)  # pylint: disable=protected-access
+
+    @patch.object(Config, "PLATFORM_DB_HOST_READ", None)
+    def test_get_read_engine_without_replica(self):
+        """Test there is no read engine without a replica host"""
+        self.assertIsNone(get_read_engine())
+
+    def test_routing_session(self):
+        """Test only use_replica statements are sent to the read replica"""
+        replica_query = select(literal(1)).execution_options(use_replica=True)
+
+        with get_session(self.engine, self.read_engine) as session:
+            self.assertIs(session.get_bind(clause=replica_query), self.read_engine)
+            self.assertIs(session.get_bind(clause=select(literal(1))), self.engine)
+            self.assertIs(session.get_bind(clause=update(GivingPartners)), self.engine)
+
+        with get_session(self.engine) as session:
+            self.assertIs(session.get_bind(clause=replica_query), self.engine)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+"""unitest module for testing"""
+
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.config import Config
+from app.models import GivingPartnerOutlines
+from app.outline_encoding import (
+    decode_outlines,
+    encode_outlines,
+    get_outline_columns,
+    load_outlines,
+)
+from app.services.outline_storage import convert_outlines
+
+
+def make_ring(count, latitude=40.7484405, longitude=-73.9856644):
+    """Returns a closed ring of count vertices with 7-decimal coordinates"""
+    ring = [
+        [round(longitude + i * 1.3e-6, 7), round(latitude + (i % 7) * 2.1e-6, 7)]
+        for i in range(count)
+    ]
+    return ring + [ring[0]]
+
+
+class TestOutlineEncoding(unittest.TestCase):
+    """testing class for the compact outline encoding"""
+
+    def setUp(self):
+        """Set up outlines with holes and a MultiPolygon"""
+        self.outlines = [
+            {"type": "Polygon", "coordinates": [make_ring(400), make_ring(12)]},
+            {
+                "type": "MultiPolygon",
+                "coordinates": [[make_ring(5)], [make_ring(30), make_ring(4)]],
+            },
+        ]
+
+    def test_round_trip(self):
+        """Test 7-decimal outlines are decoded exactly and stored smaller"""
+        blob = encode_outlines(self.outlines)
+
+        self.assertEqual(decode_outlines(blob), self.outlines)
+        self.assertLess(len(blob) * 10, len(json.dumps(self.outlines)))
+        self.assertEqual(decode_outlines(encode_outlines([])), [])
+
+    def test_round_trip_antimeridian(self):
+        """Test deltas wider than 32 bits are decoded exactly"""
+        outlines = [
+            {
+                "type": "Polygon",
+                "coordinates": [[[179.9999999, 1.0], [-179.9999999, 1.0], [0.0, 0.0]]],
+            }
+        ]
+        self.assertEqual(decode_outlines(encode_outlines(outlines)), outlines)
+
+    def test_unencodable_outlines_stay_json(self):
+        """Test outlines the format can't hold are stored as JSON"""
+        for outlines in (
+            [{"type": "Point", "coordinates": [1.0, 2.0]}],
+            [{"type": "Polygon", "coordinates": [[[1.0, 2.0, 3.0]]]}],
+            [{"type": "Polygon", "coordinates": [], "bbox": []}],
+        ):
+            self.assertIsNone(encode_outlines(outlines))
+            self.assertEqual(
+                get_outline_columns(outlines, "compact"),
+                {"outlines": outlines, "outlines_compact": None},
+            )
+
+    def test_load_outlines(self):
+        """Test rows are read back in either storage format"""
+        columns = get_outline_columns(self.outlines, "compact")
+
+        self.assertIsNone(columns["outlines"])
+        self.assertEqual(load_outlines(**columns), self.outlines)
+        self.assertEqual(
+            load_outlines(**get_outline_columns(self.outlines, "json")), self.outlines
+        )
+
+    @patch.object(Config, "OUTLINES_STORAGE_FORMAT", "compact")
+    def test_convert_outlines(self):
+        """Test the JSON rows are rewritten compact in batches"""
+        mock_session = MagicMock()
+        mock_session.execute.return_value.all.side_effect = [
+            [(1, self.outlines, None), (2, [{"type": "Point"}], None)],
+            [],
+        ]
+
+        summary = convert_outlines(mock_session, batch_size=2)
+
+        self.assertEqual((summary["converted"], summary["skipped"]), (1, 1))
+        self.assertLess(summary["bytes_after"] * 10, summary["bytes_before"])
+        (update_row,) = mock_session.execute.call_args_list[1].args[1]
+        self.assertEqual(update_row["giving_partner_id"], 1)
+        self.assertEqual(
+            load_outlines(update_row["outlines"], update_row["outlines_compact"]),
+            self.outlines,
+        )
+        self.assertEqual(mock_session.commit.call_count, 1)
+
+    @patch.object(Config, "OUTLINES_COMPACT_COLUMN_ENABLED", True)
+    def test_convert_outlines_round_trip(self):
+        """Test converting to compact and back clears the other column to SQL
+        NULL on a database"""
+        engine = create_engine("sqlite://").execution_options(
+            schema_translate_map={Config.PLATFORM_DB_DATABASE: None}
+        )
+        self.addCleanup(engine.dispose)
+        GivingPartnerOutlines.__table__.create(engine)
+        outlines = GivingPartnerOutlines.outlines
+        outlines_compact = GivingPartnerOutlines.outlines_compact
+
+        with Session(engine) as session:
+            session.add(GivingPartnerOutlines(giving_partner_id=1, outlines=[]))
+            session.add(
+                GivingPartnerOutlines(giving_partner_id=2, outlines=self.outlines)
+            )
+            session.commit()
+
+            self.assertEqual(convert_outlines(session, "compact")["converted"], 2)
+            self.assertEqual(
+                session.scalars(
+                    select(GivingPartnerOutlines.giving_partner_id).where(
+                        outlines.is_(None), outlines_compact.is_not(None)
+                    )
+                ).all(),
+                [1, 2],
+            )
+
+            self.assertEqual(convert_outlines(session, "json")["converted"], 2)
+            rows = session.execute(
+                select(GivingPartnerOutlines.giving_partner_id, outlines).where(
+                    outlines.is_not(None), outlines_compact.is_(None)
+                )
+            ).all()
+            self.assertEqual(rows, [(1, []), (2, self.outlines)])
+
+
+if __name__ == "__main__":
+    unittest.main()
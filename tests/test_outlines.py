@@ -3,6 +3,7 @@
 import unittest
 from unittest.mock import MagicMock, call, patch
 
+from app.enums import ResponseProfile
 from app.scripts.outlines import main
 from app.services.building_outlines import process_outlines, run_outlines
 
@@ -110,6 +111,7 @@ class TestOutlines(unittest.TestCase):
             "test_state",
             "test_zip",
             "test_country",
+            profile=ResponseProfile.OUTLINES,
         )
         mock_insert_google_outlines.assert_called_with(
             mock_session,
@@ -0,0 +1,178 @@
+"""unitest module for testing"""
+
+import unittest
+from unittest.mock import ANY, MagicMock, call, patch
+
+from app.config import Config
+from app.process_pool import (
+    extract_destinations,
+    extract_google_data,
+    get_process_pool,
+    iter_pooled_extractions,
+)
+from app.services.building_outlines import run_outlines
+from app.services.location_and_outlines import run_location_and_outlines
+
+POLYGON = {"type": "Polygon", "coordinates": [[[1, 2], [3, 4], [1, 2]]]}
+
+
+def make_destinations(latitude):
+    """Returns geocoding destinations of a building at latitude"""
+    return [
+        {
+            "primary": {
+                "location": {"latitude": latitude, "longitude": 11},
+                "structureType": "BUILDING",
+                "displayPolygon": POLYGON,
+            }
+        }
+    ]
+
+
+@patch.object(Config, "PROCESS_POOL_WORKERS", 2)
+class TestProcessPool(unittest.TestCase):
+    """testing class for process_pool.py"""
+
+    def setUp(self):
+        """Setup mocks before each test"""
+        self.mock_session = MagicMock()
+        self.mock_gps = []
+        for gp_id in range(1, 6):
+            mock_gp = MagicMock()
+            mock_gp.donee_id = gp_id
+            mock_gp.address = f"test_address_{gp_id}"
+            self.mock_gps.append(mock_gp)
+
+    @patch.object(Config, "OUTLINE_METRICS_ENABLED", True)
+    def test_extract_google_data(self):
+        """Test extract_google_data returns coordinates and outlines"""
+        latitude, longitude, outlines, outline_metrics = extract_google_data(
+            make_destinations(10)
+        )
+        self.assertEqual((latitude, longitude, outlines), (10, 11, [POLYGON]))
+        self.assertEqual(outline_metrics["vertex_count"], 3)
+        self.assertEqual(extract_google_data([]), (-1, -1, [], None))
+
+    @patch.object(Config, "OUTLINE_METRICS_ENABLED", False)
+    def test_extract_google_data_pooled(self):
+        """Test the pool is sent the raw destinations and does the extraction"""
+        mock_pool = MagicMock()
+        destinations = make_destinations(10)
+
+        self.assertIs(
+            extract_google_data(destinations, mock_pool),
+            mock_pool.submit.return_value.result.return_value,
+        )
+        mock_pool.submit.assert_called_once_with(
+            extract_destinations, destinations, False
+        )
+
+    @patch("app.process_pool.geocode_destinations")
+    def test_iter_pooled_extractions(self, mock_geocode_destinations):
+        """Test pooled extractions keep input order and carry geocoding errors"""
+
+        def geocode_destinations(giving_partner, _profile):
+            if giving_partner.donee_id == 3:
+                raise ValueError("boom")
+            return make_destinations(giving_partner.donee_id)
+
+        mock_geocode_destinations.side_effect = geocode_destinations
+
+        with get_process_pool() as pool:
+            results = list(iter_pooled_extractions(pool, self.mock_gps))
+
+        self.assertEqual([gp for gp, *_ in results], self.mock_gps)
+        self.assertEqual(results[0][1].result()[:3], (1, 11, [POLYGON]))
+        with self.assertRaises(ValueError):
+            results[2][1].result()
+        self.assertEqual(results[4][1].result()[:3], (5, 11, [POLYGON]))
+
+    @patch.object(Config, "OUTLINE_METRICS_ENABLED", True)
+    @patch("app.process_pool.geocode_destinations")
+    def test_iter_pooled_extractions_metrics(self, mock_geocode_destinations):
+        """Test the pool computes the metrics of the extracted outlines"""
+        mock_geocode_destinations.side_effect = lambda giving_partner, _profile: (
+            make_destinations(giving_partner.donee_id)
+        )
+
+        with get_process_pool() as pool:
+            results = [
+                extraction.result()
+                for _, extraction, *_ in iter_pooled_extractions(pool, self.mock_gps)
+            ]
+
+        self.assertEqual(results[0][:3], (1, 11, [POLYGON]))
+        self.assertEqual(
+            [outline_metrics["vertex_count"] for *_, outline_metrics in results],
+            [3] * len(self.mock_gps),
+        )
+
+    @patch.object(Config, "PROCESS_POOL_ENABLED", True)
+    @patch("app.services.location_and_outlines.publish_sns_search_sync")
+    @patch("app.services.location_and_outlines.insert_google_data")
+    @patch("app.process_pool.geocoding_api_address")
+    @patch("app.services.location_and_outlines.get_giving_partners")
+    def test_run_location_and_outlines_pooled(
+        self,
+        mock_get_giving_partners,
+        mock_geocoding_api_address,
+        mock_insert_google_data,
+        mock_publish_sns_search_sync,
+    ):
+        """Test run_location_and_outlines() with the process pool"""
+        mock_get_giving_partners.return_value = self.mock_gps[:2]
+        mock_geocoding_api_address.side_effect = [
+            {"destinations": make_destinations(10)},
+            None,
+        ]
+        mock_insert_google_data.return_value = True
+
+        run_location_and_outlines(self.mock_session, MagicMock())
+        mock_insert_google_data.assert_has_calls(
+            [
+                call(
+                    self.mock_session,
+                    self.mock_gps[0],
+                    10,
+                    11,
+                    [POLYGON],
+                    outline_metrics=ANY,
+                ),
+                call(
+                    self.mock_session,
+                    self.mock_gps[1],
+                    -1,
+                    -1,
+                    [],
+                    outline_metrics=None,
+                ),
+            ]
+        )
+        self.assertEqual(mock_publish_sns_search_sync.call_count, 2)
+
+    @patch.object(Config, "PROCESS_POOL_ENABLED", True)
+    @patch.object(Config, "GP_IDS", "1,2")
+    @patch("app.services.building_outlines.insert_google_outlines")
+    @patch("app.process_pool.geocoding_api_address")
+    @patch("app.services.building_outlines.get_giving_partners")
+    def test_run_outlines_pooled(
+        self,
+        mock_get_giving_partners,
+        mock_geocoding_api_address,
+        mock_insert_google_outlines,
+    ):
+        """Test run_outlines() with the process pool"""
+        mock_get_giving_partners.return_value = self.mock_gps[:2]
+        mock_geocoding_api_address.side_effect = [
+            {"destinations": make_destinations(10)},
+            None,
+        ]
+
+        run_outlines(self.mock_session)
+        mock_insert_google_outlines.assert_called_once_with(
+            self.mock_session, 1, [POLYGON], outline_metrics=ANY
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
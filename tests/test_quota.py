@@ -0,0 +1,212 @@
+"""module for unit testing"""
+
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy.dialects import mysql
+from sqlalchemy.exc import OperationalError
+
+from app import quota
+from app.config import Config
+from app.helper import get_giving_partners
+from app.quota import (
+    QuotaExceededError,
+    configure_quota_ledger,
+    consume_geocoding_call,
+    get_quota_status,
+    get_quota_window,
+)
+from app.services.location_and_outlines import run_location_and_outlines
+
+
+@patch.object(Config, "QUOTA_WINDOW_HOURS", 24)
+@patch.object(Config, "QUOTA_WINDOW_OFFSET_HOURS", -8)
+@patch.object(Config, "QUOTA_SOFT_LIMIT", 900)
+@patch.object(Config, "QUOTA_HARD_LIMIT", 1000)
+class TestQuota(unittest.TestCase):
+    """unit test class to test the quota ledger"""
+
+    def setUp(self):
+        """Setup mocks before each test"""
+        self.mock_session = MagicMock()
+
+    def tearDown(self):
+        """Deactivate the ledger after each test"""
+        configure_quota_ledger(None)
+
+    def test_get_quota_window(self):
+        """Test windows start at midnight Pacific time"""
+        self.assertEqual(
+            get_quota_window(datetime(2024, 5, 2, 3, 0)),
+            (datetime(2024, 5, 1, 8, 0), datetime(2024, 5, 2, 8, 0)),
+        )
+        self.assertEqual(
+            get_quota_window(datetime(2024, 5, 2, 8, 0))[0], datetime(2024, 5, 2, 8)
+        )
+
+    def test_consume_geocoding_call_without_ledger(self):
+        """Test calls are not counted until the ledger is configured"""
+        consume_geocoding_call()
+
+    @patch.object(Config, "QUOTA_RESERVATION_SIZE", 3)
+    @patch("app.quota.sessionmaker")
+    def test_consume_geocoding_call(self, mock_sessionmaker):
+        """Test calls are reserved in blocks with a conditional increment"""
+        mock_session = (
+            mock_sessionmaker.return_value.return_value.__enter__.return_value
+        )
+        mock_session.execute.return_value.rowcount = 1
+        configure_quota_ledger(MagicMock())
+
+        for _ in range(4):
+            consume_geocoding_call()
+
+        # one INSERT IGNORE and one increment per block of 3 calls
+        self.assertEqual(mock_session.execute.call_count, 4)
+        self.assertEqual(mock_session.commit.call_count, 2)
+        statement = mock_session.execute.call_args.args[0]
+        sql = str(statement.compile(dialect=mysql.dialect()))
+        self.assertIn("SET calls=(geocoding_api_usage.calls + %s)", sql)
+        self.assertIn("geocoding_api_usage.calls + %s <= %s", sql)
+        self.assertEqual(list(statement.compile().params.values())[0], 3)
+
+        # the 2 unused calls of the second block are given back
+        configure_quota_ledger(None)
+        statement = mock_session.execute.call_args.args[0]
+        sql = str(statement.compile(dialect=mysql.dialect()))
+        self.assertIn("SET calls=(geocoding_api_usage.calls - %s)", sql)
+        self.assertEqual(list(statement.compile().params.values())[0], 2)
+
+    @patch.object(Config, "QUOTA_RESERVATION_SIZE", 3)
+    @patch("app.quota.sessionmaker")
+    def test_consume_geocoding_call_last_calls(self, mock_sessionmaker):
+        """Test the calls are reserved one at a time once less than a block
+        is left"""
+        mock_session = (
+            mock_sessionmaker.return_value.return_value.__enter__.return_value
+        )
+        # INSERT IGNORE, block increment refused, single increment
+        mock_session.execute.side_effect = [
+            MagicMock(),
+            MagicMock(rowcount=0),
+            MagicMock(rowcount=1),
+        ]
+        configure_quota_ledger(MagicMock())
+
+        consume_geocoding_call()
+
+        statement = mock_session.execute.call_args.args[0]
+        self.assertEqual(list(statement.compile().params.values())[0], 1)
+        mock_session.execute.side_effect = None
+        mock_session.execute.reset_mock()
+        configure_quota_ledger(None)
+        mock_session.execute.assert_not_called()
+
+    @patch("app.quota.sessionmaker")
+    def test_consume_geocoding_call_exceeded(self, mock_sessionmaker):
+        """Test calls over the hard budget raise"""
+        mock_session = (
+            mock_sessionmaker.return_value.return_value.__enter__.return_value
+        )
+        mock_session.execute.return_value.rowcount = 0
+        configure_quota_ledger(MagicMock())
+
+        with self.assertRaises(QuotaExceededError):
+            consume_geocoding_call()
+
+    @patch("app.quota.sessionmaker")
+    def test_consume_geocoding_call_unlocked_io(self, mock_sessionmaker):
+        """Test the ledger is written without holding the lock of the other
+        geocoding threads"""
+        mock_session = (
+            mock_sessionmaker.return_value.return_value.__enter__.return_value
+        )
+        locked_during_io = []
+
+        def execute(*_args):
+            # pylint: disable-next=protected-access
+            locked_during_io.append(quota._reserved._is_owned())
+            return MagicMock(rowcount=1)
+
+        mock_session.execute.side_effect = execute
+        configure_quota_ledger(MagicMock())
+
+        consume_geocoding_call()
+
+        self.assertEqual(locked_during_io, [False, False])
+
+    @patch("app.quota.sessionmaker")
+    def test_consume_geocoding_call_ledger_error(self, mock_sessionmaker):
+        """Test an unreachable ledger stops the run like an exceeded quota"""
+        mock_session = (
+            mock_sessionmaker.return_value.return_value.__enter__.return_value
+        )
+        mock_session.execute.side_effect = OperationalError("", {}, Exception())
+        configure_quota_ledger(MagicMock())
+
+        with self.assertRaises(QuotaExceededError):
+            consume_geocoding_call()
+
+        # the next call tries again
+        mock_session.execute.side_effect = None
+        mock_session.execute.return_value.rowcount = 1
+        consume_geocoding_call()
+
+    @patch.object(Config, "QUOTA_PACING_ENABLED", True)
+    def test_get_quota_status_paced(self):
+        """Test the soft budget accrues over the window with pacing"""
+        self.mock_session.scalar.return_value = 100
+
+        status = get_quota_status(self.mock_session, datetime(2024, 5, 1, 20, 0))
+
+        # 12 of 24 hours elapsed: 450 of the 900 soft budget accrued
+        self.assertEqual(status["allowance"], 350)
+        self.assertEqual(status["soft_remaining"], 800)
+        self.assertEqual(status["hard_remaining"], 900)
+
+    @patch.object(Config, "QUOTA_PACING_ENABLED", False)
+    def test_get_quota_status_unpaced(self):
+        """Test the whole soft budget is available without pacing"""
+        self.mock_session.scalar.return_value = None
+
+        status = get_quota_status(self.mock_session, datetime(2024, 5, 1, 9, 0))
+
+        self.assertEqual(status["used"], 0)
+        self.assertEqual(status["allowance"], 900)
+
+    @patch.object(Config, "QUOTA_ENABLED", True)
+    @patch.object(Config, "DAILY_ITERATION_LIMIT", 50)
+    @patch("app.helper.get_quota_status")
+    def test_get_giving_partners_limited_by_quota(self, mock_get_quota_status):
+        """Test the pending GPs are capped by the quota allowance"""
+        mock_get_quota_status.return_value = {"allowance": 0}
+        self.assertEqual(get_giving_partners(self.mock_session), [])
+        self.mock_session.execute.assert_not_called()
+
+        mock_get_quota_status.return_value = {"allowance": 20}
+        get_giving_partners(self.mock_session)
+        statement = self.mock_session.execute.call_args.args[0]
+        self.assertEqual(statement.compile().params["param_1"], 20)
+
+    @patch("app.services.location_and_outlines.publish_sns_search_sync")
+    @patch("app.services.location_and_outlines.process_location_and_outlines")
+    @patch("app.services.location_and_outlines.get_giving_partners")
+    def test_run_location_and_outlines_stops_on_quota(
+        self,
+        mock_get_giving_partners,
+        mock_process_location_and_outlines,
+        mock_publish_sns_search_sync,
+    ):
+        """Test the run stops at the first QuotaExceededError"""
+        mock_get_giving_partners.return_value = [MagicMock(), MagicMock()]
+        mock_process_location_and_outlines.side_effect = QuotaExceededError()
+
+        run_location_and_outlines(self.mock_session, MagicMock())
+
+        mock_process_location_and_outlines.assert_called_once()
+        mock_publish_sns_search_sync.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
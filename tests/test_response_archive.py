@@ -0,0 +1,67 @@
+"""unitest module for testing"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.config import Config
+from app.google_api_calls import geocoding_api_address
+from app.response_archive import (
+    ArchiveMissError,
+    close_archives,
+    record_response,
+    replay_response,
+)
+
+
+class TestResponseArchive(unittest.TestCase):
+    """testing class for response_archive.py"""
+
+    def setUp(self):
+        """Setup a temporary archive before each test"""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.archive_path = os.path.join(self.tmp_dir, "archive.sqlite3")
+        self.data = {"addressQuery": {"addressQuery": "test_address"}}
+        self.response = {"destinations": [{"primary": {"location": {}}}]}
+
+    def tearDown(self):
+        """Remove the temporary archive after each test"""
+        close_archives()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_record_and_replay(self):
+        """Test a recorded response is replayed as-is"""
+        record_response(self.data, self.response, self.archive_path)
+        record_response({"other": 1}, None, self.archive_path)
+
+        self.assertEqual(replay_response(self.data, self.archive_path), self.response)
+        self.assertIsNone(replay_response({"other": 1}, self.archive_path))
+
+    def test_replay_miss(self):
+        """Test replaying a request that was never recorded raises"""
+        with self.assertRaises(ArchiveMissError):
+            replay_response(self.data, self.archive_path)
+
+    @patch("app.google_api_calls._call_geocoding_api")
+    def test_geocoding_api_address_record_then_replay(self, mock__call_geocoding_api):
+        """Test geocoding_api_address records in record mode and does not call
+        the API in replay mode"""
+        mock__call_geocoding_api.return_value = self.response
+
+        with patch.object(Config, "GEOCODING_ARCHIVE_PATH", self.archive_path):
+            with patch.object(Config, "GEOCODING_ARCHIVE_MODE", "record"):
+                recorded = geocoding_api_address("a", "b", "c", "d", "e")
+            with patch.object(Config, "GEOCODING_ARCHIVE_MODE", "replay"):
+                replayed = geocoding_api_address("a", "b", "c", "d", "e")
+                with self.assertRaises(ArchiveMissError):
+                    geocoding_api_address("x", "b", "c", "d", "e")
+
+        mock__call_geocoding_api.assert_called_once()
+        self.assertEqual(recorded, self.response)
+        self.assertEqual(replayed, self.response)
+
+
+if __name__ == "__main__":
+    unittest.main()
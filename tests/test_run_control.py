@@ -0,0 +1,103 @@
+"""unitest module for testing"""
+
+import os
+import signal
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+from app.config import Config
+from app.models import GivingPartnerRow
+from app.process_pool import iter_pooled_extractions
+from app.run_control import (
+    configure_run,
+    get_stop_reason,
+    iter_until_stopped,
+    request_stop,
+)
+from app.services.location_and_outlines import run_location_and_outlines
+
+
+class TestRunControl(unittest.TestCase):
+    """testing class for run_control.py"""
+
+    def setUp(self):
+        """Start a run without deadline, restoring the SIGTERM handler after"""
+        self.addCleanup(signal.signal, signal.SIGTERM, signal.getsignal(signal.SIGTERM))
+        self.addCleanup(configure_run, 0)
+        configure_run(0)
+        self.giving_partners = [
+            GivingPartnerRow(gp_id, "1 Main St", "Springfield", "IL", "62701", "US")
+            for gp_id in range(1, 5)
+        ]
+
+    def test_deadline(self):
+        """Test no GP is started once the deadline has passed"""
+        with patch("app.run_control.time.monotonic", return_value=1000.0):
+            configure_run(60)
+        with patch(
+            "app.run_control.time.monotonic", side_effect=[1010.0, 1070.0, 1070.0]
+        ):
+            self.assertEqual(
+                list(iter_until_stopped(self.giving_partners)),
+                self.giving_partners[:1],
+            )
+        self.assertEqual(get_stop_reason(), "deadline")
+
+    def test_sigterm_stops_the_run(self):
+        """Test SIGTERM requests a graceful stop instead of killing the run"""
+        os.kill(os.getpid(), signal.SIGTERM)
+
+        self.assertEqual(get_stop_reason(), "SIGTERM")
+        self.assertEqual(list(iter_until_stopped(self.giving_partners)), [])
+
+    @patch("app.services.location_and_outlines.publish_sns_search_sync")
+    @patch("app.services.location_and_outlines.insert_google_data")
+    @patch("app.services.location_and_outlines.geocoding_api_address")
+    @patch("app.services.location_and_outlines.get_giving_partners")
+    def test_stop_finishes_the_current_gp(
+        self,
+        mock_get_giving_partners,
+        mock_geocoding_api_address,
+        mock_insert_google_data,
+        mock_publish_sns_search_sync,
+    ):
+        """Test a stop during a GP still stores and publishes that GP"""
+        mock_get_giving_partners.return_value = self.giving_partners
+        mock_geocoding_api_address.side_effect = lambda *args, **kwargs: (
+            request_stop("SIGTERM")
+        )
+
+        run_location_and_outlines(MagicMock(), MagicMock())
+
+        mock_geocoding_api_address.assert_called_once()
+        mock_insert_google_data.assert_called_once()
+        mock_publish_sns_search_sync.assert_called_once()
+
+    @patch.object(Config, "PROCESS_POOL_GEOCODING_THREADS", 1)
+    @patch("app.process_pool.geocoding_api_address")
+    def test_stop_drains_pooled_geocodes(self, mock_geocoding_api_address):
+        """Test the GPs already geocoded for the pool are still yielded"""
+
+        def geocode(address, *_args, **_kwargs):
+            if address == self.giving_partners[1].address:
+                request_stop("SIGTERM")
+            return {"destinations": []}
+
+        mock_geocoding_api_address.side_effect = geocode
+        self.giving_partners[1] = self.giving_partners[1]._replace(address="2 Main St")
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            # like the runners, each extraction is stored before the next GP
+            for giving_partner, extraction, *_ in iter_pooled_extractions(
+                pool, iter_until_stopped(self.giving_partners)
+            ):
+                results[giving_partner.donee_id] = extraction.result()
+
+        self.assertEqual(list(results), [1, 2])
+        self.assertEqual(results[2][:2], (-1, -1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+"""unitest module for testing"""
+
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+from app.config import Config
+from app.metrics import ProgressReporter, increment_counter, reset_counters
+from app.models import GeocodingRunHistory
+from app.run_history import check_run_regressions, get_run_summary
+from app.scripts.check_run_regressions import main
+
+
+def make_run(
+    run_id,
+    gps_per_second=10.0,
+    latency_p50_ms=100.0,
+    latency_p99_ms=500.0,
+    gps_attempted=1000,
+):
+    """Returns a stored run summary"""
+    return GeocodingRunHistory(
+        run_id=run_id,
+        started_at=datetime(2024, 5, 1),
+        gps_attempted=gps_attempted,
+        gps_per_second=gps_per_second,
+        latency_p50_ms=latency_p50_ms,
+        latency_p99_ms=latency_p99_ms,
+    )
+
+
+class TestRunHistory(unittest.TestCase):
+    """testing class for run_history.py"""
+
+    def setUp(self):
+        """Forget the counters of other tests"""
+        reset_counters()
+        self.addCleanup(reset_counters)
+        self.mock_session = MagicMock()
+        self.stored_runs = self.mock_session.execute.return_value.scalars.return_value
+
+    @patch("app.run_history.get_elapsed", return_value=2.0)
+    def test_run_summary(self, _mock_get_elapsed):
+        """Test the summary holds the run outcomes, calls and GP durations"""
+        # GPs overlap, each one is timed from its own start
+        with patch("app.metrics.time.monotonic", side_effect=[0, 0.1, 0.2, 0.3, 1.3]):
+            progress = ProgressReporter("Test", interval=0)
+            for outcome, started_at in (
+                ("succeeded", 0),
+                ("succeeded", 0),
+                ("succeeded", 0.1),
+                ("failed", 0.3),
+            ):
+                progress.record(outcome, started_at)
+        increment_counter("api_calls", 5)
+        increment_counter("api_retries")
+
+        summary = get_run_summary("run", "outlines")
+
+        self.assertEqual(
+            (summary.gps_attempted, summary.gps_succeeded, summary.gps_per_second),
+            (4, 3, 2.0),
+        )
+        self.assertEqual(
+            (summary.api_calls, summary.api_retries, summary.api_cache_hits), (5, 1, 0)
+        )
+        self.assertEqual((summary.latency_p50_ms, summary.latency_p99_ms), (200, 1000))
+        self.assertGreater(summary.peak_rss_mb, 0)
+
+    def test_regressions(self):
+        """Test a slower latest run is reported against the baseline median"""
+        self.stored_runs.first.return_value = make_run(
+            "latest", gps_per_second=7.0, latency_p99_ms=760.0
+        )
+        self.stored_runs.all.return_value = [
+            make_run(str(i), gps_per_second=9 + i) for i in range(3)
+        ]
+
+        self.assertEqual(
+            check_run_regressions(self.mock_session, "outlines"),
+            [("gps_per_second", 7.0, 10), ("latency_p99_ms", 760.0, 500.0)],
+        )
+
+        self.stored_runs.first.return_value = make_run("latest", gps_per_second=8.5)
+        self.assertEqual(check_run_regressions(self.mock_session, "outlines"), [])
+
+    def test_not_enough_runs(self):
+        """Test no verdict is given without enough previous runs"""
+        self.stored_runs.first.return_value = make_run("latest", gps_per_second=1.0)
+        self.stored_runs.all.return_value = [make_run("previous")]
+
+        self.assertEqual(check_run_regressions(self.mock_session, "outlines"), [])
+
+    @patch.object(Config, "RUN_HISTORY_MIN_GPS", 100)
+    def test_small_latest_run(self):
+        """Test a small latest run is skipped rather than an older run checked"""
+        self.stored_runs.first.return_value = make_run(
+            "latest", gps_per_second=1.0, gps_attempted=5
+        )
+        self.stored_runs.all.return_value = [
+            make_run("older", gps_per_second=1.0),
+            *(make_run(str(i)) for i in range(3)),
+        ]
+
+        self.assertEqual(check_run_regressions(self.mock_session, "outlines"), [])
+        # only the latest run was read, without the minimum
+        sql = str(self.mock_session.execute.call_args.args[0])
+        self.assertNotIn("gps_attempted >=", sql)
+        self.mock_session.execute.assert_called_once()
+
+    @patch("app.scripts.check_run_regressions.get_session")
+    @patch("app.scripts.check_run_regressions.get_engine")
+    @patch("app.scripts.check_run_regressions.check_run_regressions")
+    def test_main_exit_code(self, mock_check_run_regressions, *_mocks):
+        """Test the check exits non-zero on a regression of any checked job"""
+        mock_check_run_regressions.side_effect = lambda session, job: (
+            [("gps_per_second", 7.0, 10)] if job == "outlines" else []
+        )
+
+        self.assertEqual(main(["--job", "donee_geocoder"]), 0)
+        self.assertEqual(main([]), 1)
+        self.assertEqual(mock_check_run_regressions.call_count, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
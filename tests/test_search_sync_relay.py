@@ -0,0 +1,122 @@
+"""unitest module for testing"""
+
+import json
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy.dialects import mysql
+
+from app.config import Config
+from app.helper import insert_google_data
+from app.scripts.donee_geocoder import main
+from app.services.search_sync_relay import run_search_sync_relay
+
+
+class TestSearchSyncRelay(unittest.TestCase):
+    """testing class for search_sync_relay.py"""
+
+    def setUp(self):
+        """Setup mocks before each test"""
+        self.mock_session = MagicMock()
+        self.mock_sns = MagicMock()
+
+    @staticmethod
+    def _entry(entry_id):
+        return SimpleNamespace(
+            id=entry_id, message={"data": {"giving_partner_id": entry_id * 10}}
+        )
+
+    @patch.object(Config, "AWS_SNS_TOPIC", "test_sns_topic")
+    @patch.object(Config, "SEARCH_SYNC_RELAY_BATCH_SIZE", 12)
+    def test_run_search_sync_relay(self):
+        """Test the outbox is drained in SNS batches of 10"""
+        entries = [self._entry(i) for i in range(1, 13)]
+        self.mock_session.execute.return_value.all.side_effect = [entries, []]
+        commits_before_publish = []
+
+        def publish_batch(**kwargs):
+            commits_before_publish.append(self.mock_session.commit.call_count)
+            return {
+                "Successful": [
+                    {"Id": entry["Id"]}
+                    for entry in kwargs["PublishBatchRequestEntries"]
+                ]
+            }
+
+        self.mock_sns.publish_batch.side_effect = publish_batch
+
+        self.assertEqual(run_search_sync_relay(self.mock_session, self.mock_sns), 12)
+
+        first_call, second_call = self.mock_sns.publish_batch.call_args_list
+        self.assertEqual(len(first_call.kwargs["PublishBatchRequestEntries"]), 10)
+        self.assertEqual(len(second_call.kwargs["PublishBatchRequestEntries"]), 2)
+        first_entry = first_call.kwargs["PublishBatchRequestEntries"][0]
+        self.assertEqual(first_call.kwargs["TopicArn"], "test_sns_topic")
+        self.assertEqual(first_entry["Id"], "1")
+        self.assertEqual(first_entry["MessageDeduplicationId"], "search-sync-1")
+        self.assertEqual(
+            json.loads(first_entry["Message"]), {"data": {"giving_partner_id": 10}}
+        )
+        # no row lock is held while SNS is called
+        select_statement = self.mock_session.execute.call_args_list[0].args[0]
+        self.assertNotIn(
+            "FOR UPDATE", str(select_statement.compile(dialect=mysql.dialect()))
+        )
+        self.assertEqual(commits_before_publish, [1, 1])
+        # read, delete and final empty read
+        self.assertEqual(self.mock_session.execute.call_count, 3)
+        self.assertEqual(self.mock_session.commit.call_count, 3)
+
+    def test_run_search_sync_relay_keeps_failures(self):
+        """Test failed entries are not deleted and stop the drain"""
+        self.mock_session.execute.return_value.all.return_value = [
+            self._entry(1),
+            self._entry(2),
+        ]
+        self.mock_sns.publish_batch.return_value = {
+            "Successful": [{"Id": "1"}],
+            "Failed": [{"Id": "2", "Code": "InternalError"}],
+        }
+
+        self.assertEqual(run_search_sync_relay(self.mock_session, self.mock_sns), 1)
+        deleted_ids = self.mock_session.execute.call_args.args[0].whereclause.right
+        self.assertEqual(deleted_ids.value, [1])
+
+    @patch.object(Config, "SEARCH_SYNC_OUTBOX_ENABLED", True)
+    @patch.object(Config, "QUOTA_ENABLED", False)
+    @patch.object(Config, "RUN_HISTORY_ENABLED", False)
+    @patch("app.scripts.donee_geocoder.get_sns_client")
+    @patch("app.scripts.donee_geocoder.get_engine")
+    @patch("app.scripts.donee_geocoder.get_session")
+    @patch("app.scripts.donee_geocoder.run_location_and_outlines")
+    @patch("app.services.search_sync_relay.run_search_sync_relay")
+    def test_relay_failure_keeps_geocoder_exit_status(
+        self, mock_run_search_sync_relay, *_mocks
+    ):
+        """Test a relay failure after geocoding is logged, not a job failure"""
+        mock_run_search_sync_relay.side_effect = RuntimeError("SNS unavailable")
+
+        with patch.dict("os.environ", {"LOCALSTACK_HOSTNAME": ""}):
+            self.assertEqual(main(), 0)
+        mock_run_search_sync_relay.assert_called_once()
+
+    @patch.object(Config, "SEARCH_SYNC_OUTBOX_ENABLED", True)
+    @patch("app.helper.SearchSyncOutbox")
+    def test_insert_google_data_writes_outbox(self, mock_outbox):
+        """Test insert_google_data adds the search-sync event before committing"""
+        mock_gp = MagicMock()
+        mock_gp.donee_id = 7
+
+        insert_google_data(self.mock_session, mock_gp, 10, 11, [])
+
+        mock_outbox.assert_called_once_with(
+            giving_partner_id=7,
+            message={"data": {"giving_partner_id": 7, "operation": "update"}},
+        )
+        self.mock_session.add.assert_called_once_with(mock_outbox.return_value)
+        self.mock_session.commit.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""unitest module for testing"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.config import Config
+from app.tracing import (
+    _tracing,
+    configure_tracing,
+    giving_partner_span,
+    open_span,
+    shutdown_tracing,
+    start_span,
+    traced,
+)
+
+
+class TestTracing(unittest.TestCase):
+    """testing class for tracing.py"""
+
+    def tearDown(self):
+        """Stop tracing after each test"""
+        _tracing.clear()
+
+    @patch.object(Config, "TRACING_ENABLED", False)
+    def test_tracing_disabled(self):
+        """Test spans are no-ops unless tracing is configured"""
+        self.assertEqual(configure_tracing("run"), "run")
+
+        with start_span("test") as span:
+            self.assertIsNone(span)
+        self.assertEqual(traced("test")(lambda value: value)(1), 1)
+        shutdown_tracing()
+
+    def test_spans_tagged_with_giving_partner(self):
+        """Test spans nested in a GP span carry the run and GP ids"""
+        mock_tracer = MagicMock()
+        _tracing.update(tracer=mock_tracer, run_id="run")
+
+        with giving_partner_span(7):
+            traced("insert_google_data")(lambda: None)()
+        with start_span("get_giving_partners"):
+            pass
+
+        spans = [
+            (span_call.args[0], span_call.kwargs["attributes"])
+            for span_call in mock_tracer.start_as_current_span.call_args_list
+        ]
+        self.assertEqual(
+            spans,
+            [
+                (
+                    "process_giving_partner",
+                    {"run.id": "run", "giving_partner_id": "7"},
+                ),
+                ("insert_google_data", {"run.id": "run", "giving_partner_id": "7"}),
+                ("get_giving_partners", {"run.id": "run"}),
+            ],
+        )
+
+    @patch("app.tracing.use_span")
+    def test_open_span_across_threads(self, mock_use_span):
+        """Test an open GP span is entered instead of a new one, and only
+        ended on the last use"""
+        mock_tracer = MagicMock()
+        _tracing.update(tracer=mock_tracer, run_id="run")
+
+        span = open_span("process_giving_partner", 7)
+        with giving_partner_span(7, span, end=False):
+            pass
+        with giving_partner_span(7, span):
+            pass
+
+        mock_tracer.start_span.assert_called_once_with(
+            "process_giving_partner",
+            attributes={"run.id": "run", "giving_partner_id": "7"},
+        )
+        mock_tracer.start_as_current_span.assert_not_called()
+        self.assertEqual(
+            [
+                use_call.kwargs["end_on_exit"]
+                for use_call in mock_use_span.call_args_list
+            ],
+            [False, True],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+"""unitest module for testing"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.config import Config
+from app.enums import ResponseProfile
+from app.models import GivingPartnerRow
+from app.services.unified_runner import get_targets, run_unified
+
+RESPONSE = {
+    "destinations": [
+        {
+            "primary": {"location": {"latitude": 40.1, "longitude": -88.2}},
+            "structureType": "BUILDING",
+            "displayPolygon": {"type": "Polygon", "coordinates": []},
+        }
+    ]
+}
+
+
+class TestUnifiedRunner(unittest.TestCase):
+    """testing class for the unified runner"""
+
+    def setUp(self):
+        """Setup mocks before each test"""
+        self.mock_session = MagicMock()
+        self.mock_sns = MagicMock()
+        self.giving_partners = [
+            GivingPartnerRow(gp_id, "1 Main St", "Springfield", "IL", "62701", "US")
+            for gp_id in (1, 2)
+        ]
+
+    def test_get_targets(self):
+        """Test unknown targets and targets without any stored field are rejected"""
+        for targets in (["coordinates", "typo"], ["search_sync"]):
+            with patch.object(Config, "GEOCODING_TARGETS", targets):
+                with self.assertRaises(ValueError):
+                    get_targets()
+
+    @patch("app.services.unified_runner.publish_sns_search_sync")
+    @patch("app.services.unified_runner.insert_google_data")
+    @patch("app.services.unified_runner.geocoding_api_address")
+    @patch("app.services.unified_runner.get_giving_partners")
+    def test_run_unified_all_targets(
+        self,
+        mock_get_giving_partners,
+        mock_geocoding_api_address,
+        mock_insert_google_data,
+        mock_publish_sns_search_sync,
+    ):
+        """Test coordinates, outlines and the event are stored from one call"""
+        mock_get_giving_partners.return_value = self.giving_partners
+        mock_geocoding_api_address.return_value = RESPONSE
+
+        with patch.object(Config, "GP_IDS", "1,2"):
+            run_unified(
+                self.mock_session,
+                self.mock_sns,
+                frozenset({"coordinates", "outlines", "search_sync"}),
+            )
+
+        mock_get_giving_partners.assert_called_once_with(self.mock_session, [1, 2])
+        self.assertEqual(mock_geocoding_api_address.call_count, 2)
+        self.assertEqual(
+            mock_geocoding_api_address.call_args.kwargs,
+            {"profile": ResponseProfile.FULL},
+        )
+        mock_insert_google_data.assert_called_with(
+            self.mock_session,
+            self.giving_partners[1],
+            40.1,
+            -88.2,
+            [{"type": "Polygon", "coordinates": []}],
+            outline_metrics=None,
+            with_outlines=True,
+            search_sync=True,
+        )
+        mock_publish_sns_search_sync.assert_called_with(self.mock_sns, 2)
+
+    @patch("app.services.unified_runner.publish_sns_search_sync")
+    @patch("app.services.unified_runner.insert_google_data")
+    @patch("app.services.building_outlines.insert_google_outlines")
+    @patch("app.services.unified_runner.geocoding_api_address")
+    @patch("app.services.unified_runner.get_giving_partners")
+    def test_run_unified_outlines_only(
+        self,
+        mock_get_giving_partners,
+        mock_geocoding_api_address,
+        mock_insert_google_outlines,
+        mock_insert_google_data,
+        mock_publish_sns_search_sync,
+    ):
+        """Test only the outlines are stored for the outlines target"""
+        mock_get_giving_partners.return_value = self.giving_partners[:1]
+        mock_geocoding_api_address.return_value = RESPONSE
+
+        with patch.object(Config, "GP_IDS", "1"):
+            run_unified(self.mock_session, self.mock_sns, frozenset({"outlines"}))
+
+        self.assertEqual(
+            mock_geocoding_api_address.call_args.kwargs,
+            {"profile": ResponseProfile.OUTLINES},
+        )
+        mock_insert_google_outlines.assert_called_once_with(
+            self.mock_session,
+            1,
+            [{"type": "Polygon", "coordinates": []}],
+            outline_metrics=None,
+            search_sync=False,
+        )
+        mock_insert_google_data.assert_not_called()
+        mock_publish_sns_search_sync.assert_not_called()
+
+    @patch.object(Config, "GP_IDS", "")
+    @patch("app.services.unified_runner.get_giving_partners")
+    def test_run_unified_outlines_needs_gp_ids(self, mock_get_giving_partners):
+        """Test the pending GPs are not picked without the coordinates target,
+        since they would stay pending"""
+        run_unified(self.mock_session, self.mock_sns, frozenset({"outlines"}))
+
+        mock_get_giving_partners.assert_not_called()
+
+    @patch.object(Config, "GP_IDS", "1")
+    @patch.object(Config, "SEARCH_SYNC_OUTBOX_ENABLED", True)
+    @patch("app.services.unified_runner.publish_sns_search_sync")
+    @patch("app.services.unified_runner.geocoding_api_address")
+    @patch("app.services.unified_runner.get_giving_partners")
+    def test_search_sync_outbox_follows_targets(
+        self,
+        mock_get_giving_partners,
+        mock_geocoding_api_address,
+        mock_publish_sns_search_sync,
+    ):
+        """Test the outbox event is queued only when search_sync is targeted,
+        whichever fields are stored"""
+        mock_get_giving_partners.return_value = self.giving_partners[:1]
+        mock_geocoding_api_address.return_value = RESPONSE
+
+        for targets in ({"outlines", "search_sync"}, {"coordinates"}):
+            self.mock_session.reset_mock()
+            run_unified(self.mock_session, self.mock_sns, frozenset(targets))
+
+            self.assertEqual(
+                [
+                    type(call.args[0]).__name__
+                    for call in self.mock_session.add.call_args_list
+                ],
+                ["SearchSyncOutbox"] if "search_sync" in targets else [],
+            )
+        mock_publish_sns_search_sync.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+"""module for unit testing"""
+
+import math
+import random
+import unittest
+
+from app import geometry
+from app.vector_geometry import (
+    compute_outline_metrics,
+    compute_outline_metrics_batch,
+)
+
+
+def make_footprint(vertex_count, hole_count=0):
+    """Returns a random star-shaped displayPolygon"""
+    center_lon, center_lat = random.uniform(-120, -70), random.uniform(25, 48)
+
+    def ring(radius, count):
+        points = [
+            [
+                center_lon
+                + radius * random.uniform(0.7, 1) * math.cos(2 * math.pi * i / count),
+                center_lat
+                + radius * random.uniform(0.7, 1) * math.sin(2 * math.pi * i / count),
+            ]
+            for i in range(count)
+        ]
+        return points + points[:1]
+
+    return {
+        "type": "Polygon",
+        "coordinates": [ring(1e-3, vertex_count)]
+        + [ring(1e-4, 5) for _ in range(hole_count)],
+    }
+
+
+class TestVectorGeometry(unittest.TestCase):
+    """unit test class to test vector_geometry"""
+
+    def assert_same_metrics(self, expected, actual):
+        """Asserts vectorized metrics match the pure-Python reference"""
+        if expected is None:
+            self.assertIsNone(actual)
+            return
+        self.assertEqual(expected.keys(), actual.keys())
+        for key, value in expected.items():
+            if isinstance(value, float):
+                self.assertAlmostEqual(value, actual[key], places=6, msg=key)
+            else:
+                self.assertEqual(value, actual[key], msg=key)
+
+    def test_compute_outline_metrics_batch_matches_reference(self):
+        """Test the vectorized metrics match app.geometry on random outlines"""
+        random.seed(1)
+        batch = [
+            [
+                make_footprint(random.randint(3, 60), random.randint(0, 2))
+                for _ in range(random.randint(0, 3))
+            ]
+            for _ in range(100)
+        ]
+        batch += [
+            [{"type": "Polygon", "coordinates": [[[1, 1], [1, 1], [1, 1], [1, 1]]]}],
+            [{"type": "Polygon", "coordinates": [[[1, 1], [2, 1], [2, 2], [1, 2]]]}],
+            [{"type": "Polygon", "coordinates": [[]]}, make_footprint(6)],
+            [{"type": "MultiPolygon", "coordinates": [[[[1, 1], [2, 1], [1, 1]]]]}],
+            [{"type": "Point", "coordinates": [1, 1]}],
+        ]
+
+        for outlines, metrics in zip(batch, compute_outline_metrics_batch(batch)):
+            self.assert_same_metrics(
+                geometry.compute_outline_metrics(outlines), metrics
+            )
+
+    def test_compute_outline_metrics_large_outlines(self):
+        """Test large outlines take the vectorized path with the same result"""
+        random.seed(2)
+        outlines = [make_footprint(500, 1), make_footprint(300)]
+
+        self.assert_same_metrics(
+            geometry.compute_outline_metrics(outlines),
+            compute_outline_metrics(outlines),
+        )
+        self.assertEqual(compute_outline_metrics_batch([]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
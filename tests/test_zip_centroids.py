@@ -0,0 +1,107 @@
+"""unitest module for testing"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from requests.exceptions import HTTPError
+from tenacity import RetryError
+
+from app.enums import CoordinateSource
+from app.services.location_and_outlines import process_location_and_outlines
+from app.zip_centroids import (
+    build_zip_centroid_index,
+    close_zip_centroid_indexes,
+    get_zip_key,
+    lookup_zip_centroid,
+)
+
+
+class TestZipCentroids(unittest.TestCase):
+    """testing class for zip_centroids.py"""
+
+    def setUp(self):
+        """Setup a temporary ZIP centroid index before each test"""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.index_path = os.path.join(self.tmp_dir, "zip_centroids.idx")
+        source_path = os.path.join(self.tmp_dir, "zip_centroids.csv")
+        with open(source_path, "w", encoding="utf-8") as source_file:
+            source_file.write("country,zip,latitude,longitude\n")
+            source_file.write("US,10001,40.75,-73.99\n")
+            source_file.write("US,94105,37.79,-122.39\n")
+            source_file.write("CA,M5V 2T6,43.64,-79.39\n")
+        self.count = build_zip_centroid_index(source_path, self.index_path)
+
+        self.mock_gp = MagicMock()
+        self.mock_gp.donee_id = 1
+        self.mock_gp.zip = "10001-1234"
+        self.mock_gp.country = "USA"
+
+    def tearDown(self):
+        """Close the index and remove temporary files after each test"""
+        close_zip_centroid_indexes()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_get_zip_key(self):
+        """Test US postal codes are normalized to their 5-digit ZIP code"""
+        self.assertEqual(get_zip_key(" 10001-1234", "united states"), b"US:10001")
+        self.assertEqual(get_zip_key("m5v 2t6", "CA"), b"CA:M5V 2T6")
+        self.assertIsNone(get_zip_key("", "US"))
+
+    def test_lookup_zip_centroid(self):
+        """Test lookups hit every record and miss unknown postal codes"""
+        self.assertEqual(self.count, 3)
+        self.assertEqual(
+            lookup_zip_centroid("10001", "US", self.index_path), (40.75, -73.99)
+        )
+        self.assertEqual(
+            lookup_zip_centroid("94105", "", self.index_path), (37.79, -122.39)
+        )
+        self.assertEqual(
+            lookup_zip_centroid("M5V 2T6", "CA", self.index_path), (43.64, -79.39)
+        )
+        self.assertIsNone(lookup_zip_centroid("99999", "US", self.index_path))
+
+    @patch(
+        "app.services.location_and_outlines.Config.ZIP_CENTROID_FALLBACK_ENABLED", True
+    )
+    @patch("app.services.location_and_outlines.geocoding_api_address")
+    @patch("app.helper.insert_google_data")
+    def test_process_location_and_outlines_fallback(
+        self, mock_insert_google_data, mock_geocoding_api_address
+    ):
+        """Test unlocated GPs get the ZIP centroid tagged as approximate"""
+        mock_geocoding_api_address.return_value = None
+
+        with patch("app.helper.Config.ZIP_CENTROID_INDEX_PATH", self.index_path):
+            process_location_and_outlines(MagicMock(), self.mock_gp)
+
+        args, kwargs = mock_insert_google_data.call_args
+        self.assertEqual(args[2:], (40.75, -73.99, []))
+        self.assertEqual(kwargs["coordinate_source"], CoordinateSource.ZIP_CENTROID)
+
+    @patch(
+        "app.services.location_and_outlines.Config.ZIP_CENTROID_FALLBACK_ENABLED", True
+    )
+    @patch("app.services.location_and_outlines.geocoding_api_address")
+    @patch("app.helper.insert_google_data")
+    def test_process_location_and_outlines_throttled_unknown_zip(
+        self, mock_insert_google_data, mock_geocoding_api_address
+    ):
+        """Test a throttled GP without a known ZIP centroid is left untouched"""
+        mock_geocoding_api_address.side_effect = RetryError(
+            MagicMock(exception=MagicMock(return_value=HTTPError()))
+        )
+        self.mock_gp.zip = "99999"
+
+        with patch("app.helper.Config.ZIP_CENTROID_INDEX_PATH", self.index_path):
+            with self.assertRaises(RetryError):
+                process_location_and_outlines(MagicMock(), self.mock_gp)
+
+        mock_insert_google_data.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()